@@ -0,0 +1,134 @@
+# benchmarks/hotpaths.py
+# Micro-benchmarks of the ingest and report hot paths on synthetic masters (pji_reports.synth).
+#
+#   python benchmarks/hotpaths.py [--rows 100000] [--repeat 5] [--only to_ts,intake_report]
+#                                 [--tolerance 1.5] [--update-baseline]
+#
+# Each case runs --repeat times after one warm-up; the median is compared with the stored baseline
+# for the same --rows in benchmarks/baselines.json, and the run exits non-zero when a case is slower
+# than tolerance × baseline (plus a small absolute slack for millisecond cases). --update-baseline
+# records this run's medians instead. Report cases run cold: the shared report cache and the
+# materialized views are cleared before every repetition, so they time the computation itself.
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st
+import streamlit.logger
+
+from pji_reports import synth
+from pji_reports.ingest import _dedupe_rows, process_calls_csv, _to_ts, _upsert_rows
+from pji_reports.store import _mv_store, _normalize_master, _report_cache, _typed_master
+from pji_reports.metrics import _intake_report, _kpi_values, _mask_by_range_dates, _practice_area_report
+
+BASELINES = os.path.join(ROOT, "benchmarks", "baselines.json")
+SLACK_S = 0.005   # absolute allowance on top of the ratio, so sub-millisecond noise never fails a run
+PERIOD = (date(2026, 1, 1), date(2026, 9, 30))   # year to date of the synthetic history
+IC_DATE = "Initial Consultation With Pji Law"
+
+
+def _cold():
+    """Forget every memoized report and materialized-view part."""
+    _report_cache.clear()
+    _mv_store.clear()
+
+
+def _cases(rows: int) -> dict:
+    """name → (setup, fn): setup runs before each repetition, untimed."""
+    raw = synth.masters(rows)
+    read = {k: _normalize_master(v.copy()) for k, v in raw.items()}             # as read from the store
+    typed = {k: _typed_master(k, v.copy())[0] for k, v in read.items()}
+    conv = [typed[k] for k in ("LEADS", "INIT", "DISC", "NCL")]
+    export = synth.calls_export(rows)
+    stored = _dedupe_rows(read["LEADS"], "LEADS")[0]                # Leads as read back, with __row_hash
+    upload = synth.leads_frame(max(rows // 100, 1), seed=1)          # a month-sized upload: 1% new rows
+    sd, ed = PERIOD
+    return {
+        "process_calls_csv": (None, lambda: process_calls_csv(export.copy(), "2026-09")),
+        "to_ts": (None, lambda: _to_ts(raw["LEADS"][IC_DATE])),
+        "mask_by_range_dates": (None, lambda: _mask_by_range_dates(raw["LEADS"], IC_DATE, sd, ed)),
+        # The Re-dedupe tool over the conversion masters (every row re-hashed)
+        "upload_dedupe_keys": (None, lambda: [_dedupe_rows(read[k], k) for k in ("LEADS", "INIT", "DISC", "NCL")]),
+        # Merge of one upload into the stored Leads master (stored rows matched by their __row_hash)
+        "upsert_leads": (None, lambda: _upsert_rows(stored, upload, "LEADS")),
+        # Practice Area met / retained counts per attorney (the KPI engine's 'attorney' grouping)
+        "practice_area_counts": (_cold, lambda: _kpi_values(*conv, sd, ed,
+                                                            ("met_with_attorney", "retained_with_attorney"))),
+        "practice_area_report": (_cold, lambda: inspect.unwrap(_practice_area_report)(*conv[1:], sd, ed)),
+        # Every intake specialist's funnel rows in one pass
+        "intake_report": (_cold, lambda: inspect.unwrap(_intake_report)(*conv, sd, ed, 0)),
+    }
+
+
+def _time(setup, fn, repeat: int) -> float:
+    """Median seconds of `repeat` runs after one warm-up."""
+    samples = []
+    for i in range(repeat + 1):
+        if setup:
+            setup()
+        t = time.perf_counter()
+        fn()
+        if i:
+            samples.append(time.perf_counter() - t)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Hot-path micro-benchmarks with stored baselines.")
+    ap.add_argument("--rows", type=int, default=100_000, help="synthetic Leads rows (other masters scale with it)")
+    ap.add_argument("--repeat", type=int, default=5, help="timed repetitions per case")
+    ap.add_argument("--only", default="", help="comma-separated subset of cases")
+    ap.add_argument("--tolerance", type=float, default=1.5, help="max median / baseline ratio")
+    ap.add_argument("--update-baseline", action="store_true", help="store this run's medians as the baseline")
+    args = ap.parse_args()
+    # Bare mode: no ScriptRunContext / cache-storage warnings
+    st.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+
+    t0 = time.perf_counter()
+    cases = _cases(args.rows)
+    print(f"synthetic masters ({args.rows:,} Leads rows): {time.perf_counter() - t0:.2f}s")
+    only = [c.strip() for c in args.only.split(",") if c.strip()]
+    unknown = [c for c in only if c not in cases]
+    if unknown:
+        ap.error(f"unknown case(s) {', '.join(unknown)} (choose from {', '.join(cases)})")
+
+    stored = json.load(open(BASELINES, encoding="utf-8")) if os.path.isfile(BASELINES) else {}
+    baseline = stored.get(str(args.rows), {}).get("results", {})
+    results, failures = {}, []
+    print(f"{'case':<22} {'median (s)':>11} {'baseline (s)':>13} {'ratio':>7}")
+    for name, (setup, fn) in cases.items():
+        if only and name not in only:
+            continue
+        results[name] = secs = _time(setup, fn, args.repeat)
+        base = baseline.get(name)
+        ratio = f"{secs / base:>7.2f}" if base else f"{'-':>7}"
+        print(f"{name:<22} {secs:>11.4f} {base if base else float('nan'):>13.4f} {ratio}")
+        if base and not args.update_baseline and secs > base * args.tolerance + SLACK_S:
+            failures.append(f"{name}: {secs:.4f}s > {args.tolerance} × baseline {base:.4f}s")
+
+    if args.update_baseline:
+        entry = stored.setdefault(str(args.rows), {"results": {}})
+        entry["results"].update({k: round(v, 6) for k, v in results.items()})
+        entry["machine"] = f"{platform.machine()} / Python {platform.python_version()}"
+        with open(BASELINES, "w", encoding="utf-8") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline for --rows {args.rows} written to {os.path.relpath(BASELINES, ROOT)}")
+    for f in failures:
+        print(f"FAIL: {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
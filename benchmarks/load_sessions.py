@@ -0,0 +1,362 @@
+# benchmarks/load_sessions.py
+# Concurrent-session load test of app.py: N simulated users, each an AppTest session on its own thread
+# (as the Streamlit server runs one script thread per session), sharing the process-wide caches and one
+# master store — the in-process fake spreadsheet (pji_reports.fakesheets) seeded with synthetic masters,
+# or a directory of exports.
+#
+#   python benchmarks/load_sessions.py [--sessions 8] [--interactions 20] [--rows 10000] [--source fake|DIR]
+#                                      [--latency 0.15] [--jitter 0.5] [--quota-per-minute 0] [--error-rate 0]
+#                                      [--uploads 0.05] [--think 0] [--seed 0] [--json report.json]
+#                                      [--p95-budget SECONDS]
+#
+# Every session logs in through the real login form, then runs a seeded mix of interactions: plain
+# reruns, the Calls / conversion / Practice Area / Intake / trend filters, the comparison toggle, a
+# funnel lookup and, at --uploads, a Zoom Calls or Leads upload. Expanders open in the browser without
+# a rerun (their bodies always execute), so a section is exercised through the widgets inside it.
+#
+# Reported: p50 / p95 / max rerun latency per interaction, backend calls per interaction (attributed to
+# the session whose script thread made them), session-state footprint per session and process RSS
+# growth per session. Exits non-zero when an interaction raised, a thread (a session, its script runs or
+# its background uploads) raised or outlived the run, or p95 exceeds --p95-budget.
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import streamlit.logger
+import yaml
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.testing.v1 import AppTest
+
+from pji_reports import fakesheets, synth
+from pji_reports.store import TAB_NAMES, _export_path, use_backend
+
+APP = os.path.join(ROOT, "app.py")
+SESSION_KEY = "_load_session"   # session-state marker used to attribute backend calls
+USER, PASSWORD = "loadtest", "loadtest-password"
+ACTIONS = {   # interaction → relative weight (uploads are drawn separately, at --uploads)
+    "rerun": 1, "calls_filter": 2, "conversion_period": 2, "compare_toggle": 1,
+    "practice_area_pick": 1, "intake_pick": 3, "trend_filter": 1, "funnel_lookup": 1,
+}
+UPLOADS = ("calls_upload", "leads_upload")
+BACKGROUND_THREADS = ("ScriptRunner.scriptThread", "ingest-")   # AppTest script runs, upload lanes
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Setup: auth secrets and the master store
+# ───────────────────────────────────────────────────────────────────────────────
+def _auth_secrets() -> str:
+    """A throwaway secrets.toml with one login, read through the `secrets.files` option (AppTest's own
+    per-run secrets swap is not thread-safe)."""
+    import bcrypt
+    config = {"credentials": {"usernames": {USER: {
+                  "name": "Load Test", "email": "loadtest@example.com",
+                  "password": bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()}}},
+              "cookie": {"name": "pji_loadtest", "key": os.urandom(32).hex(), "expiry_days": 1}}
+    path = os.path.join(tempfile.mkdtemp(prefix="pji_loadtest_"), "secrets.toml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"[auth_config]\nconfig = {json.dumps(yaml.safe_dump(config))}\n")
+    return path
+
+def _masters(source: str, rows: int, seed: int) -> dict:
+    """Raw masters for the fake store: synthetic, or the exports in a directory (as stored strings)."""
+    if source == "fake":
+        return synth.masters(rows, seed)
+    frames = {}
+    for key in TAB_NAMES:
+        path = _export_path(source, key)
+        if path is None:
+            continue
+        if path.endswith(".parquet"):
+            frames[key] = pd.read_parquet(path).astype(str)
+        elif path.endswith(".csv"):
+            frames[key] = pd.read_csv(path, dtype=str, keep_default_na=False)
+        else:
+            frames[key] = pd.read_excel(path, dtype=str).fillna("")
+    return frames
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux), else the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def _footprint(obj, seen=None) -> int:
+    """Approximate deep size in bytes (frames and arrays by their buffers)."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True).sum()) if isinstance(obj, pd.DataFrame) else int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_footprint(k, seen) + _footprint(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_footprint(v, seen) for v in obj)
+    return size
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Interactions (each mutates widgets; the caller reruns)
+# ───────────────────────────────────────────────────────────────────────────────
+def _select_any(rng: random.Random, boxes) -> bool:
+    boxes = [b for b in boxes if len(b.options) > 1]
+    if not boxes:
+        return False
+    box = rng.choice(boxes)
+    box.select_index(rng.randrange(len(box.options)))
+    return True
+
+def _by_label(widgets, *labels):
+    return [w for w in widgets if w.label in labels]
+
+def _by_key_prefix(widgets, prefix: str):
+    return [w for w in widgets if (w.key or "").startswith(prefix)]
+
+def _interact(at: AppTest, action: str, rng: random.Random, ctx: dict) -> bool:
+    """Apply one interaction to the current page; False when its widgets are not on the page."""
+    if action == "rerun":
+        return True
+    if action == "calls_filter":             # Year / Month / Category / Name above the Calls report
+        return _select_any(rng, _by_label(at.selectbox, "Year", "Month", "Category", "Name")[:4])
+    if action == "conversion_period":
+        radios = _by_label(at.radio, "Period")
+        if radios and rng.random() < 0.5:
+            radios[0].set_value(rng.choice([o for o in radios[0].options if o != "Custom range"]))
+            return True
+        return _select_any(rng, _by_label(at.selectbox, "Year", "Month")[2:4])
+    if action == "compare_toggle":
+        toggles = [t for t in at.toggle if t.key == "conv_compare_on"]
+        if toggles:
+            toggles[0].set_value(not toggles[0].value)
+        return bool(toggles)
+    if action == "practice_area_pick":
+        return _select_any(rng, _by_key_prefix(at.selectbox, "pa_pick_"))
+    if action == "intake_pick":
+        return _select_any(rng, [b for b in at.selectbox if b.key == "intake_specialist_pick"])
+    if action == "trend_filter":
+        return _select_any(rng, [b for b in at.selectbox if b.key in ("viz_year", "viz_practice_area", "funnel_year")])
+    if action == "funnel_lookup":
+        boxes = [t for t in at.text_input if t.key == "funnel_lookup"]
+        if boxes:
+            boxes[0].input(rng.choice(ctx["emails"]) if rng.random() < 0.8 else "")
+        return bool(boxes)
+    if action in UPLOADS:
+        for up in at.file_uploader:          # one file at a time, like a user working through exports
+            if up.value:
+                up.set_value(None)
+        key = "zoom_calls_uploader" if action == "calls_upload" else "up_leads_pncs"
+        ups = [u for u in at.file_uploader if u.key == key]
+        if not ups:
+            return False
+        n = ctx["session"] * 1000 + ctx["step"]
+        if action == "calls_upload":
+            data = synth.calls_export(40, n).to_csv(index=False).encode()
+        else:
+            data = synth.leads_frame(200, n, through=date.today(), months=1).to_csv(index=False).encode()
+        at.session_state["current_batch_id"] = f"batch_loadtest_{n}"   # what 'Generate New Batch ID' does
+        ups[0].set_value((f"{action}_{n}.csv", data, "text/csv"))
+        return True
+    raise ValueError(f"unknown interaction {action!r}")
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Sessions
+# ───────────────────────────────────────────────────────────────────────────────
+def _plan(rng: random.Random, n: int, uploads: float) -> list:
+    names, weights = list(ACTIONS), list(ACTIONS.values())
+    return [rng.choice(UPLOADS) if rng.random() < uploads else rng.choices(names, weights)[0] for _ in range(n)]
+
+def _session(i: int, args, emails: list, calls: dict, records: list, apps: dict, lock: threading.Lock):
+    rng = random.Random(args.seed * 7919 + i)
+    at = AppTest.from_file(APP, default_timeout=args.timeout)
+    at.session_state[SESSION_KEY] = i
+
+    def step(action: str, interact=None):
+        before = sum(calls[i].values())
+        t = time.perf_counter()
+        if interact is not None:
+            interact()
+        at.run()
+        rec = {"session": i, "action": action, "seconds": time.perf_counter() - t,
+               "calls": sum(calls[i].values()) - before,
+               "exception": at.exception[0].message if len(at.exception) else None}
+        with lock:
+            records.append(rec)
+
+    step("open_page")
+    def login():
+        boxes = _by_label(at.text_input, "Username", "Password")
+        boxes[0].input(USER); boxes[1].input(PASSWORD)
+        [b for b in at.button if b.label == "Login"][0].click()
+    step("login", login)
+    ctx = {"session": i, "emails": emails}
+    for n, action in enumerate(_plan(rng, args.interactions, args.uploads)):
+        if args.think:
+            time.sleep(rng.uniform(0, 2 * args.think))
+        ctx["step"] = n
+        if not _interact(at, action, rng, ctx):
+            action = "rerun"
+        step(action)
+    with lock:
+        apps[i] = at   # kept alive until memory is measured
+
+
+def _attribute(calls: dict, lock: threading.Lock):
+    """fakesheets on_call hook: count each API call against the session whose script thread made it."""
+    def on_call(method: str, tab: str):
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return
+        try:
+            sid = ctx.session_state[SESSION_KEY]
+        except KeyError:
+            return
+        with lock:
+            calls[sid][method] += 1
+    return on_call
+
+def _record_thread_errors(errors: list, lock: threading.Lock):
+    """threading.excepthook: note every thread that dies with an exception, then print it as usual."""
+    default = threading.excepthook
+    def hook(exc):
+        name = exc.thread.name if exc.thread is not None else "?"
+        with lock:
+            errors.append(f"{name}: {exc.exc_type.__name__}: {exc.exc_value}")
+        default(exc)
+    return hook
+
+def _join_background(timeout: float) -> list:
+    """Wait for script runs and upload lanes still going after their sessions finished (so none outlives
+    the run into teardown); the names of those still alive at `timeout`."""
+    deadline = time.monotonic() + timeout
+    for t in threading.enumerate():
+        if t is not threading.current_thread() and t.name.startswith(BACKGROUND_THREADS):
+            t.join(max(deadline - time.monotonic(), 0))
+    return [t.name for t in threading.enumerate() if t.is_alive() and t.name.startswith(BACKGROUND_THREADS)]
+
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Report
+# ───────────────────────────────────────────────────────────────────────────────
+def _summary(records: list) -> dict:
+    by_action = defaultdict(list)
+    for r in records:
+        by_action[r["action"]].append(r)
+    def stats(rs):
+        secs = np.array([r["seconds"] for r in rs])
+        return {"n": len(rs), "p50": float(np.percentile(secs, 50)), "p95": float(np.percentile(secs, 95)),
+                "max": float(secs.max()), "calls_per_interaction": float(np.mean([r["calls"] for r in rs]))}
+    interactions = [r for r in records if r["action"] not in ("open_page", "login")]
+    out = {a: stats(rs) for a, rs in sorted(by_action.items())}
+    if interactions:
+        out["ALL interactions"] = stats(interactions)
+    return out
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Concurrent-session load test of the Streamlit app.")
+    ap.add_argument("--sessions", type=int, default=8, help="concurrent simulated users")
+    ap.add_argument("--interactions", type=int, default=20, help="interactions per session after login")
+    ap.add_argument("--source", default="fake", help="'fake' (synthetic masters) or a directory of exports")
+    ap.add_argument("--rows", type=int, default=10_000, help="synthetic Leads rows (--source fake)")
+    ap.add_argument("--latency", type=float, default=0.15, help="seconds per Sheets API call (slept for real)")
+    ap.add_argument("--jitter", type=float, default=0.5, help="± share of --latency")
+    ap.add_argument("--quota-per-minute", type=int, default=0,
+                    help="API calls per minute before 429 (0 = off; Sheets allows 60 reads / min / user)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of API calls failing with 503")
+    ap.add_argument("--uploads", type=float, default=0.05, help="share of interactions that upload a file")
+    ap.add_argument("--think", type=float, default=0.0, help="mean seconds between a session's interactions")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--timeout", type=float, default=600, help="seconds allowed per rerun")
+    ap.add_argument("--json", default="", help="write the summary and every sample to this file")
+    ap.add_argument("--p95-budget", type=float, default=0.0, help="fail when interaction p95 exceeds this (0 = off)")
+    args = ap.parse_args()
+    if args.source != "fake" and not os.path.isdir(args.source):
+        ap.error(f"--source {args.source!r} is neither 'fake' nor a directory")
+    # Bare mode: no ScriptRunContext / cache-storage warnings
+    st.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+    st.config.set_option("secrets.files", [_auth_secrets()])
+
+    masters = _masters(args.source, args.rows, args.seed)
+    sheet = fakesheets.FakeSpreadsheet(latency=args.latency, jitter=args.jitter, seed=args.seed,
+                                       quota_per_minute=args.quota_per_minute or None, error_rate=args.error_rate)
+    sheet.load_frames(masters)
+    emails = [e for e in masters.get("LEADS", pd.DataFrame()).get("Email", pd.Series(dtype=str)).head(500) if e]
+    emails = emails or ["nobody@example.com"]
+    use_backend(sheet)
+    lock = threading.Lock()
+    calls = defaultdict(Counter)
+    sheet.on_call = _attribute(calls, lock)
+    thread_errors = []
+    threading.excepthook = _record_thread_errors(thread_errors, lock)
+
+    rss0 = _rss_mb()
+    records, apps = [], {}
+    threads = [threading.Thread(target=_session, args=(i, args, emails, calls, records, apps, lock), daemon=True)
+               for i in range(args.sessions)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    lingering = _join_background(args.timeout)
+    rss1 = _rss_mb()
+
+    summary = _summary(records)
+    state_kb = [_footprint(dict(at.session_state.items())) / 1024 for at in apps.values()]
+    print(f"{args.sessions} session(s) × {args.interactions} interaction(s) in {wall:.1f}s; "
+          f"backend latency {args.latency}s ± {args.jitter:.0%}")
+    print(f"{'interaction':<20} {'n':>5} {'p50 (s)':>8} {'p95 (s)':>8} {'max (s)':>8} {'calls/int':>10}")
+    for name, s in summary.items():
+        print(f"{name:<20} {s['n']:>5} {s['p50']:>8.2f} {s['p95']:>8.2f} {s['max']:>8.2f} {s['calls_per_interaction']:>10.1f}")
+    total_calls = sum(calls.values(), Counter())
+    print(f"backend calls: {sum(total_calls.values())} ({', '.join(f'{m} {n}' for m, n in sorted(total_calls.items()))}); "
+          f"injected faults: {sum(sheet.errors.values())}")
+    if state_kb:
+        print(f"memory: session state {np.median(state_kb):,.0f} KiB median / {max(state_kb):,.0f} KiB max per session; "
+              f"process RSS {rss0:,.0f} → {rss1:,.0f} MiB ({(rss1 - rss0) / args.sessions:,.1f} MiB per session)")
+
+    failures = [r for r in records if r["exception"]]
+    for r in failures[:10]:
+        print(f"FAIL: session {r['session']} {r['action']}: {r['exception']}")
+    for error in thread_errors[:10]:
+        print(f"FAIL: thread {error}")
+    for name in lingering:
+        print(f"FAIL: thread {name} still running {args.timeout:.0f}s after the sessions finished")
+    p95 = summary.get("ALL interactions", {}).get("p95", 0.0)
+    if args.p95_budget and p95 > args.p95_budget:
+        print(f"FAIL: interaction p95 {p95:.2f}s > budget {args.p95_budget:.2f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "wall_seconds": wall, "summary": summary,
+                       "backend_calls": dict(total_calls), "injected_faults": dict(sheet.errors),
+                       "thread_errors": thread_errors, "lingering_threads": lingering,
+                       "session_state_kib": state_kb, "rss_mib": [rss0, rss1], "samples": records}, f, indent=2)
+        print(f"report written to {args.json}")
+    return 1 if failures or thread_errors or lingering or (args.p95_budget and p95 > args.p95_budget) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# benchmarks/startup.py
+# Startup-time benchmark for the pji_reports package and the app.py page script.
+#
+#   python benchmarks/startup.py [--runs 5] [--reruns 200] [--cold-budget 0.25] [--rerun-budget 0.002]
+#
+# Measures
+#   • cold import of each pji_reports module in a fresh interpreter, net of the numpy / pandas /
+#     streamlit baseline every Streamlit process pays anyway (median of --runs processes)
+#   • the heavy dependencies each import pulls in beyond that baseline — gspread, google-auth,
+#     plotly.express, openpyxl & co. must load on first use, never at import
+#   • per-rerun import cost: Streamlit re-executes app.py on every interaction, so its import
+#     block runs against warm sys.modules each time (median over --reruns executions)
+#   • first plotly.express use, i.e. what the first chart pays for the lazy import
+# Exits non-zero when a budget is exceeded or a heavy dependency is imported eagerly.
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["pji_reports", "pji_reports.ingest", "pji_reports.store", "pji_reports.metrics", "pji_reports.render"]
+HEAVY = ["gspread", "gspread_dataframe", "google.auth", "google.oauth2", "plotly.express",
+         "openpyxl", "xlrd", "pyxlsb"]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import numpy, pandas, streamlit
+t1 = time.perf_counter()
+baseline = set(sys.modules)
+import importlib
+importlib.import_module({module!r})
+t2 = time.perf_counter()
+heavy = [m for m in {heavy!r} if m in sys.modules and m not in baseline]
+out = {{"baseline_s": t1 - t0, "import_s": t2 - t1, "heavy": heavy}}
+if {plotly!r}:
+    t3 = time.perf_counter()
+    sys.modules[{module!r}]._plotly()
+    out["plotly_s"] = time.perf_counter() - t3
+print(json.dumps(out))
+"""
+
+
+def _probe(module: str, plotly: bool = False) -> dict:
+    """Import `module` in a fresh interpreter and report its timings and eagerly loaded heavy deps."""
+    code = _PROBE.format(module=module, heavy=HEAVY, plotly=plotly)
+    res = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                         env={**os.environ, "PYTHONPATH": ROOT})
+    if res.returncode != 0:
+        raise RuntimeError(f"import of {module} failed:\n{res.stderr}")
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def _app_imports() -> str:
+    """The top-level import statements of app.py — the part of every rerun that touches the package."""
+    tree = ast.parse(open(os.path.join(ROOT, "app.py"), encoding="utf-8").read())
+    nodes = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(n) for n in nodes)
+
+
+_RERUN = """
+import json, statistics, time
+code = compile({imports!r}, "app.py", "exec")
+exec(code, {{}})                         # first execution = cold start, measured above
+samples = []
+for _ in range({reruns!r}):
+    t = time.perf_counter()
+    exec(code, {{}})
+    samples.append(time.perf_counter() - t)
+print(json.dumps(statistics.median(samples)))
+"""
+
+
+def _rerun_cost(reruns: int) -> float:
+    """Median seconds to execute app.py's import block once its modules are loaded."""
+    code = _RERUN.format(imports=_app_imports(), reruns=reruns)
+    res = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                         env={**os.environ, "PYTHONPATH": ROOT})
+    if res.returncode != 0:
+        raise RuntimeError(f"app.py imports failed:\n{res.stderr}")
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Cold-start and per-rerun import cost of pji_reports / app.py.")
+    ap.add_argument("--runs", type=int, default=5, help="fresh interpreters per module")
+    ap.add_argument("--reruns", type=int, default=200, help="warm executions of the app.py import block")
+    ap.add_argument("--cold-budget", type=float, default=0.25,
+                    help="max seconds for a cold import of the whole package beyond the baseline")
+    ap.add_argument("--rerun-budget", type=float, default=0.002,
+                    help="max seconds per rerun for app.py's import block")
+    args = ap.parse_args()
+
+    failures = []
+    print(f"{'module':<22} {'baseline (s)':>12} {'import (s)':>11}  eager heavy imports")
+    for module in MODULES:
+        runs = [_probe(module) for _ in range(args.runs)]
+        base = statistics.median(r["baseline_s"] for r in runs)
+        cost = statistics.median(r["import_s"] for r in runs)
+        heavy = sorted({m for r in runs for m in r["heavy"]})
+        print(f"{module:<22} {base:>12.3f} {cost:>11.3f}  {', '.join(heavy) or '-'}")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} eagerly")
+        if module == "pji_reports.render" and cost > args.cold_budget:
+            failures.append(f"cold import {cost:.3f}s > budget {args.cold_budget:.3f}s")
+
+    plotly = statistics.median(_probe("pji_reports.render", plotly=True).get("plotly_s", 0.0)
+                               for _ in range(args.runs))
+    print(f"first plotly.express use: {plotly:.3f}s")
+
+    rerun = _rerun_cost(args.reruns)
+    print(f"per-rerun import cost:    {rerun * 1e3:.3f} ms")
+    if rerun > args.rerun_budget:
+        failures.append(f"per-rerun import {rerun * 1e3:.3f}ms > budget {args.rerun_budget * 1e3:.3f}ms")
+
+    for f in failures:
+        print(f"FAIL: {f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# benchmarks/store_io.py
+# Backend calls and simulated Sheets latency of the store's read / write paths, against the in-process
+# fake spreadsheet (pji_reports.fakesheets) seeded with synthetic masters.
+#
+#   python benchmarks/store_io.py [--rows 10000] [--latency 0.2] [--error-rate 0.0] [--quota-per-minute 0]
+#
+# Scenarios, run in order on one backend
+#   • cold load      — first _load_masters() of a process (tab lookups, reads, missing tabs created)
+#   • warm rerun     — the next rerun with no write in between; must be served from the read cache
+#   • after a write  — a rerun after gs_ver was bumped by a write
+#   • remove batch   — remove_batch_from_sheet() on the NCL (read, clear, resize, write)
+# Latency runs on the fake's virtual clock, so call counts and simulated seconds are deterministic for a
+# given seed; the store's own retry back-off still sleeps for real. Exits non-zero when the warm rerun
+# reads a tab although the cold load read every tab cleanly (failed reads are not cached, by design).
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit as st
+import streamlit.logger
+
+from pji_reports import fakesheets, synth
+from pji_reports.store import _load_masters, _read_ws_by_name, remove_batch_from_sheet, _session_log, use_backend
+
+
+def _scenario(sheet: fakesheets.FakeSpreadsheet, fn) -> dict:
+    sheet.reset_counts()
+    t = time.perf_counter()
+    fn()
+    return {"wall": time.perf_counter() - t, "simulated": sheet.elapsed,
+            "calls": dict(sheet.calls), "errors": sum(sheet.errors.values())}
+
+
+def _bump_version():
+    st.session_state["gs_ver"] = st.session_state.get("gs_ver", 0) + 1
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Store I/O against the fake Sheets backend.")
+    ap.add_argument("--rows", type=int, default=10_000, help="synthetic Leads rows")
+    ap.add_argument("--latency", type=float, default=0.2, help="simulated seconds per API call")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of API calls failing with 503")
+    ap.add_argument("--quota-per-minute", type=int, default=0, help="API calls per minute before 429 (0 = off)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    # Bare mode: no ScriptRunContext / cache-storage warnings
+    st.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+
+    sheet = fakesheets.FakeSpreadsheet(latency=args.latency, error_rate=args.error_rate, seed=args.seed,
+                                       quota_per_minute=args.quota_per_minute or None, real_time=False)
+    sheet.load_frames(synth.masters(args.rows, args.seed))
+    use_backend(sheet)
+
+    def remove_batch():
+        ncl = _read_ws_by_name("NCL")
+        remove_batch_from_sheet("NCL", ncl["__batch_id"].iloc[0])
+
+    results = {}
+    results["cold load"] = _scenario(sheet, _load_masters)
+    results["warm rerun"] = _scenario(sheet, _load_masters)
+    _bump_version()
+    results["after a write"] = _scenario(sheet, _load_masters)
+    results["remove batch"] = _scenario(sheet, remove_batch)
+
+    print(f"{'scenario':<14} {'calls':>6} {'errors':>7} {'simulated (s)':>14} {'wall (s)':>9}  by method")
+    for name, r in results.items():
+        by_method = ", ".join(f"{m} {n}" for m, n in sorted(r["calls"].items()))
+        print(f"{name:<14} {sum(r['calls'].values()):>6} {r['errors']:>7} {r['simulated']:>14.2f} "
+              f"{r['wall']:>9.2f}  {by_method}")
+    for row in _session_log().counts():
+        print(f"log: {row['Count']} × [{row['Level']}] {row['Operation']} {row['Tab']} {row['Error']}".rstrip())
+
+    warm_reads = results["warm rerun"]["calls"].get("values_get", 0)
+    if warm_reads and not results["cold load"]["errors"]:
+        print(f"FAIL: warm rerun read {warm_reads} tab(s) from the backend")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
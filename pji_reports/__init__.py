@@ -0,0 +1,14 @@
+# pji_reports/__init__.py
+"""
+PJI Law conversion and call reports, importable without the Streamlit page.
+
+  • ingest  — parsing / cleaning of uploaded exports (Calls CSVs and logs, conversion sheets)
+  • store   — Google Sheets master store, batches, report cache, materialized views, snapshots
+  • metrics — firm calendar, KPI engine and every report computation
+  • render  — Streamlit sections; app.py is the page script that lays them out
+  • profiler — per-rerun timed spans and counters (Sheets calls, cache hits / misses) for the profiler panel
+  • jobs    — background ingest: uploads queued as jobs that a per-session worker thread parses and writes
+
+Submodules are not imported here, and gspread / google-auth / plotly / openpyxl load on first use,
+so importing the package (or any one module) stays cheap.
+"""
@@ -0,0 +1,239 @@
+# pji_reports/cli.py
+# Headless batch runner: the Firm Conversion, Practice Area, Intake and Calls reports for one or many
+# periods, without the Streamlit page.
+#
+#   python -m pji_reports.cli --period 2026-01..2026-09 --source exports/ --format csv,xlsx --workers 4
+#
+# Masters come from the configured store (.streamlit/secrets.toml, same as the app) or from a
+# directory of CSV / Parquet / Excel exports named like the tabs (Leads_PNCs_Master.csv, …) or their
+# logical keys (LEADS.parquet, …); exports never touch the Reports_Snapshot tab (a detached, in-memory
+# snapshot store serves them). Every period is one task. The first runs in the parent, which builds the
+# period-independent KPI cubes and views once; --workers > 1 forks worker processes (at most one per CPU)
+# that inherit those caches and take the remaining periods.
+
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import List, Dict, Tuple, Optional
+
+import pandas as pd
+import streamlit as st
+import streamlit.logger
+
+from .ingest import _fmt_hms
+from .store import _load_masters, _read_exports, _session_log, _sheet, _snapshots, _SnapshotStore, use_snapshots
+from .metrics import (
+    _calls_rollup, _conversion_summary, _INTAKE_ROW_KEYS, _intake_report, _month_bounds,
+    _practice_area_report, FUNNEL_RATIOS, intake_specialists, SUMMARY_LABELS, SUMMARY_ROWS,
+)
+
+REPORTS = ("conversion", "practice_area", "intake", "calls")
+FORMATS = ("csv", "json", "xlsx")
+CALLS_COLUMNS = ["Month-Year", "Category", "Name", "Total Calls", "Completed Calls", "Outgoing", "Received",
+                 "Forwarded to Voicemail", "Answered by Other", "Missed",
+                 "Avg Call Time", "Total Call Time", "Total Hold Time"]
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Periods
+# ───────────────────────────────────────────────────────────────────────────────
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{2})$")
+_QUARTER_RE = re.compile(r"^(\d{4})-Q([1-4])$", re.I)
+
+def _period(spec: str) -> Tuple[str, date, date]:
+    """One period spec → (label, start, end): YYYY, YYYY-Qn, YYYY-MM or YYYY-MM-DD:YYYY-MM-DD."""
+    spec = spec.strip()
+    if re.fullmatch(r"\d{4}", spec):
+        return spec, date(int(spec), 1, 1), date(int(spec), 12, 31)
+    m = _QUARTER_RE.match(spec)
+    if m:
+        year, q = int(m.group(1)), int(m.group(2))
+        return f"{year}-Q{q}", date(year, 3 * q - 2, 1), _month_bounds(year, 3 * q)[1]
+    m = _MONTH_RE.match(spec)
+    if m:
+        return spec, *_month_bounds(int(m.group(1)), int(m.group(2)))
+    if ":" in spec:
+        start, end = (date.fromisoformat(p.strip()) for p in spec.split(":", 1))
+        if start > end:
+            raise ValueError(f"period {spec!r}: start is after end")
+        return f"{start:%Y-%m-%d}..{end:%Y-%m-%d}", start, end
+    raise ValueError(f"unrecognised period {spec!r}")
+
+def _periods(specs: List[str]) -> List[Tuple[str, date, date]]:
+    """Expand the --period arguments; YYYY-MM..YYYY-MM is every month of the range (month-end backfills)."""
+    out = []
+    for spec in specs:
+        if ".." in spec:
+            first, last = (_MONTH_RE.match(p.strip()) for p in spec.split("..", 1))
+            if not first or not last:
+                raise ValueError(f"month range {spec!r} must be YYYY-MM..YYYY-MM")
+            for p in pd.period_range(first.group(0), last.group(0), freq="M"):
+                out.append(_period(p.strftime("%Y-%m")))
+        else:
+            out.append(_period(spec))
+    return list(dict.fromkeys(out))
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Report tables (one period)
+# ───────────────────────────────────────────────────────────────────────────────
+def _conversion_table(frames: Dict[str, pd.DataFrame], sd: date, ed: date) -> pd.DataFrame:
+    conversion = _conversion_summary(frames["LEADS"], frames["INIT"], frames["DISC"], frames["NCL"], sd, ed)
+    return pd.DataFrame({
+        "Metric": SUMMARY_LABELS,
+        "Value": [conversion["rows"][f"row{i}"] for i in range(1, len(SUMMARY_ROWS) + 1)],
+        "Unit": ["%" if key in FUNNEL_RATIOS else "count" for key in SUMMARY_ROWS],
+    })
+
+def _practice_area_table(frames: Dict[str, pd.DataFrame], sd: date, ed: date) -> pd.DataFrame:
+    _, report, pa_rollup = _practice_area_report(frames["INIT"], frames["DISC"], frames["NCL"], sd, ed)
+    cols = ["PNCs who met", "PNCs who met and retained", "% of PNCs who met and retained"]
+    attorneys = report.rename(columns={"Attorney_Display": "Display Name"})[
+        ["Practice Area", "Attorney", "Display Name"] + cols]
+    rollup = pa_rollup.reset_index().assign(Attorney="ALL", **{"Display Name": "ALL"})
+    return pd.concat([rollup[attorneys.columns], attorneys], ignore_index=True)
+
+def _intake_table(frames: Dict[str, pd.DataFrame], sd: date, ed: date) -> pd.DataFrame:
+    conv = [frames[k] for k in ("LEADS", "INIT", "DISC", "NCL")]
+    total_pncs = _conversion_summary(*conv, sd, ed)["rows"]["row2"]
+    results = _intake_report(*conv, sd, ed, total_pncs)
+    rows = [{"Intake Specialist": who, **{k: results[who][k] for k in _INTAKE_ROW_KEYS}}
+            for who in ["ALL"] + list(intake_specialists)]
+    return pd.DataFrame(rows)
+
+def _calls_table(frames: Dict[str, pd.DataFrame], sd: date, ed: date) -> pd.DataFrame:
+    """Calls rollup rows of every Month-Year the period overlaps (Calls are stored per month)."""
+    rollup, _ = _calls_rollup(frames["CALLS"])
+    months = {p.strftime("%Y-%m") for p in pd.period_range(sd, ed, freq="M")}
+    view = rollup.loc[rollup["Month-Year"].isin(months)]
+    avg_sec = (view["weighted_sum"] / view["Total Calls"].where(view["Total Calls"] > 0)).fillna(0)
+    return view.assign(**{"Avg Call Time": _fmt_hms(avg_sec),
+                          "Total Call Time": _fmt_hms(view["__total_sec"]),
+                          "Total Hold Time": _fmt_hms(view["__hold_sec"])})[CALLS_COLUMNS].reset_index(drop=True)
+
+_TABLES = {"conversion": _conversion_table, "practice_area": _practice_area_table,
+           "intake": _intake_table, "calls": _calls_table}
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Runner
+# ───────────────────────────────────────────────────────────────────────────────
+_worker_frames: Optional[Dict[str, pd.DataFrame]] = None
+
+def _init_worker(frames: Dict[str, pd.DataFrame]) -> None:
+    """Worker start-up: keep the masters for every task and leave snapshot writes to the parent."""
+    global _worker_frames
+    _worker_frames = frames
+    _snapshots().read_only = True
+
+def _run_period(period: Tuple[str, date, date], reports: Tuple[str, ...],
+                frames: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, pd.DataFrame]:
+    """Every requested report over one period, each prefixed with Period / Start / End columns."""
+    frames = _worker_frames if frames is None else frames
+    label, sd, ed = period
+    out = {}
+    for name in reports:
+        table = _TABLES[name](frames, sd, ed)
+        for col, value in (("End", ed.isoformat()), ("Start", sd.isoformat()), ("Period", label)):
+            table.insert(0, col, value)
+        out[name] = table
+    return out
+
+def run(frames: Dict[str, pd.DataFrame], periods: List[Tuple[str, date, date]],
+        reports: Tuple[str, ...] = REPORTS, workers: int = 1) -> Dict[str, pd.DataFrame]:
+    """Compute `reports` for every period and stack each report across periods.
+
+    The first period runs here and warms the process-wide caches (KPI cubes, materialized views); with
+    workers > 1 the rest go to forked processes that inherit them. Workers are capped at the CPU count
+    and need the fork start method — elsewhere they would rebuild every cube, so the run stays serial.
+    """
+    if not periods:
+        return {name: pd.DataFrame() for name in reports}
+    parts = [_run_period(periods[0], reports, frames)]
+    rest = periods[1:]
+    workers = min(workers, os.cpu_count() or 1, len(rest))
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                                 initializer=_init_worker, initargs=(frames,)) as pool:
+            parts += pool.map(_run_period, rest, [reports] * len(rest))
+    else:
+        parts += [_run_period(p, reports, frames) for p in rest]
+    return {name: pd.concat([p[name] for p in parts], ignore_index=True) for name in reports}
+
+def write_outputs(tables: Dict[str, pd.DataFrame], out_dir: str, formats: Tuple[str, ...]) -> List[str]:
+    """<report>.csv / <report>.json per report and one reports.xlsx with a sheet per report."""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name, table in tables.items():
+        if "csv" in formats:
+            path = os.path.join(out_dir, f"{name}.csv")
+            table.to_csv(path, index=False); written.append(path)
+        if "json" in formats:
+            path = os.path.join(out_dir, f"{name}.json")
+            table.to_json(path, orient="records", indent=1); written.append(path)
+    if "xlsx" in formats:
+        path = os.path.join(out_dir, "reports.xlsx")
+        with pd.ExcelWriter(path, engine="openpyxl") as xl:
+            for name, table in tables.items():
+                table.to_excel(xl, sheet_name=name, index=False)
+        written.append(path)
+    return written
+
+def _csv_choices(value: str, allowed: Tuple[str, ...]) -> Tuple[str, ...]:
+    picked = tuple(v.strip().lower().replace("-", "_") for v in value.split(",") if v.strip())
+    bad = [v for v in picked if v not in allowed]
+    if bad:
+        raise argparse.ArgumentTypeError(f"unknown {', '.join(bad)} (choose from {', '.join(allowed)})")
+    return picked
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m pji_reports.cli",
+                                 description="Compute the PJI Law reports for one or many periods without the UI.")
+    ap.add_argument("--period", action="append", required=True,
+                    help="YYYY, YYYY-Qn, YYYY-MM, YYYY-MM..YYYY-MM (each month) or YYYY-MM-DD:YYYY-MM-DD; repeatable")
+    ap.add_argument("--source", default="store",
+                    help="'store' (Google Sheets from .streamlit/secrets.toml) or a directory of exports")
+    ap.add_argument("--reports", default=",".join(REPORTS), type=lambda v: _csv_choices(v, REPORTS),
+                    help=f"comma-separated subset of {', '.join(REPORTS)}")
+    ap.add_argument("--format", default="csv", type=lambda v: _csv_choices(v, FORMATS),
+                    help=f"comma-separated subset of {', '.join(FORMATS)}")
+    ap.add_argument("--out", default="reports_out", help="output directory")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="worker processes (one period per task; at most one per CPU, fork platforms only)")
+    args = ap.parse_args(argv)
+    # Bare mode: no ScriptRunContext / cache-storage warnings (the option survives the lazy config parse)
+    st.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+
+    try:
+        periods = _periods(args.period)
+    except ValueError as e:
+        ap.error(str(e))
+
+    t0 = time.perf_counter()
+    if args.source == "store":
+        if _sheet() is None:
+            print("Master store not configured or unreachable (see .streamlit/secrets.toml).", file=sys.stderr)
+            return 2
+        frames = _load_masters()
+    elif os.path.isdir(args.source):
+        use_snapshots(_SnapshotStore(tab=None))
+        frames = _load_masters(_read_exports(args.source))
+    else:
+        ap.error(f"--source {args.source!r} is neither 'store' nor a directory")
+    rows = {k: len(v) for k, v in frames.items()}
+    t1 = time.perf_counter()
+    tables = run(frames, periods, args.reports, args.workers)
+    t2 = time.perf_counter()
+    for path in write_outputs(tables, args.out, args.format):
+        print(path)
+    print(f"{len(periods)} period(s) × {len(args.reports)} report(s); masters {rows}; "
+          f"load {t1 - t0:.2f}s, compute {t2 - t1:.2f}s ({args.workers} worker(s))", file=sys.stderr)
+    for event in _session_log().events():
+        print(f"log: [{event['level']}] {event['message']}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+# pji_reports/fakesheets.py
+# In-process stand-in for the Google Sheets master store: the gspread Spreadsheet / Worksheet surface the
+# app and gspread_dataframe use, backed by in-memory grids.
+#
+#   from pji_reports import fakesheets, store, synth
+#   sheet = fakesheets.FakeSpreadsheet(latency=0.15, quota_per_minute=60, real_time=False)
+#   sheet.load_frames(synth.masters(10_000))
+#   store.use_backend(sheet)          # every read / write path now talks to `sheet`
+#   ...
+#   sheet.calls, sheet.errors, sheet.elapsed
+#
+# Faults are the real gspread exceptions (APIError 429 / 5xx, WorksheetNotFound), so the retry and
+# fallback paths in store.py run unchanged. With real_time=False latency is only accumulated in
+# `elapsed` (a virtual clock that also drives the per-minute quota), so I/O benchmarks are deterministic.
+
+import json
+import random
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range
+
+from .profiler import api_call
+from .store import TAB_NAMES
+
+WORKSHEET_MAX_CELL_COUNT = 10_000_000   # Google's per-spreadsheet cell limit, enforced on resize
+_ERRORS = {
+    400: "INVALID_ARGUMENT",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+}
+_API_KIND = {   # fake method → the Sheets endpoint family gspread would call (profiler counters)
+    "worksheet": "metadata", "worksheets": "metadata",
+    "add_worksheet": "batch_update", "del_worksheet": "batch_update", "resize": "batch_update",
+    "values_get": "values_get", "get_all_values": "values_get", "batch_get": "values_get",
+    "update": "values_update", "update_cells": "values_update", "batch_update": "values_update",
+    "clear": "values_clear",
+}
+
+
+def api_error(code: int, message: str) -> APIError:
+    """A gspread APIError carrying a Sheets-style JSON error body."""
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({"error": {"code": code, "message": message,
+                                              "status": _ERRORS.get(code, "UNKNOWN")}}).encode()
+    return APIError(response)
+
+
+class FakeWorksheet:
+    """One tab: a list-of-rows grid of cell strings, sized like a sheet (row_count × col_count)."""
+
+    def __init__(self, spreadsheet: "FakeSpreadsheet", title: str, rows: int, cols: int, sheet_id: int):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.row_count = rows
+        self.col_count = cols
+        self._grid: List[List[str]] = []
+
+    def __repr__(self) -> str:
+        return f"<FakeWorksheet {self.title!r} id:{self.id}>"
+
+    # --- grid helpers (no API call) ---
+    def _values(self) -> List[List[str]]:
+        """Cell values as the API returns them: trailing empty rows and cells trimmed."""
+        rows = [list(r) for r in self._grid]
+        for r in rows:
+            while r and r[-1] == "":
+                r.pop()
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def _range(self, name: Optional[str]) -> List[List[str]]:
+        values = self._values()
+        if not name:
+            return values
+        g = a1_range_to_grid_range(name.split("!")[-1])
+        r0, c0 = g.get("startRowIndex", 0), g.get("startColumnIndex", 0)
+        r1, c1 = g.get("endRowIndex"), g.get("endColumnIndex")
+        return [r[c0:c1] for r in values[r0:r1]]
+
+    def _set(self, row: int, col: int, value) -> None:
+        if row > self.row_count or col > self.col_count:
+            raise api_error(400, f"Range ('{self.title}'!R{row}C{col}) exceeds grid limits. "
+                                 f"Max rows: {self.row_count}, max columns: {self.col_count}")
+        while len(self._grid) < row:
+            self._grid.append([])
+        line = self._grid[row - 1]
+        if len(line) < col:
+            line.extend([""] * (col - len(line)))
+        line[col - 1] = "" if value is None else str(value)
+
+    # --- gspread surface ---
+    def get_all_values(self, range_name: Optional[str] = None, **_) -> List[List[str]]:
+        self.spreadsheet._call("get_all_values", self.title)
+        values = self._range(range_name)
+        width = max((len(r) for r in values), default=0)
+        return [r + [""] * (width - len(r)) for r in values]
+
+    def batch_get(self, ranges: Iterable[str], **_) -> List[List[List[str]]]:
+        self.spreadsheet._call("batch_get", self.title)
+        return [self._range(r) for r in ranges]
+
+    def _put(self, values, range_name: Optional[str]) -> List[List[object]]:
+        g = a1_range_to_grid_range((range_name or "A1").split("!")[-1])
+        r0, c0 = g.get("startRowIndex", 0), g.get("startColumnIndex", 0)
+        values = [list(r) for r in values]
+        for i, row in enumerate(values):
+            for j, v in enumerate(row):
+                self._set(r0 + i + 1, c0 + j + 1, v)
+        return values
+
+    def update(self, values, range_name: Optional[str] = None, **_) -> Dict[str, object]:
+        self.spreadsheet._call("update", self.title)
+        values = self._put(values, range_name)
+        return {"updatedRows": len(values), "updatedCells": sum(len(r) for r in values)}
+
+    def batch_update(self, data, **_) -> Dict[str, object]:
+        self.spreadsheet._call("batch_update", self.title)
+        values = [self._put(item["values"], item["range"]) for item in data]
+        return {"totalUpdatedCells": sum(len(r) for block in values for r in block)}
+
+    def update_cells(self, cell_list, value_input_option: str = "RAW") -> Dict[str, object]:
+        self.spreadsheet._call("update_cells", self.title)
+        for cell in cell_list:
+            self._set(cell.row, cell.col, cell.value)
+        return {"updatedCells": len(cell_list)}
+
+    def clear(self) -> Dict[str, object]:
+        self.spreadsheet._call("clear", self.title)
+        self._grid = []
+        return {"clearedRange": f"'{self.title}'"}
+
+    def resize(self, rows: Optional[int] = None, cols: Optional[int] = None) -> Dict[str, object]:
+        self.spreadsheet._call("resize", self.title)
+        rows = self.row_count if rows is None else rows
+        cols = self.col_count if cols is None else cols
+        if rows * cols > WORKSHEET_MAX_CELL_COUNT:
+            raise api_error(400, f"This action would increase the number of cells in the workbook above "
+                                 f"the limit of {WORKSHEET_MAX_CELL_COUNT} cells.")
+        self.row_count, self.col_count = rows, cols
+        self._grid = [r[:cols] for r in self._grid[:rows]]
+        return {}
+
+
+class FakeSpreadsheet:
+    """
+    In-memory spreadsheet with fault injection and call accounting.
+
+    latency / jitter    seconds added to every API call (× a seeded uniform factor in [1 - jitter, 1 + jitter])
+    quota_per_minute    API calls allowed per rolling minute; the next one raises APIError 429
+    quota_every         every n-th API call raises APIError 429 (0 = never)
+    error_rate          probability of an APIError 503 on any call (seeded)
+    real_time           sleep for the latency; False only advances the virtual clock (`elapsed`)
+
+    `calls` / `errors` count API calls and injected faults per method; fail_next() scripts exact failures.
+    `on_call(method, tab)`, when set, runs for every call on the calling thread (e.g. to attribute calls
+    to a session).
+    """
+
+    def __init__(self, title: str = "PJI Masters (offline)", latency: float = 0.0, jitter: float = 0.0,
+                 quota_per_minute: Optional[int] = None, quota_every: int = 0, error_rate: float = 0.0,
+                 seed: int = 0, real_time: bool = True):
+        self.title = title
+        self.id = f"fake-{seed}"
+        self.url = f"https://docs.google.com/spreadsheets/d/{self.id}"
+        self.latency, self.jitter = latency, jitter
+        self.quota_per_minute, self.quota_every, self.error_rate = quota_per_minute, quota_every, error_rate
+        self.real_time = real_time
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.elapsed = 0.0
+        self._rng = random.Random(seed)
+        self._scripted: Dict[str, List[int]] = {}
+        self._window: List[float] = []
+        self._sheets: Dict[str, FakeWorksheet] = {}
+        self._next_id = 0
+        self._lock = threading.RLock()
+        self.on_call: Optional[Callable[[str, str], None]] = None
+
+    def __repr__(self) -> str:
+        return f"<FakeSpreadsheet {self.title!r} tabs:{len(self._sheets)} calls:{sum(self.calls.values())}>"
+
+    # --- fault plan and accounting ---
+    def _now(self) -> float:
+        return time.monotonic() if self.real_time else self.elapsed
+
+    def _call(self, method: str, tab: str = "") -> None:
+        """Account one API call: latency, then a scripted, quota or random fault."""
+        with self._lock:
+            self.calls[method] += 1
+            n = sum(self.calls.values())
+            delay = self.latency * (1 + self.jitter * (2 * self._rng.random() - 1)) if self.latency else 0.0
+            self.elapsed += delay
+            now = self._now()
+            self._window = [t for t in self._window if now - t < 60.0]
+            self._window.append(now)
+            scripted = self._scripted.get(method)
+            code = scripted.pop(0) if scripted else None
+            if code is None and ((self.quota_per_minute is not None and len(self._window) > self.quota_per_minute)
+                                 or (self.quota_every and n % self.quota_every == 0)):
+                code = 429
+            if code is None and self.error_rate and self._rng.random() < self.error_rate:
+                code = 503
+            if code is not None:
+                self.errors[method] += 1
+        if self.on_call is not None:
+            self.on_call(method, tab)
+        api_call(_API_KIND.get(method, "metadata"), delay, error=code is not None)
+        if delay and self.real_time:
+            time.sleep(delay)
+        if code == 429:
+            raise api_error(429, "Quota exceeded for quota metric 'Read requests' and limit "
+                                 "'Read requests per minute per user'")
+        if code is not None:
+            raise api_error(code, f"The service is currently unavailable ({method} {tab})".strip())
+
+    def fail_next(self, method: str, n: int = 1, code: int = 503) -> None:
+        """Make the next `n` calls of `method` raise APIError `code`."""
+        with self._lock:
+            self._scripted.setdefault(method, []).extend([code] * n)
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.calls.clear(); self.errors.clear()
+            self.elapsed = 0.0
+            self._window = []
+
+    # --- gspread surface ---
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self._call("worksheet", title)
+        try:
+            return self._sheets[title]
+        except KeyError:
+            raise WorksheetNotFound(title) from None
+
+    def worksheets(self, exclude_hidden: bool = False) -> List[FakeWorksheet]:
+        self._call("worksheets")
+        return list(self._sheets.values())
+
+    def add_worksheet(self, title: str, rows: int, cols: int, index: Optional[int] = None) -> FakeWorksheet:
+        self._call("add_worksheet", title)
+        with self._lock:
+            if title in self._sheets:
+                raise api_error(400, f'A sheet with the name "{title}" already exists. Please enter another name.')
+            return self._add(title, rows, cols)
+
+    def del_worksheet(self, worksheet: FakeWorksheet) -> None:
+        self._call("del_worksheet", worksheet.title)
+        with self._lock:
+            self._sheets.pop(worksheet.title, None)
+
+    def values_get(self, range: str, params=None) -> Dict[str, object]:
+        """What gspread_dataframe.get_as_dataframe reads: {'range', 'values'} of a quoted tab title or A1 range."""
+        title, _, a1 = range.partition("!")
+        title = title[1:-1].replace("''", "'") if title.startswith("'") else title
+        self._call("values_get", title)
+        if title not in self._sheets:
+            raise api_error(400, f"Unable to parse range: {range}")
+        return {"range": range, "majorDimension": "ROWS", "values": self._sheets[title]._range(a1)}
+
+    # --- seeding / inspection (not API calls) ---
+    def _add(self, title: str, rows: int, cols: int) -> FakeWorksheet:
+        self._next_id += 1
+        ws = self._sheets[title] = FakeWorksheet(self, title, rows, cols, self._next_id)
+        return ws
+
+    def load_frame(self, title: str, df: pd.DataFrame) -> FakeWorksheet:
+        """Put `df` (header row + string cells) on tab `title`, creating or replacing it."""
+        with self._lock:
+            ws = self._sheets.get(title) or self._add(title, 0, 0)
+            cells = df.astype(object).where(df.notna(), "").astype(str).to_numpy().tolist()
+            ws._grid = [[str(c) for c in df.columns]] + cells
+            ws.row_count, ws.col_count = max(len(ws._grid), 1000), max(df.shape[1], 26)
+            return ws
+
+    def load_frames(self, frames: Dict[str, pd.DataFrame], names: Dict[str, str] = TAB_NAMES) -> None:
+        """Seed masters keyed like TAB_NAMES (e.g. pji_reports.synth.masters()) onto their tabs."""
+        for key, df in frames.items():
+            self.load_frame(names.get(key, key), df)
+
+    def frame(self, title: str) -> pd.DataFrame:
+        """Current content of a tab as a string DataFrame (header = first row)."""
+        values = self._sheets[title]._values() if title in self._sheets else []
+        if not values:
+            return pd.DataFrame()
+        width = max(len(r) for r in values)
+        rows = [r + [""] * (width - len(r)) for r in values]
+        return pd.DataFrame(rows[1:], columns=rows[0])
+
+
+class FakeClient:
+    """gspread.Client stand-in: every open_* returns the same spreadsheet."""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open_by_url(self, url: str) -> FakeSpreadsheet:
+        return self.spreadsheet
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        return self.spreadsheet
+
+    def open(self, title: str, folder_id: Optional[str] = None) -> FakeSpreadsheet:
+        return self.spreadsheet
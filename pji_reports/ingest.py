@@ -0,0 +1,628 @@
+# pji_reports/ingest.py
+# File parsing, header detection and cell-level cleaning for uploaded exports
+
+import re
+import hashlib
+import datetime as dt
+from datetime import date, datetime
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+
+def _clean_datestr(x):
+    if pd.isna(x): return x
+    s = str(x).strip()
+    s = re.sub(r"\s+at\s+", " ", s, flags=re.I)
+    s = re.sub(r"\s+(ET|EDT|EST|CT|CDT|CST|MT|MDT|MST|PT|PDT)\b", "", s)
+    return s
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Calls processing utilities
+# ───────────────────────────────────────────────────────────────────────────────
+REQUIRED_COLUMNS_CALLS: List[str] = [
+    "Name", "Total Calls", "Completed Calls", "Outgoing", "Received",
+    "Forwarded to Voicemail", "Answered by Other", "Missed",
+    "Avg Call Time", "Total Call Time", "Total Hold Time"
+]
+ALLOWED_CALLS: List[str] = [
+    "Anastasia Economopoulos","Aneesah Shaik","Azariah","Chloe","Donnay","Earl",
+    "Faeryal Sahadeo","Kaithlyn","Micayla Sam","Nathanial Beneke","Nobuhle",
+    "Rialet","Riekie Van Ellinckhuyzen","Shaylin Steyn","Sihle Gadu",
+    "Thabang Tshubyane","Tiffany",
+]
+CATEGORY_CALLS: Dict[str, str] = {
+    "Anastasia Economopoulos":"Intake","Aneesah Shaik":"Intake","Azariah":"Intake","Chloe":"Intake IC",
+    "Donnay":"Receptionist","Earl":"Intake","Faeryal Sahadeo":"Intake","Kaithlyn":"Intake",
+    "Micayla Sam":"Intake","Nathanial Beneke":"Intake","Nobuhle":"Intake IC","Rialet":"Intake",
+    "Riekie Van Ellinckhuyzen":"Receptionist","Maria Van Ellinckhuyzen":"Receptionist",
+    "Shaylin Steyn":"Receptionist","Sihle Gadu":"Intake","Thabang Tshubyane":"Intake","Tiffany":"Intake",
+}
+RENAME_NAME_CALLS = {"Riekie Van Ellinckhuyzen": "Maria Van Ellinckhuyzen"}
+
+# Durations are persisted as integer seconds next to their H:MM:SS display strings
+CALL_SECONDS_COLS = {"__avg_sec": "Avg Call Time", "__total_sec": "Total Call Time", "__hold_sec": "Total Hold Time"}
+
+def _fmt_hms(seconds: pd.Series) -> pd.Series:
+    """Seconds → 'H:MM:SS' (hours are not wrapped into days)."""
+    s = pd.to_numeric(seconds, errors="coerce").fillna(0).round().astype("int64")
+    h, rem = np.divmod(s.to_numpy(), 3600)
+    m, sec = np.divmod(rem, 60)
+    return pd.Series([f"{a}:{b:02d}:{c:02d}" for a, b, c in zip(h, m, sec)], index=seconds.index, dtype=object)
+
+def file_md5(uploaded_file) -> str:
+    pos = uploaded_file.tell()
+    uploaded_file.seek(0); data = uploaded_file.read()
+    uploaded_file.seek(pos if pos is not None else 0)
+    return hashlib.md5(data).hexdigest()
+
+def month_key_from_range(start: dt.date, end: dt.date) -> str:
+    return f"{start.year}-{start.month:02d}"
+
+def validate_single_month_range(start: dt.date, end: dt.date) -> Tuple[bool, str]:
+    if start > end:
+        return False, "Start date must be on or before End date."
+    if (start.year, start.month) != (end.year, end.month):
+        return False, "Please select a range within a single calendar month."
+    return True, ""
+
+# Zoom per-user summary export: normalized header alternatives of each Call_Report_Master column
+CALLS_SYNONYMS = {
+    "Name":["name","user name","username","display name"],
+    "Total Calls":["total calls","calls total","total number of calls","total call count","total"],
+    "Completed Calls":["completed calls","completed","answered calls","handled calls","calls answered"],
+    "Outgoing":["outgoing","outgoing calls","outbound","outbound calls"],
+    "Received":["received","incoming","incoming calls"],
+    "Forwarded to Voicemail":["forwarded to voicemail","to voicemail","voicemail forwarded","voicemail"],
+    "Answered by Other":["answered by other","answered by others","answered by other member","answered by other user","answered by other extension"],
+    "Missed":["missed","missed calls","abandoned","ring no answer"],
+    "Avg Call Time":["avg call time","average call time","avg call duration","average call duration","avg talk time","average talk time"],
+    "Total Call Time":["total call time","total call duration","total talk time"],
+    "Total Hold Time":["total hold time","hold time total","total on hold"],
+}
+
+def process_calls_csv(raw: pd.DataFrame, period_key: str) -> pd.DataFrame:
+    def norm(s: str) -> str:
+        s = s.strip().lower()
+        s = re.sub(r"[\s_]+"," ",s); s = re.sub(r"[^a-z0-9 ]","",s)
+        return s
+    raw.columns = [c.strip() for c in raw.columns]
+    col_norm = {c: norm(c) for c in raw.columns}
+    rename_map, used = {}, set()
+    for canonical, alts in CALLS_SYNONYMS.items():
+        for actual, n in col_norm.items():
+            if actual in used: continue
+            if n in alts:
+                rename_map[actual] = canonical; used.add(actual); break
+    df = raw.rename(columns=rename_map).copy()
+
+    # Combine split incoming/outgoing if present
+    def norm2(s: str) -> str:
+        return re.sub(r"[^a-z0-9 ]","",re.sub(r"[\s_]+"," ",s.strip().lower()))
+    incoming = [c for c in raw.columns if norm2(c) in {"incoming internal","incoming external","incoming"}]
+    outgoing = [c for c in raw.columns if norm2(c) in {"outgoing internal","outgoing external","outgoing"}]
+    if incoming:
+        base = pd.to_numeric(df.get("Received", 0), errors="coerce").fillna(0)
+        for c in incoming: base += pd.to_numeric(df.get(c, 0), errors="coerce").fillna(0)
+        df["Received"] = base
+    if outgoing:
+        base = pd.to_numeric(df.get("Outgoing", 0), errors="coerce").fillna(0)
+        for c in outgoing: base += pd.to_numeric(df.get(c, 0), errors="coerce").fillna(0)
+        df["Outgoing"] = base
+
+    missing = [c for c in REQUIRED_COLUMNS_CALLS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Calls CSV is missing columns after normalization: {missing} "
+                         f"(headers detected: {', '.join(map(str, raw.columns))})")
+
+    df = df[df["Name"].isin(ALLOWED_CALLS)].copy()
+    df["Name"] = df["Name"].replace(RENAME_NAME_CALLS)
+    df["Category"] = df["Name"].map(lambda n: CATEGORY_CALLS.get(n, "Other"))
+
+    for c in ["Total Calls","Completed Calls","Outgoing","Received","Forwarded to Voicemail","Answered by Other","Missed"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0).astype(int)
+
+    df["_avg_sec"]   = pd.to_timedelta(df["Avg Call Time"], errors="coerce").dt.total_seconds().fillna(0.0)
+    df["_total_sec"] = pd.to_timedelta(df["Total Call Time"], errors="coerce").dt.total_seconds().fillna(0.0)
+    df["_hold_sec"]  = pd.to_timedelta(df["Total Hold Time"], errors="coerce").dt.total_seconds().fillna(0.0)
+    df["Month-Year"] = period_key
+
+    grouped = df.groupby(["Month-Year","Category","Name"], as_index=False).agg(
+        {"Total Calls":"sum","Completed Calls":"sum","Outgoing":"sum","Received":"sum",
+         "Forwarded to Voicemail":"sum","Answered by Other":"sum","Missed":"sum",
+         "_total_sec":"sum","_hold_sec":"sum"}
+    )
+    totals = df.groupby(["Month-Year","Category","Name"], as_index=False).agg(
+        total_calls_sum=("Total Calls","sum"),
+        avg_weighted_sum=("_avg_sec", lambda s: (s * df.loc[s.index,"Total Calls"]).sum()),
+    )
+    totals["avg_sec_weighted"] = totals.apply(
+        lambda r: (r["avg_weighted_sum"]/r["total_calls_sum"]) if r["total_calls_sum"]>0 else 0.0, axis=1)
+
+    out = grouped.merge(
+        totals[["Month-Year","Category","Name","avg_sec_weighted"]],
+        on=["Month-Year","Category","Name"], how="left"
+    )
+    out["Avg Call Time"]   = _fmt_hms(out["avg_sec_weighted"])
+    out["Total Call Time"] = _fmt_hms(out["_total_sec"])
+    out["Total Hold Time"] = _fmt_hms(out["_hold_sec"])
+
+    out["__avg_sec"]   = out["avg_sec_weighted"].round().astype(int)
+    out["__total_sec"] = out["_total_sec"].round().astype(int)
+    out["__hold_sec"]  = out["_hold_sec"].round().astype(int)
+
+    out = out[["Category","Name","Total Calls","Completed Calls","Outgoing","Received",
+               "Forwarded to Voicemail","Answered by Other","Missed",
+               "Avg Call Time","Total Call Time","Total Hold Time","Month-Year",
+               "__avg_sec","__hold_sec","__total_sec"]].sort_values(["Category","Name"]).reset_index(drop=True)
+    return out
+
+# Per-call detail logs: streamed in chunks and reduced to the monthly rows above plus an
+# hour × weekday × staff cube (Call_Hourly_Cube_Master). Raw call rows are never stored.
+CALLS_INGEST_MODES = ["Per-user summary export", "Per-call detail log"]
+CALL_LOG_CHUNK_ROWS = 50_000
+CALL_LOG_TIME_FORMATS = ("%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %I:%M %p", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M",
+                         "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M")
+CALL_HOURS_COLS = ["Month-Year","Category","Name","Weekday","Hour",
+                   "Calls","Completed","Missed","Talk Seconds"]
+CALL_LOG_SYNONYMS = {
+    "Start Time":  ["start time","date time","date and time","call start time","call time","time"],
+    "Direction":   ["direction","call direction"],
+    "Result":      ["result","call result","status"],
+    "Duration":    ["duration","call duration","talk time","duration hhmmss","duration seconds"],
+    "Hold Time":   ["hold time","hold duration","total hold time"],
+    "User":        ["user","user name","extension name","owner","name"],
+    "Caller Name": ["caller name","from name","caller"],
+    "Callee Name": ["callee name","to name","callee"],
+}
+_CALL_SUM_COLS = ["Total Calls","Completed Calls","Outgoing","Received",
+                  "Forwarded to Voicemail","Answered by Other","Missed","_total_sec","_hold_sec"]
+
+def _call_log_columns(columns) -> Dict[str, str]:
+    """Map the log's headers onto CALL_LOG_SYNONYMS keys (actual header → canonical)."""
+    def norm(s: str) -> str:
+        return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]", " ", str(s).strip().lower())).strip()
+    found = {}
+    for canonical, alts in CALL_LOG_SYNONYMS.items():
+        actual = next((c for c in columns if norm(c) in alts and c not in found), None)
+        if actual is not None: found[actual] = canonical
+    return found
+
+def _duration_seconds(s: pd.Series) -> pd.Series:
+    """Plain seconds or H:MM:SS cells → float seconds (0 when unreadable)."""
+    secs = pd.to_numeric(s, errors="coerce")
+    rest = secs.isna() & s.notna()
+    if rest.any():
+        secs.loc[rest] = pd.to_timedelta(s.loc[rest].astype(str).str.strip(), errors="coerce").dt.total_seconds()
+    return secs.fillna(0.0)
+
+def _aggregate_call_log_chunk(chunk: pd.DataFrame, period_key: str) -> Tuple[pd.DataFrame, pd.DataFrame, int]:
+    """One chunk of a per-call log → (per-name partial sums, cube partial sums, calls outside the period)."""
+    raw_ts = chunk["Start Time"].astype(str).str.strip()
+    ts = pd.Series(pd.NaT, index=chunk.index, dtype="datetime64[ns]")
+    for fmt in CALL_LOG_TIME_FORMATS:
+        rest = ts.isna()
+        if not rest.any(): break
+        ts.loc[rest] = pd.to_datetime(raw_ts.loc[rest], format=fmt, errors="coerce")
+    rest = ts.isna() & chunk["Start Time"].notna()
+    if rest.any():
+        ts.loc[rest] = pd.to_datetime(raw_ts.loc[rest].map(_clean_datestr), errors="coerce", format="mixed")
+    year, month = (int(x) for x in period_key.split("-"))
+    in_period = ts.dt.year.eq(year) & ts.dt.month.eq(month)
+    skipped = int((~in_period).sum())
+    chunk, ts = chunk.loc[in_period], ts.loc[in_period]
+
+    direction = chunk.get("Direction", pd.Series("", index=chunk.index)).astype(str).str.strip().str.lower()
+    outbound = direction.str.startswith("out")
+    if "User" in chunk.columns:
+        name = chunk["User"]
+    else:
+        name = chunk.get("Callee Name", pd.Series("", index=chunk.index)).where(
+            ~outbound, chunk.get("Caller Name", pd.Series("", index=chunk.index)))
+    name = name.astype(str).str.strip()
+    keep = name.isin(ALLOWED_CALLS)
+    chunk, ts, outbound, name = chunk.loc[keep], ts.loc[keep], outbound.loc[keep], name.loc[keep]
+    name = name.replace(RENAME_NAME_CALLS)
+
+    talk = _duration_seconds(chunk["Duration"])
+    result = chunk.get("Result", pd.Series("", index=chunk.index)).astype(str).str.strip().str.lower()
+    voicemail = result.str.contains("voicemail")
+    by_other = result.str.contains("answered by other|other member")
+    missed = result.str.contains("missed|no answer|abandon")
+    if "Result" in chunk.columns:
+        completed = result.str.contains("connected|answered|completed") & ~by_other
+    else:
+        completed = talk > 0
+    calls = pd.DataFrame({
+        "Name": name,
+        "Total Calls": 1,
+        "Completed Calls": completed.astype(int),
+        "Outgoing": outbound.astype(int),
+        "Received": (~outbound).astype(int),
+        "Forwarded to Voicemail": voicemail.astype(int),
+        "Answered by Other": by_other.astype(int),
+        "Missed": missed.astype(int),
+        "_total_sec": talk,
+        "_hold_sec": _duration_seconds(chunk["Hold Time"]) if "Hold Time" in chunk.columns else 0.0,
+        "Weekday": ts.dt.weekday,
+        "Hour": ts.dt.hour,
+    })
+    monthly = calls.groupby("Name", as_index=False)[_CALL_SUM_COLS].sum()
+    cube = calls.groupby(["Name","Weekday","Hour"], as_index=False).agg(
+        Calls=("Total Calls","sum"), Completed=("Completed Calls","sum"),
+        Missed=("Missed","sum"), **{"Talk Seconds": ("_total_sec","sum")})
+    return monthly, cube, skipped
+
+def process_call_log_csv(upload, period_key: str,
+                         chunk_rows: int = CALL_LOG_CHUNK_ROWS) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, int]]:
+    """Stream a Zoom per-call log and reduce it to Call_Report_Master rows plus the hourly cube.
+
+    Only per-chunk partial sums are held in memory, so 100k+ row months read in bounded space.
+    """
+    reader = pd.read_csv(upload, chunksize=chunk_rows, dtype=str, skipinitialspace=True)
+    monthly_parts, cube_parts = [], []
+    stats = {"rows": 0, "chunks": 0, "skipped": 0}
+    mapping = None
+    for chunk in reader:
+        if mapping is None:
+            mapping = _call_log_columns(chunk.columns)
+            have = set(mapping.values())
+            missing = [c for c in ("Start Time", "Duration") if c not in have]
+            if "User" not in have and not {"Caller Name", "Callee Name"} <= have:
+                missing.append("User (or Caller Name + Callee Name)")
+            if missing:
+                raise ValueError(f"Call log is missing columns after normalization: {missing} "
+                                 f"(headers detected: {', '.join(map(str, chunk.columns))})")
+        chunk = chunk.rename(columns=mapping)
+        monthly, cube, skipped = _aggregate_call_log_chunk(chunk, period_key)
+        monthly_parts.append(monthly); cube_parts.append(cube)
+        stats["rows"] += len(chunk); stats["chunks"] += 1; stats["skipped"] += skipped
+
+    if mapping is None:
+        raise ValueError("Call log is empty.")
+    monthly = (pd.concat(monthly_parts, ignore_index=True)
+                 .groupby("Name", as_index=False)[_CALL_SUM_COLS].sum())
+    monthly["Category"] = monthly["Name"].map(lambda n: CATEGORY_CALLS.get(n, "Other"))
+    monthly["Month-Year"] = period_key
+    # Per total call, as in the summary exports — the Calls rollup weights __avg_sec by Total Calls
+    avg_sec = (monthly["_total_sec"] / monthly["Total Calls"].where(monthly["Total Calls"] > 0)).fillna(0.0)
+    monthly["Avg Call Time"]   = _fmt_hms(avg_sec)
+    monthly["Total Call Time"] = _fmt_hms(monthly["_total_sec"])
+    monthly["Total Hold Time"] = _fmt_hms(monthly["_hold_sec"])
+    for sec_col, src in (("__avg_sec", avg_sec), ("__total_sec", monthly["_total_sec"]), ("__hold_sec", monthly["_hold_sec"])):
+        monthly[sec_col] = src.round().astype(int)
+    monthly = monthly[["Category","Name","Total Calls","Completed Calls","Outgoing","Received",
+                       "Forwarded to Voicemail","Answered by Other","Missed",
+                       "Avg Call Time","Total Call Time","Total Hold Time","Month-Year",
+                       "__avg_sec","__hold_sec","__total_sec"]].sort_values(["Category","Name"]).reset_index(drop=True)
+
+    cube = (pd.concat(cube_parts, ignore_index=True)
+              .groupby(["Name","Weekday","Hour"], as_index=False)[["Calls","Completed","Missed","Talk Seconds"]].sum())
+    cube["Talk Seconds"] = cube["Talk Seconds"].round().astype(int)
+    cube["Category"] = cube["Name"].map(lambda n: CATEGORY_CALLS.get(n, "Other"))
+    cube["Month-Year"] = period_key
+    cube = cube[CALL_HOURS_COLS].sort_values(["Category","Name","Weekday","Hour"]).reset_index(drop=True)
+    return monthly, cube, stats
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Conversion uploads, cell cleaning and header detection
+# ───────────────────────────────────────────────────────────────────────────────
+def _read_any(upload):
+    """Uploaded CSV / Excel file as a DataFrame with stripped headers (Excel engines load on first use)."""
+    if upload is None: return None
+    name = (upload.name or "").lower()
+    if name.endswith(".csv"):
+        try: df = pd.read_csv(upload)
+        except Exception:
+            upload.seek(0); df = pd.read_csv(upload, engine="python")
+        df.columns = [str(c).strip() for c in df.columns]; return df
+    try:
+        if name.endswith(".xlsx"):
+            df = pd.read_excel(upload, engine="openpyxl")
+        elif name.endswith(".xls"):
+            df = pd.read_excel(upload, engine="xlrd")
+        else:
+            df = pd.read_excel(upload)
+    except Exception:
+        upload.seek(0); df = pd.read_excel(upload)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+def _read_headers(upload) -> List[str]:
+    """Header row of an uploaded CSV / Excel file, without reading its data; the file is rewound."""
+    name = (upload.name or "").lower()
+    try:
+        if name.endswith(".csv"):
+            try: df = pd.read_csv(upload, nrows=0)
+            except Exception:
+                upload.seek(0); df = pd.read_csv(upload, nrows=0, engine="python")
+        else:
+            df = pd.read_excel(upload, nrows=0, engine="openpyxl" if name.endswith(".xlsx") else None)
+    finally:
+        upload.seek(0)
+    return [str(c).strip() for c in df.columns]
+
+def detect_upload_kind(columns) -> Tuple[Optional[str], Optional[str]]:
+    """(logical key, Calls ingest mode) an export's headers identify, or (None, None).
+
+    Conversion exports are told apart by their date headers (NCL: the signed-CLA/payment date; Leads:
+    Stage with both meeting dates; Initial_Consultation / Discovery_Meeting: only their own date), Zoom
+    files by the Calls column synonyms (a per-call log has a start time and a duration per row).
+    """
+    norms = {_norm_header(c) for c in columns}
+    ic = _norm_header("Initial Consultation With Pji Law") in norms
+    dm = _norm_header("Discovery Meeting With Pji Law") in norms
+    if any(all(tok in n for tok in ("date", "signed", "payment")) for n in norms):
+        return "NCL", None
+    if "stage" in norms and ic and dm:
+        return "LEADS", None
+    if ic != dm:
+        return ("INIT" if ic else "DISC"), None
+    log_cols = set(_call_log_columns(columns).values())
+    if {"Start Time", "Duration"} <= log_cols and ("User" in log_cols or {"Caller Name", "Callee Name"} <= log_cols):
+        return "CALLS", CALLS_INGEST_MODES[1]
+    summary = {canonical for canonical, alts in CALLS_SYNONYMS.items() if norms & set(alts)}
+    if {"Name", "Total Calls"} <= summary and len(summary) >= len(CALLS_SYNONYMS) // 2:
+        return "CALLS", CALLS_INGEST_MODES[0]
+    return None, None
+
+# Row keys uploads and the re-dedupe tool drop duplicates on: (column, kind) per master
+DEDUPE_KEYS: Dict[str, List[Tuple[str, str]]] = {
+    "LEADS":      [("Email", "text"), ("Matter ID", "text"), ("Stage", "text"),
+                   ("Initial Consultation With Pji Law", "date"), ("Discovery Meeting With Pji Law", "date")],
+    "INIT":       [("Email", "text"), ("Matter ID", "text"), ("Initial Consultation With Pji Law", "date"),
+                   ("Sub Status", "text")],
+    "DISC":       [("Email", "text"), ("Matter ID", "text"), ("Discovery Meeting With Pji Law", "date"),
+                   ("Sub Status", "text")],
+    "NCL":        [("Client Name", "text"), ("Matter Number/Link", "text"),
+                   ("Date we had BOTH the signed CLA and full payment", "date"),
+                   ("Retained With Consult (Y/N)", "text")],
+    "CALL_HOURS": [("Month-Year", "text"), ("Name", "text"), ("Weekday", "text"), ("Hour", "text")],
+    "CALLS":      [("Month-Year", "text"), ("Name", "text"), ("Category", "text")],
+}
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Upsert engine: 64-bit row hashes over DEDUPE_KEYS, persisted in the masters as __row_hash
+# ───────────────────────────────────────────────────────────────────────────────
+# Each key part is hashed in a canonical form, so a stored row and the same row in a new export agree:
+# text stripped with blanks as "", dates as the timestamp the store parses them to (masters are read with
+# their date headers parsed, uploads carry the export's own date strings).
+ROW_HASH_COL = "__row_hash"
+_ROW_HASH_RE = r"h[0-9a-f]{16}"           # 'h' + 16 hex digits: Sheets keeps the cell as text, never a number
+_HASH_MIX = np.uint64(0x100000001B3)      # FNV-1 64-bit prime, folds the per-part hashes into one
+
+# Export date layouts parsed with a strict format before falling back to the store's (slow) mixed parse
+_KEY_DATE_FORMATS = ("ISO8601", "%m/%d/%Y %I:%M%p", "%m/%d/%Y %I:%M %p", "%m/%d/%Y", "%b %d, %Y %I:%M%p")
+
+def _parse_key_dates(values: pd.Series) -> pd.Series:
+    """Cleaned date strings → the timestamps _normalize_master parses them to."""
+    ts = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    todo = values.ne("")
+    for fmt in _KEY_DATE_FORMATS + ("mixed",):
+        if not todo.any():
+            break
+        ts[todo] = pd.to_datetime(values[todo], errors="coerce", format=fmt)
+        todo &= ts.isna()
+    return ts
+
+def _key_part_hash(s: pd.Series, kind: str) -> np.ndarray:
+    if kind == "date" and pd.api.types.is_datetime64_any_dtype(s):
+        return pd.util.hash_array(s.to_numpy(dtype="datetime64[ns]").view("int64"))
+    codes, uniques = pd.factorize(s.fillna("").astype(str).str.strip())
+    if kind == "date":
+        ts = _parse_key_dates(pd.Series(uniques, dtype=object).map(_clean_datestr))
+        return pd.util.hash_array(ts.to_numpy(dtype="datetime64[ns]").view("int64"))[codes]
+    return pd.util.hash_array(np.asarray(uniques, dtype=object), categorize=False)[codes]
+
+def _dedupe_columns(df: pd.DataFrame, logical_key: str) -> List[Tuple[str, str]]:
+    """DEDUPE_KEYS of a master (KeyError for an unknown one), with NCL's retained flag resolved to the
+    column the reports read (_ncl_columns), whatever its header."""
+    keys = DEDUPE_KEYS[logical_key]
+    if logical_key == "NCL":
+        flag_col = _ncl_columns(df)[2]
+        keys = [(flag_col, kind) if col == "Retained With Consult (Y/N)" and flag_col else (col, kind)
+                for col, kind in keys]
+    return keys
+
+def _key_hash(df: pd.DataFrame, logical_key: str) -> np.ndarray:
+    """uint64 hash of every row's DEDUPE_KEYS (each distinct value is hashed once)."""
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for col, kind in _dedupe_columns(df, logical_key):
+        part = df[col] if col in df.columns else pd.Series("", index=df.index)
+        hashes = hashes * _HASH_MIX ^ _key_part_hash(part, kind)
+    return hashes
+
+def _hash_text(hashes: np.ndarray) -> np.ndarray:
+    """__row_hash cells of uint64 hashes."""
+    hexed = np.asarray(hashes, dtype=np.uint64).astype(">u8").tobytes().hex().encode()
+    return np.char.add("h", np.frombuffer(hexed, dtype="S16").astype(str))
+
+def _stored_hashes(df: pd.DataFrame, logical_key: str) -> pd.Series:
+    """__row_hash of stored rows: as persisted where well-formed, computed for the rest (older rows)."""
+    stored = (df[ROW_HASH_COL].fillna("").astype(str) if ROW_HASH_COL in df.columns
+              else pd.Series("", index=df.index, dtype=object))
+    missing = ~stored.str.fullmatch(_ROW_HASH_RE).to_numpy(dtype=bool)
+    if missing.any():
+        stored = stored.astype(object)
+        stored.iloc[np.flatnonzero(missing)] = _hash_text(_key_hash(df.loc[missing], logical_key))
+    return stored
+
+def _batch_ids(df: pd.DataFrame) -> np.ndarray:
+    if "__batch_id" not in df.columns:
+        return np.full(len(df), "", dtype=object)
+    return df["__batch_id"].fillna("").astype(str).str.strip().to_numpy(dtype=object)
+
+def _dedupe_rows(df: pd.DataFrame, logical_key: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(rows unique on DEDUPE_KEYS + batch, keeping the last of each, with a fresh __row_hash; the duplicates).
+    Every row is re-hashed, so key cells edited in the sheet are picked up."""
+    keys = _key_hash(df, logical_key)
+    last = ~pd.DataFrame({"key": keys, "batch": _batch_ids(df)}).duplicated(keep="last").to_numpy()
+    unique = df.loc[last].copy()
+    unique[ROW_HASH_COL] = _hash_text(keys[last])
+    return unique, df.loc[~last]
+
+def _upsert_rows(current: pd.DataFrame, incoming: pd.DataFrame, logical_key: str,
+                 replace_keys: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Merge `incoming` into the stored master `current`: (merged frame, stored rows it replaced).
+
+    An incoming row replaces the stored row with the same DEDUPE_KEYS and batch (other batches of a
+    person survive); within `incoming` the last duplicate wins. With replace_keys, stored rows sharing an
+    incoming row's keys are replaced in every batch. Stored rows are matched on their persisted
+    __row_hash, so only the incoming rows are hashed; the merged frame carries __row_hash for every row.
+    """
+    keys = _hash_text(_key_hash(incoming, logical_key))
+    batches = _batch_ids(incoming)
+    last = ~pd.DataFrame({"key": keys, "batch": batches}).duplicated(keep="last").to_numpy()
+    if current is None or current.empty:
+        merged = incoming.loc[last].copy()
+        merged[ROW_HASH_COL] = keys[last]
+        return merged, pd.DataFrame()
+    stored = _stored_hashes(current, logical_key)
+    replaced = stored.isin(keys).to_numpy(dtype=bool, copy=True)
+    if not replace_keys and replaced.any():
+        # Same keys: replaced only within the same batch
+        pairs = set(zip(keys, batches))
+        idx = np.flatnonzero(replaced)
+        replaced[idx] = [(k, b) in pairs for k, b in zip(stored.to_numpy()[idx], _batch_ids(current.iloc[idx]))]
+    merged = pd.concat([current.loc[~replaced], incoming.loc[last]], ignore_index=True)
+    merged[ROW_HASH_COL] = np.concatenate([stored.to_numpy(dtype=object)[~replaced], keys[last]])
+    return merged, current.loc[replaced]
+
+
+def _text(series: pd.Series) -> pd.Series:
+    """Stripped text view of a column; typed category columns are already stripped."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    return series.astype(str).str.strip()
+
+def _is_no(series: pd.Series) -> pd.Series:
+    """'(Y/N)' flag cell reads as 'N' (bool flags from the typed profile hold True unless 'N')."""
+    if series.dtype == bool:
+        return ~series
+    return _text(series).str.upper().eq("N")
+
+# Helper to find a column by name (case-insensitive)
+def _find_col(df: pd.DataFrame, candidates: list[str]) -> Optional[str]:
+    if df is None or df.empty: return None
+    cols = {c.lower().strip(): c for c in df.columns}
+    for cand in candidates:
+        k = cand.lower().strip()
+        if k in cols: return cols[k]
+    return None
+
+_BLANK_TOKENS = {"", "nan", "none", "na", "null"}
+
+def _is_blank(series: pd.Series) -> pd.Series:
+    if not isinstance(series, pd.Series):
+        return pd.Series([True])
+    s = series.astype(str)
+    return s.isna() | s.str.strip().eq("") | s.str.strip().str.lower().isin(_BLANK_TOKENS)
+
+_TZ_RE = re.compile(r"\s+(ET|EDT|EST|CT|CDT|CST|MT|MDT|MST|PT|PDT)\b", flags=re.I)
+
+def _clean_dt_text(x: str) -> str:
+    if x is None: return ""
+    s = str(x).replace("\xa0", " ").strip()                # NBSP → space
+    s = s.replace("–","-").replace(",", " ")
+    s = re.sub(r"\s+at\s+", " ", s, flags=re.I)          # " at "
+    s = _TZ_RE.sub("", s)                                  # drop trailing timezone tag
+    s = re.sub(r"(\d)(am|pm)\b", r"\1 \2", s, flags=re.I)# "12:45pm"→"12:45 pm"
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+def _to_ts(series: pd.Series) -> pd.Series:
+    if not isinstance(series, pd.Series) or series.empty:
+        return pd.to_datetime(pd.Series([], dtype=object))
+    if pd.api.types.is_datetime64_any_dtype(series):
+        dt = series
+    else:
+        # Clean & parse each distinct value once, then broadcast back to the rows
+        codes, uniques = pd.factorize(series.astype(str))
+        parsed = _parse_dt_values(pd.Series(uniques, dtype=object))
+        dt = pd.Series(parsed.to_numpy()[codes], index=series.index)
+    try:
+        dt = dt.dt.tz_localize(None)
+    except Exception:
+        pass
+    return dt
+
+def _parse_dt_values(values: pd.Series) -> pd.Series:
+    cleaned = values.map(_clean_dt_text)
+    dt = pd.to_datetime(cleaned, errors="coerce", format="mixed")
+    if dt.isna().any():
+        y = dt.copy()
+        for fmt in ("%m/%d/%Y %I:%M %p", "%m/%d/%Y %H:%M", "%Y-%m-%d %H:%M", "%m/%d/%Y"):
+            m = y.isna()
+            if not m.any(): break
+            try:
+                y.loc[m] = pd.to_datetime(cleaned.loc[m], format=fmt, errors="coerce")
+            except Exception:
+                pass
+        dt = y
+    try:
+        dt = dt.dt.tz_localize(None)
+    except Exception:
+        pass
+    return dt
+
+def _between_inclusive(series: pd.Series, sd: date, ed: date) -> pd.Series:
+    return _ts_between(_to_ts(series), sd, ed)
+
+def _ts_between(ts: pd.Series, sd: date, ed: date) -> pd.Series:
+    """Inclusive day-range test on already-parsed timestamps (NaT → False)."""
+    return (ts >= pd.Timestamp(sd)) & (ts < pd.Timestamp(ed) + pd.Timedelta(days=1))
+
+def _col_by_idx(df: pd.DataFrame, idx: int) -> Optional[str]:
+    if not isinstance(df, pd.DataFrame) or df.empty: return None
+    return df.columns[idx] if idx < df.shape[1] else None
+
+def _norm_lower(series: pd.Series) -> pd.Series:
+    """Single strip+lower pass over a text column."""
+    return _text(series).str.lower()
+
+# --- NCL column picking (fuzzy headers, then E/F/G positions) ---
+def _norm_header(s: str) -> str:
+    s = str(s).lower().strip()
+    s = re.sub(r"[\s_]+"," ", s)
+    s = re.sub(r"[^a-z0-9 ]","", s)
+    return s
+
+def _ncl_columns(ncl_df: pd.DataFrame) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Pick NCL (date, responsible-attorney initials, retained flag) columns by header, then by position."""
+    cols = list(ncl_df.columns)
+    norms = {c: _norm_header(c) for c in cols}
+
+    # Prefer exact canonical date title; else a 'date+signed+payment' combo
+    prefer_date = _norm_header("Date we had BOTH the signed CLA and full payment")
+    date_col = next((c for c in cols if norms[c] == prefer_date), None)
+    if date_col is None:
+        cands = [c for c in cols if all(tok in norms[c] for tok in ["date","signed","payment"])]
+        if cands:
+            cands.sort(key=lambda c: len(norms[c]))
+            date_col = cands[0]
+    if date_col is None:
+        # Fallback: look for any column with "date" in the name
+        date_col = next((c for c in cols if "date" in norms[c]), None)
+    if date_col is None and len(cols) > 6:
+        date_col = cols[6]  # Column G
+
+    # Responsible Attorney (initials) - try multiple approaches
+    init_col = next((c for c in cols if all(tok in norms[c] for tok in ["responsible","attorney"])), None)
+    if init_col is None:
+        # Fallback: look for any column with "attorney" in the name
+        init_col = next((c for c in cols if "attorney" in norms[c]), None)
+    if init_col is None and len(cols) > 4:
+        init_col = cols[4]  # Column E
+
+    # Retained flag (prefer exact)
+    prefer_flag = _norm_header("Retained With Consult (Y/N)")
+    flag_col = next((c for c in cols if norms[c] == prefer_flag), None)
+    if flag_col is None:
+        flag_col = next((c for c in cols if all(tok in norms[c] for tok in ["retained","consult"])), None)
+    if flag_col is None:
+        # Fallback: look for any column with "retained" in the name
+        flag_col = next((c for c in cols if "retained" in norms[c]), None)
+    if flag_col is None and len(cols) > 5:
+        flag_col = cols[5]  # Column F
+
+    return date_col, init_col, flag_col
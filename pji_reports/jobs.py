@@ -0,0 +1,291 @@
+# pji_reports/jobs.py
+# Background ingest: uploads are queued as jobs that a per-session worker thread parses, merges and writes
+
+import io
+import time
+import threading
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from .ingest import process_call_log_csv, process_calls_csv, _read_any, _upsert_rows
+from .store import (
+    add_batch_metadata, log, _mv_store, _read_ws_by_name, _sheet, _snapshot_changed, TAB_NAMES,
+    _write_ws_by_name
+)
+from .profiler import span, thread_run
+
+JOB_HISTORY = 20         # finished jobs kept per session (their file bytes are released when they finish)
+JOB_POLL_SECONDS = 1.0   # refresh interval of the jobs panel while a job is queued or running
+
+CALLS_MASTER_COLS = [
+    "Category","Name","Total Calls","Completed Calls","Outgoing","Received",
+    "Forwarded to Voicemail","Answered by Other","Missed",
+    "Avg Call Time","Total Call Time","Total Hold Time","Month-Year",
+    "__avg_sec","__total_sec","__hold_sec"
+]
+# Stages every job of a kind runs through (the progress bar counts them)
+CALLS_STAGES = ("check batch", "parse", "merge", "write")
+CONVERSION_STAGES = ("check batch", "parse", "merge", "write", "snapshots")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Jobs
+# ───────────────────────────────────────────────────────────────────────────────
+class IngestJob:
+    """One uploaded file with the options it was submitted with, then its status, stage timings and outcome."""
+    def __init__(self, key: str, name: str, data: bytes, batch_id: str, start: date, end: date,
+                 replace: bool = False, period_key: Optional[str] = None, calls_mode: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:8]
+        self.key, self.name, self.data = key, name, data
+        self.batch_id, self.start, self.end, self.replace = batch_id, start, end, replace
+        self.period_key, self.calls_mode = period_key, calls_mode
+        self.status = "queued"   # queued → running → done | skipped | failed
+        self.stage = ""
+        self.timings: List[Tuple[str, float]] = []
+        self.notes: List[str] = []
+        self.rows = 0
+        self.error = ""
+        self.submitted = datetime.now().isoformat(timespec="seconds")
+        self.finished = ""
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def progress(self) -> float:
+        stages = CALLS_STAGES if self.key == "CALLS" else CONVERSION_STAGES
+        return min(len(self.timings) / len(stages), 1.0)
+
+    def file(self) -> io.BytesIO:
+        """The uploaded bytes as a named file object, as the parsers expect from st.file_uploader."""
+        f = io.BytesIO(self.data)
+        f.name = self.name
+        return f
+
+    @contextmanager
+    def step(self, name: str):
+        self.stage = name
+        t = time.perf_counter()
+        with span(f"upload {self.key}: {name}"):
+            yield
+        self.timings.append((name, round((time.perf_counter() - t) * 1000, 1)))
+
+    def summary(self) -> Dict[str, object]:
+        """One row of the jobs panel."""
+        return {
+            "Submitted": self.submitted, "File": self.name, "Master": TAB_NAMES[self.key], "Batch": self.batch_id,
+            "Status": self.status, "Stage": self.stage, "Rows": self.rows,
+            "Timings": " · ".join(f"{n} {ms:.0f} ms" for n, ms in self.timings),
+            "Result": self.error or " ".join(self.notes),
+        }
+
+class _IngestQueue:
+    """A session's jobs in submission order, with one lane per master: each lane's background thread works
+    off that master's jobs one at a time (two uploads never race on the same tab), while files for
+    different masters parse, merge and write in parallel. Lane threads carry the session's script context,
+    so session state, the caches and the technical log behave as they do in the page script."""
+    def __init__(self):
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._pending: Dict[str, deque] = {}
+        self._workers: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, job: IngestJob) -> IngestJob:
+        ctx = get_script_run_ctx()
+        lane = job.key   # CALLS jobs also write CALL_HOURS, which only they touch
+        with self._lock:
+            self.jobs[job.id] = job
+            self._pending.setdefault(lane, deque()).append(job)
+            finished = [j for j in self.jobs.values() if not j.active]
+            for old in finished[:max(len(finished) - JOB_HISTORY, 0)]:
+                del self.jobs[old.id]
+            worker = None
+            if ctx is not None and lane not in self._workers:
+                worker = self._workers[lane] = threading.Thread(target=self._work, args=(lane,),
+                                                                name=f"ingest-{lane}", daemon=True)
+                add_script_run_ctx(worker, ctx)
+        if worker is not None:
+            worker.start()
+        elif ctx is None:
+            # Bare mode (CLI, benchmarks): no session to hand over, so the job runs in the caller's thread
+            self._work(lane)
+        return job
+
+    def active(self) -> List[IngestJob]:
+        return [j for j in list(self.jobs.values()) if j.active]
+
+    def _work(self, lane: str):
+        while True:
+            with self._lock:
+                if not self._pending.get(lane):
+                    if self._workers.get(lane) is threading.current_thread():
+                        del self._workers[lane]
+                    return
+                job = self._pending[lane].popleft()
+            _run(job)
+
+def _ingest_queue() -> _IngestQueue:
+    queue = st.session_state.get("ingest_queue")
+    if queue is None:
+        queue = st.session_state["ingest_queue"] = _IngestQueue()
+    return queue
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Pipelines (run on the worker)
+# ───────────────────────────────────────────────────────────────────────────────
+def _run(job: IngestJob):
+    job.status = "running"
+    with thread_run("ingest"):
+        try:
+            (_run_calls if job.key == "CALLS" else _run_conversion)(job)
+            if job.status == "running":
+                job.status = "done"
+        except Exception as e:
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+            log(f"{job.key} upload failed: {e}", "error", "upload", TAB_NAMES[job.key], e)
+    job.data = None
+    if job.status != "failed":
+        job.stage = ""   # a failed job keeps the stage it failed in
+    job.finished = datetime.now().isoformat(timespec="seconds")
+
+def _batch_present(job: IngestJob) -> Tuple[pd.DataFrame, bool]:
+    """The master as stored, and whether the job's batch is already in it."""
+    existing = _read_ws_by_name(job.key)
+    present = (isinstance(existing, pd.DataFrame) and not existing.empty and "__batch_id" in existing.columns
+               and bool(existing["__batch_id"].eq(job.batch_id).any()))
+    return existing, present
+
+def _write(logical_key: str, df: pd.DataFrame):
+    if not _write_ws_by_name(logical_key, df):
+        raise RuntimeError(f"Write to '{TAB_NAMES[logical_key]}' failed; see Logs (tech details).")
+
+def _merge_calls_rows(job: IngestJob, logical_key: str, rows: pd.DataFrame, batch_exists: bool) -> pd.DataFrame:
+    current = _read_ws_by_name(logical_key)
+
+    # Remove existing batch if force replace
+    if job.replace and batch_exists and not current.empty and "__batch_id" in current.columns:
+        current = current[current["__batch_id"] != job.batch_id].copy()
+
+    # Dedupe by the row key + Batch ID (keeping latest batch)
+    # This ensures different batches for the same person/category are preserved
+    return _upsert_rows(current, rows, logical_key)[0]
+
+def _run_calls(job: IngestJob):
+    with job.step("check batch"):
+        _, batch_exists = _batch_present(job)
+
+    # Only skip if batch exists and we don't want to replace
+    if batch_exists and not job.replace:
+        job.status = "skipped"
+        job.notes.append(f"Calls: batch '{job.batch_id}' already present — upload skipped.")
+        log("Calls upload skipped by batch dedupe guard.", op="upload", tab=TAB_NAMES["CALLS"])
+        return
+
+    call_hours = None
+    with job.step("parse"):
+        if job.calls_mode == "Per-call detail log":
+            processed, call_hours, log_stats = process_call_log_csv(job.file(), job.period_key)
+            job.notes.append(f"Calls log: streamed {log_stats['rows']:,} call(s) in {log_stats['chunks']} chunk(s); "
+                             f"{log_stats['skipped']:,} outside {job.period_key} skipped.")
+        else:
+            raw = pd.read_csv(job.file())
+
+            # Check if this looks like a calls report or conversion report
+            conversion_indicators = ["First Name", "Last Name", "Email", "Stage", "Matter ID", "Initial Consultation With Pji Law"]
+            calls_indicators = ["Name", "Total Calls", "Completed Calls", "Outgoing", "Received"]
+
+            conversion_count = sum(1 for col in raw.columns if col in conversion_indicators)
+            calls_count = sum(1 for col in raw.columns if col in calls_indicators)
+
+            if conversion_count > calls_count:
+                raise ValueError("Wrong file type! This appears to be a conversion report file (Leads_PNCs.csv), not a "
+                                 "calls report file. Upload the ZoomUS calls export, with columns like 'Name', "
+                                 "'Total Calls', 'Completed Calls'. Detected conversion report headers: "
+                                 + ", ".join(col for col in raw.columns if col in conversion_indicators))
+            processed = process_calls_csv(raw, job.period_key)
+
+    processed = add_batch_metadata(processed[CALLS_MASTER_COLS].copy(), job.batch_id, date.today(), job.start, job.end)
+    job.rows = len(processed)
+    if _sheet() is None:
+        job.notes.append("Master store not configured; Calls will not persist.")
+        return
+    parts = [("CALLS", processed)]
+    if call_hours is not None:
+        parts.append(("CALL_HOURS", add_batch_metadata(call_hours, job.batch_id, date.today(), job.start, job.end)))
+
+    with job.step("merge"):
+        merged = [(k, _merge_calls_rows(job, k, rows, batch_exists)) for k, rows in parts]
+    with job.step("write"):
+        for k, combined in merged:
+            _write(k, combined)
+            if job.replace and batch_exists:
+                _mv_store().drop(k, job.batch_id)   # only once the tab holds the new rows
+    job.notes.append(f"Calls: upserted {len(processed)} row(s) with batch ID '{job.batch_id}'.")
+    if call_hours is not None:
+        job.notes.append(f"Calls hourly cube: upserted {len(call_hours)} row(s) with batch ID '{job.batch_id}'.")
+
+def _run_conversion(job: IngestJob):
+    key_name = job.key
+    with job.step("check batch"):
+        _, batch_exists = _batch_present(job)
+
+    # Only skip if batch exists and we don't want to replace
+    if batch_exists and not job.replace:
+        job.status = "skipped"
+        job.notes.append(f"{key_name}: batch '{job.batch_id}' already present — ignored.")
+        log(f"{key_name} skipped by batch dedupe guard.", op="upload", tab=TAB_NAMES[key_name])
+        return
+
+    with job.step("parse"):
+        df_up = _read_any(job.file())
+        if df_up is None or df_up.empty:
+            job.status = "skipped"
+            job.notes.append(f"{key_name}: file appears empty.")
+            return
+
+        # Add batch metadata to all conversion files
+        df_up = add_batch_metadata(df_up, job.batch_id, date.today(), job.start, job.end)
+
+        if key_name == "NCL" and "Retained with Consult (Y/N)" in df_up.columns \
+           and "Retained With Consult (Y/N)" not in df_up.columns:
+            df_up = df_up.rename(columns={"Retained with Consult (Y/N)":"Retained With Consult (Y/N)"})
+    job.rows = len(df_up)
+    if _sheet() is None:
+        job.notes.append(f"Master store not configured; {key_name} will not persist.")
+        return
+
+    with job.step("merge"):
+        current = _read_ws_by_name(key_name)
+        removed = current.iloc[0:0]
+        stale = set()   # batches whose materialized-view parts are dropped once the write succeeds
+
+        # For files other than Leads, replacing removes the existing batch if it exists
+        if job.replace and batch_exists and key_name != "LEADS":
+            removed = current[current["__batch_id"] == job.batch_id]
+            current = current[current["__batch_id"] != job.batch_id].copy()
+            stale.add(job.batch_id)
+
+        # Dedupe by dataset keys + batch ID (keeping latest batch)
+        # This ensures different batches for the same person/matter are preserved
+        # For Leads, replacing also removes records that match the incoming data exactly, in any batch
+        combined, replaced = _upsert_rows(current, df_up, key_name, replace_keys=job.replace and key_name == "LEADS")
+        if "__batch_id" in replaced.columns:
+            stale.update(replaced["__batch_id"].astype(str).unique())
+    with job.step("write"):
+        _write(key_name, combined)
+        for touched in stale:
+            _mv_store().drop(key_name, touched)
+    with job.step("snapshots"):
+        # Months this batch (and anything it replaced) touches are re-snapshotted after the reload
+        _snapshot_changed(key_name, df_up)
+        for rows in (removed, replaced):
+            if not rows.empty:
+                _snapshot_changed(key_name, rows)
+    job.notes.append(f"{key_name}: upserted {len(df_up)} row(s) with batch ID '{job.batch_id}'.")
@@ -0,0 +1,1212 @@
+# pji_reports/metrics.py
+# Firm calendar, KPI engine and the report computations behind each section
+
+import re
+import json
+from datetime import date, timedelta
+from calendar import monthrange
+from typing import List, Dict, Tuple, Optional
+import functools
+import inspect
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .ingest import (
+    _find_col, _is_no, _ncl_columns, _norm_header, _norm_lower, _text, _to_ts, _ts_between
+)
+from .profiler import count
+from .store import (
+    CONVERSION_KEYS, _data_version, _memoized_report, _mv_store, _snapshots
+)
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Custom firm week logic and masks
+# ───────────────────────────────────────────────────────────────────────────────
+def _month_bounds(year: int, month: int):
+    last_day = monthrange(year, month)[1]
+    start = date(year, month, 1)
+    end   = date(year, month, last_day)
+    return start, end
+
+# --- Calendar dimension: one row per day with every bucket key the reports group by ---
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _firm_calendar(first_year: int, last_year: int, today: date) -> pd.DataFrame:
+    """
+    Every day of first_year..last_year (DatetimeIndex) with its bucket keys:
+      • Year, Quarter, Month, Month-Year ("YYYY-MM")
+      • Week index / Week label — firm weeks: Week 1 runs from the 1st to the first Sunday,
+        then Mon–Sun, and the final week ends at month-end
+      • Month key / Week key — ordinals that sort across years (for joining bucket windows)
+      • Future — day after `today`, i.e. clamped out of a running window
+    Shared across sessions and read-only.
+    """
+    days = pd.date_range(date(first_year, 1, 1), date(last_year, 12, 31), freq="D")
+    first_weekday = (days - pd.to_timedelta(days.day - 1, unit="D")).weekday
+    week = np.asarray((days.day - 1 + first_weekday) // 7)
+    month_key = np.asarray(days.year * 12 + days.month - 1)
+    return pd.DataFrame({
+        "Year": days.year, "Quarter": days.quarter, "Month": days.month,
+        "Month-Year": days.strftime("%Y-%m"),
+        "Week index": week, "Week label": [f"Week {w + 1}" for w in week],
+        "Month key": month_key, "Week key": month_key * 6 + week,   # a month spans at most 6 firm weeks
+        "Future": days > pd.Timestamp(today),
+    }, index=days)
+
+def _calendar(first_year: int, last_year: int) -> pd.DataFrame:
+    return _firm_calendar(first_year, last_year, date.today())
+
+def _calendar_spans(cal: pd.DataFrame, key: str) -> pd.DataFrame:
+    """First/last day of each `key` bucket of a calendar slice — one groupby, in calendar order."""
+    return cal.index.to_series().groupby(cal[key].to_numpy(), sort=False).agg(["min", "max"])
+
+def _calendar_window(year: int, month: Optional[int] = None, clamp: bool = False) -> Tuple[date, date]:
+    """First and last day of a year or month; `clamp` ends a running one at today."""
+    cal = _calendar(year, year)
+    if month is not None:
+        cal = cal.loc[cal["Month"].eq(month)]
+    if clamp and not cal["Future"].all():
+        cal = cal.loc[~cal["Future"]]
+    return cal.index[0].date(), cal.index[-1].date()
+
+def custom_weeks_for_month(year: int, month: int):
+    """Week 1: 1st→first Sunday; Weeks 2..N: Mon–Sun; final week ends month-end."""
+    cal = _calendar(year, year)
+    spans = _calendar_spans(cal.loc[cal["Month"].eq(month)], "Week index")
+    return [{"label": f"Week {w + 1}", "start": sd.date(), "end": ed.date()} for w, (sd, ed) in spans.iterrows()]
+
+def _mask_by_range_dates(df: pd.DataFrame, date_col: str, start: date, end: date) -> pd.Series:
+    if df is None or df.empty or date_col not in df.columns:
+        return pd.Series([False] * (0 if df is None else len(df)))
+    # Use robust date parsing with format specification to avoid warnings
+    ts = pd.to_datetime(df[date_col], errors="coerce", format="mixed")
+    if ts.isna().any():
+        y = ts.copy()
+        for fmt in ("%m/%d/%Y %I:%M %p", "%m/%d/%Y %H:%M", "%Y-%m-%d %H:%M", "%m/%d/%Y"):
+            m = y.isna()
+            if not m.any(): break
+            try:
+                y.loc[m] = pd.to_datetime(df[date_col].loc[m], format=fmt, errors="coerce")
+            except Exception:
+                pass
+        ts = y
+    # Handle NaT values properly
+    valid_dates = ts.notna()
+    in_range = pd.Series([False] * len(df), index=df.index)
+    if valid_dates.any():
+        in_range.loc[valid_dates] = (ts.loc[valid_dates].dt.date >= start) & (ts.loc[valid_dates].dt.date <= end)
+    return in_range
+
+# ───────────────────────────────────────────────────────────────────────────────
+# 📞 Zoom Call Reports — month helpers and rollups
+# ───────────────────────────────────────────────────────────────────────────────
+months_map = {"01":"January","02":"February","03":"March","04":"April","05":"May","06":"June",
+              "07":"July","08":"August","09":"September","10":"October","11":"November","12":"December"}
+def month_num_to_name(mnum): return months_map.get(mnum, mnum)
+
+def union_months_from(df):
+    if isinstance(df, pd.DataFrame) and not df.empty and "Month-Year" in df.columns:
+        return sorted(set(df["Month-Year"].dropna().astype(str)))
+    return []
+
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def _call_hours_grid(hours: pd.DataFrame, measure: str) -> pd.DataFrame:
+    """Weekday × hour-of-day grid (7 × 24) of one cube measure, summed over the given rows."""
+    grid = (hours.groupby(["Weekday", "Hour"], observed=True)[measure].sum()
+                 .unstack("Hour")
+                 .reindex(index=range(7), columns=range(24), fill_value=0)
+                 .fillna(0).astype(int))
+    grid.index = WEEKDAY_NAMES
+    return grid
+
+CALLS_MEASURES = ["Total Calls","Completed Calls","Outgoing","Received",
+                  "Forwarded to Voicemail","Answered by Other","Missed","__total_sec","__hold_sec"]
+
+def _calls_rollup_part(rows: pd.DataFrame, batch_id: str) -> pd.DataFrame:
+    """Month-Year × Category × Name sums of one Calls batch."""
+    part = (rows.assign(weighted_sum=rows["__avg_sec"] * rows["Total Calls"])
+                .groupby(["Month-Year","Category","Name"], observed=True, sort=False)[CALLS_MEASURES + ["weighted_sum"]]
+                .sum().reset_index())
+    for c in ("Month-Year","Category","Name"):
+        part[c] = part[c].astype(str)
+    return part
+
+@_memoized_report
+def _calls_rollup(df_calls: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, object]]:
+    """Year × Month × Category × Name rollup of the Calls master, plus the filter choices it offers.
+
+    Measures are additive; `weighted_sum` (avg seconds × total calls) is the numerator of the
+    call-weighted average duration, so any slice re-aggregates exactly. Built once per CALLS version.
+    """
+    cols = ["Year","Month","Month-Year","Category","Name"] + CALLS_MEASURES + ["weighted_sum"]
+    if df_calls.empty or "Month-Year" not in df_calls.columns:
+        return pd.DataFrame(columns=cols), {"months": [], "categories": [], "names": {}}
+    # Merge the per-batch rollups (materialized once per batch) instead of regrouping the whole master
+    cube = (pd.concat(_mv_store().parts("CALLS", "rollup", df_calls, _calls_rollup_part), ignore_index=True)
+              .groupby(["Month-Year","Category","Name"], sort=False)[CALLS_MEASURES + ["weighted_sum"]]
+              .sum().reset_index())
+    for c in ("Month-Year","Category","Name"):
+        cube[c] = cube[c].astype(str)
+    cube = cube.loc[cube["Month-Year"].str.strip().ne("")]
+    cube["Year"], cube["Month"] = cube["Month-Year"].str[:4], cube["Month-Year"].str[5:7]
+    cube = cube[cols].sort_values(["Month-Year","Category","Name"]).reset_index(drop=True)
+    options = {
+        "months": sorted(cube["Month-Year"].unique().tolist()),
+        "categories": sorted(cube["Category"].unique().tolist()),
+        "names": {c: sorted(g.unique().tolist()) for c, g in cube.groupby("Category")["Name"]},
+    }
+    options["names"]["All"] = sorted(cube["Name"].unique().tolist())
+    return cube, options
+
+# ───────────────────────────────────────────────────────────────────────────────
+# 📊 Firm Conversion Report — years and PNC stage exclusions
+# ───────────────────────────────────────────────────────────────────────────────
+months_map_names = {
+    1:"January",2:"February",3:"March",4:"April",5:"May",6:"June",
+    7:"July",8:"August",9:"September",10:"October",11:"November",12:"December"
+}
+month_nums = list(months_map_names.keys())
+
+def _years_from(*dfs_cols):
+    ys = set()
+    for df, col in dfs_cols:
+        if df is not None and not df.empty and col in df.columns:
+            ys |= set(pd.to_datetime(df[col], errors="coerce").dt.year.dropna().astype(int))
+    return ys
+
+@_memoized_report
+def _conversion_years(df_ncl: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame) -> set:
+    return _years_from(
+        (df_ncl,  "Date we had BOTH the signed CLA and full payment"),
+        (df_init, "Initial Consultation With Pji Law"),
+        (df_disc, "Discovery Meeting With Pji Law"),
+    )
+
+EXCLUDED_PNC_STAGES = {
+    "Marketing/Scam/Spam (Non-Lead)","Referred Out","No Stage","New Lead",
+    "No Follow Up (No Marketing/Communication)","No Follow Up (Receives Marketing/Communication)",
+    "Anastasia E","Aneesah S.","Azariah P.","Earl M.","Faeryal S.","Kaithlyn M.",
+    "Micayla S.","Nathanial B.","Rialet v H.","Sihle G.","Thabang T.","Tiffany P",
+    ":Chloe L:","Nobuhle M."
+}
+
+# ───────────────────────────────────────────────────────────────────────────────
+# KPI definitions (declared once) + shared-scan planner
+# ───────────────────────────────────────────────────────────────────────────────
+# Every report count is declared below as (sources, AND-ed named filters, grouping). The planner
+# reads each source through one normalized view (memoized per data version), evaluates each named
+# filter at most once per request and derives all requested metrics from those masks — a new KPI
+# adds a mask AND and a count, not another pass over a master.
+_MEETING_DATES = {"IC": ("Initial Consultation With Pji Law", 12),   # header, else column M
+                  "DM": ("Discovery Meeting With Pji Law", 15)}      # header, else column P
+
+def _ncl_intake_column(ncl_df: pd.DataFrame) -> Optional[str]:
+    """NCL 'Primary Intake?' column by header, then column J."""
+    cols = list(ncl_df.columns)
+    norms = {c: _norm_header(c) for c in cols}
+    intake_col = next((c for c in cols if all(tok in norms[c] for tok in ["primary","intake"])), None)
+    if intake_col is None:
+        intake_col = next((c for c in cols if "intake" in norms[c]), None)
+    if intake_col is None and len(cols) > 9:
+        intake_col = cols[9]  # Column J
+    return intake_col
+
+@_memoized_report
+def _kpi_view(source: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One normalized, period-independent pass over a master (LEADS / IC / DM / NCL):
+    the columns every KPI filter and grouping reads. `attrs["columns"]` records the picks.
+    """
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return pd.DataFrame()
+    def pick(names, pos=None):
+        c = _find_col(df, names)
+        return df.columns[pos] if c is None and pos is not None and pos < df.shape[1] else c
+    def text(c):
+        return _text(df[c]) if c else pd.Series("", index=df.index)
+    def intake(c):   # NA (not "") when the sheet has no intake column, so it is grouped nowhere
+        return _text(df[c]) if c else pd.Series(pd.NA, index=df.index, dtype=object)
+
+    pa_col = _find_col(df, ["Practice Area"])
+    view = pd.DataFrame({"Practice Area": (_norm_lower(df[pa_col]) if pa_col
+                                           else pd.Series(pd.NA, index=df.index, dtype=object))}, index=df.index)
+    if source == "LEADS":
+        intake_col = _find_col(df, ["Assigned Intake Specialist"])
+        # A Leads sheet without Stage or batch windows counts nothing
+        has_window = {"__batch_start", "__batch_end", "Stage"} <= set(df.columns)
+        for out, name in (("Batch Start", "__batch_start"), ("Batch End", "__batch_end")):
+            view[out] = pd.to_datetime(df[name], errors="coerce") if has_window else pd.NaT
+        view["Stage"] = text("Stage" if "Stage" in df.columns else None)
+        view["Intake"] = intake(intake_col)
+        picked = {"intake": intake_col}
+    elif source in _MEETING_DATES:
+        date_name, date_idx = _MEETING_DATES[source]
+        date_col = pick([date_name], date_idx)
+        sub_col, reason_col = pick(["Sub Status"], 6), pick(["Reason for Rescheduling"], 8)
+        intake_col = _find_col(df, ["Assigned Intake Specialist"])
+        reason = text(reason_col)
+        reason_low = reason.str.lower()
+        view["Date"] = _to_ts(df[date_col]) if date_col else pd.NaT
+        view["Attorney"] = _text(df.iloc[:, 11]) if df.shape[1] > 11 else ""   # column L
+        view["Intake"] = intake(intake_col)
+        view["Sub Status"], view["Reason"] = text(sub_col), reason
+        view["IsFollowUp"] = view["Sub Status"].str.lower().eq("follow up")
+        view["HasRescheduleReason"] = (df[reason_col].notna() & reason.ne("")) if reason_col else False
+        view["HasCanceledMeeting"] = reason_low.str.contains("canceled meeting", regex=False, na=False)
+        view["HasNoShow"] = reason_low.str.contains("no show", regex=False, na=False)
+        picked = {"date": date_col, "sub_status": sub_col, "reason": reason_col, "intake": intake_col}
+    else:  # NCL
+        date_col, init_col, flag_col = _ncl_columns(df)
+        intake_col = _ncl_intake_column(df)
+        view["Date"] = _to_ts(df[date_col]) if date_col else pd.NaT
+        view["WithoutConsult"] = _is_no(df[flag_col]) if flag_col else False
+        view["Initials"] = text(init_col)
+        view["Primary Intake"] = intake(intake_col)
+        picked = {"date": date_col, "initials": init_col, "flag": flag_col, "intake": intake_col}
+    view.attrs["columns"] = picked
+    return view
+
+# Materialized KPI cubes: a view collapsed to the columns the filters and groupings read, with a
+# "Rows" weight — per day for the meeting sheets and the NCL, per batch window for Leads. A Leads group
+# also carries "Persons", the sorted distinct person-key hashes of its rows, so distinct counts merge
+# small key sets instead of rescanning the master.
+_KPI_TABS = {"LEADS": "LEADS", "IC": "INIT", "DM": "DISC", "NCL": "NCL"}
+_KPI_CUBE_KEYS = {
+    "LEADS": ["Batch Start", "Batch End", "Practice Area", "Stage", "Intake"],
+    "IC":    ["Date", "Practice Area", "Attorney", "Intake",
+              "IsFollowUp", "HasRescheduleReason", "HasCanceledMeeting", "HasNoShow"],
+    "NCL":   ["Date", "Practice Area", "Initials", "Primary Intake", "WithoutConsult"],
+}
+_KPI_CUBE_KEYS["DM"] = _KPI_CUBE_KEYS["IC"]
+
+def _sorted_sets(codes: np.ndarray, hashes: np.ndarray, n: int) -> np.ndarray:
+    """Sorted distinct `hashes` per group code 0..n-1, as an object array of uint64 arrays."""
+    order = np.lexsort((hashes, codes))
+    codes, hashes = codes[order], hashes[order]
+    first = np.ones(len(hashes), dtype=bool)
+    first[1:] = (codes[1:] != codes[:-1]) | (hashes[1:] != hashes[:-1])
+    codes, hashes = codes[first], hashes[first]
+    bounds = np.searchsorted(codes, np.arange(n + 1)).tolist()
+    sets = np.empty(n, dtype=object)
+    for i in range(n):
+        sets[i] = hashes[bounds[i]:bounds[i + 1]]
+    return sets
+
+def _leads_groups(frame: pd.DataFrame, codes: np.ndarray, hashes: np.ndarray) -> pd.DataFrame:
+    """Leads cube rows of `frame` (key columns + Rows): Rows summed and hashes collected per key group."""
+    groups = frame.groupby(_KPI_CUBE_KEYS["LEADS"], dropna=False, observed=True, sort=False)
+    cube = groups["Rows"].sum().reset_index()
+    cube["Persons"] = _sorted_sets(groups.ngroup().to_numpy()[codes], hashes, len(cube))
+    return cube
+
+def _kpi_cube_part(src: str, rows: pd.DataFrame, batch_id: str) -> pd.DataFrame:
+    """KPI cube of one batch. Leads hash each row's person key (a keyless row hashes as itself) for distinct counts."""
+    view = _kpi_view.__wrapped__(src, rows)   # unmemoized: the slice has no data version of its own
+    if view.empty:
+        return view
+    if src == "LEADS":
+        keys = _person_keys(rows)
+        keyless = f"r:{batch_id}:" + pd.Series(np.arange(len(keys)), index=keys.index).astype(str)
+        hashes = pd.util.hash_array(keys.where(keys.ne(""), keyless).to_numpy(dtype=object))
+        return _leads_groups(view.assign(Rows=1), np.arange(len(view)), hashes)
+    view["Date"] = view["Date"].dt.normalize()
+    return (view.groupby(_KPI_CUBE_KEYS[src], dropna=False, observed=True, sort=False)
+                .size().rename("Rows").reset_index())
+
+@_memoized_report
+def _kpi_cube(src: str, df: pd.DataFrame) -> pd.DataFrame:
+    """KPI cube of a whole master, merged from its materialized per-batch parts."""
+    parts = [p for p in _mv_store().parts(_KPI_TABS[src], "kpi", df, lambda rows, b: _kpi_cube_part(src, rows, b))
+             if not p.empty]
+    if not parts:
+        return pd.DataFrame()
+    cube = pd.concat(parts, ignore_index=True)
+    if src == "LEADS":
+        # Batches sharing a window and group: their key sets are unioned
+        sizes = np.array([len(p) for p in cube["Persons"]])
+        return _leads_groups(cube.drop(columns="Persons"), np.repeat(np.arange(len(cube)), sizes),
+                             np.concatenate(cube["Persons"].to_list()))
+    return cube.groupby(_KPI_CUBE_KEYS[src], dropna=False, observed=True, sort=False)["Rows"].sum().reset_index()
+
+KPI_FILTERS = {
+    # name: (view, sd, ed) → row mask
+    "in_batch_period":  lambda v, sd, ed: (v["Batch Start"] <= pd.Timestamp(ed)) & (v["Batch End"] >= pd.Timestamp(sd)),
+    "in_range":         lambda v, sd, ed: _ts_between(v["Date"], sd, ed),
+    "lead_stage":       lambda v, sd, ed: v["Stage"] != "Marketing/Scam/Spam (Non-Lead)",
+    "pnc_stage":        lambda v, sd, ed: ~v["Stage"].isin(EXCLUDED_PNC_STAGES),
+    "not_follow_up":    lambda v, sd, ed: ~v["IsFollowUp"],
+    "no_reschedule_reason":    lambda v, sd, ed: ~v["HasRescheduleReason"],
+    "not_canceled_or_no_show": lambda v, sd, ed: ~v["HasCanceledMeeting"] & ~v["HasNoShow"],
+    "without_consult":  lambda v, sd, ed: v["WithoutConsult"],
+    "with_consult":     lambda v, sd, ed: ~v["WithoutConsult"],
+}
+_PERIOD_FILTERS = ("in_batch_period", "in_range")
+
+_PNC       = ("in_batch_period", "pnc_stage")
+_SCHEDULED = ("in_range", "not_follow_up")                                  # Summary rules
+_SHOWED    = _SCHEDULED + ("no_reschedule_reason",)
+_MET       = ("in_range", "not_follow_up", "not_canceled_or_no_show")      # Practice Area rules
+
+KPI_DEFS = {
+    # name: (sources, filters, grouping)
+    "leads":                    (("LEADS",),   ("in_batch_period", "lead_stage"), None),
+    "pncs":                     (("LEADS",),   _PNC, None),
+    "retained_without_consult": (("NCL",),     ("in_range", "without_consult"), None),
+    "scheduled":                (("IC", "DM"), _SCHEDULED, None),
+    "showed":                   (("IC", "DM"), _SHOWED, None),
+    "retained_after_consult":   (("NCL",),     ("in_range", "with_consult"), None),
+    "retained":                 (("NCL",),     ("in_range",), None),
+    # Practice Area — per attorney
+    "met_with_attorney":        (("IC", "DM"), _MET, "attorney"),
+    "retained_with_attorney":   (("NCL",),     ("in_range", "with_consult"), "attorney"),
+    # Intake — per specialist
+    "intake_pncs":                     (("LEADS",),   _PNC, "intake"),
+    "intake_retained_without_consult": (("NCL",),     ("in_range", "without_consult"), "intake"),
+    "intake_scheduled":                (("IC", "DM"), _SCHEDULED, "intake"),
+    "intake_showed":                   (("IC", "DM"), _MET, "intake"),
+    "intake_retained_after_consult":   (("NCL",),     ("in_range", "with_consult"), "intake"),
+    "intake_retained":                 (("NCL",),     ("in_range",), "intake"),
+    # Intake "ALL" row — ungrouped, so a PNC handled by two specialists counts once
+    "intake_all_showed":               (("IC", "DM"), _MET, None),
+}
+
+# Leads KPIs counted once per person key (Matter ID, else email) across every batch overlapping the
+# period — a person re-uploaded in overlapping batches is one Lead / PNC, not one per batch.
+KPI_DISTINCT = frozenset({"leads", "pncs", "intake_pncs"})
+
+# Groupings: labels and, per source, the row → label-position codes (-1 = counted nowhere).
+# Resolved lazily — the rosters are declared with their report sections further down.
+KPI_GROUPS = {
+    "attorney": (lambda: CANON, {
+        "IC":  lambda v: _attorney_codes(v["Attorney"]),
+        "DM":  lambda v: _attorney_codes(v["Attorney"]),
+        "NCL": lambda v: _initials_codes(v["Initials"]),
+    }),
+    "intake": (lambda: intake_specialists, {
+        "LEADS": lambda v: _intake_codes(v["Intake"]),
+        "IC":    lambda v: _intake_codes(v["Intake"]),
+        "DM":    lambda v: _intake_codes(v["Intake"]),
+        "NCL":   lambda v: _intake_codes_from_initials(v["Primary Intake"]),
+    }),
+}
+
+# Funnel ratios: numerator / (first denominator term − the rest), 0% when that is not positive
+FUNNEL_RATIOS = {
+    "scheduled_pct":      ("scheduled", ("pncs", "retained_without_consult")),
+    "showed_pct":         ("showed", ("scheduled",)),
+    "retained_after_pct": ("retained_after_consult", ("scheduled",)),
+    "retained_pct":       ("retained", ("pncs",)),
+}
+# Firm Conversion Summary rows 1–11
+SUMMARY_ROWS = ("leads", "pncs", "retained_without_consult", "scheduled", "scheduled_pct", "showed",
+                "showed_pct", "retained_after_consult", "retained_after_pct", "retained", "retained_pct")
+SUMMARY_LABELS = ("# of Leads", "# of PNCs", "PNCs who retained without consultation",
+                  "PNCs who scheduled consultation", "% of remaining PNCs who scheduled consult",
+                  "# of PNCs who showed up for consultation", "% of PNCs who scheduled consult showed up",
+                  "PNCs who retained after scheduled consult", "% of PNCs who retained after consult",
+                  "# of Total PNCs who retained", "% of total PNCs who retained")
+
+def _pct(numer, denom): return 0 if (denom is None or denom == 0) else round((numer/denom)*100)
+
+def _funnel_ratios(counts: Dict[str, int]) -> Dict[str, int]:
+    out = {}
+    for ratio, (numer, denom) in FUNNEL_RATIOS.items():
+        d = counts[denom[0]] - sum(counts[t] for t in denom[1:])
+        out[ratio] = _pct(counts[numer], d) if d > 0 else 0
+    return out
+
+def _kpi_plan(names) -> Dict[str, Dict[Optional[str], List[str]]]:
+    """Requested metrics grouped by source, then grouping — one view scan per source."""
+    plan: Dict[str, Dict[Optional[str], List[str]]] = {}
+    for name in names:
+        sources, _, group = KPI_DEFS[name]
+        for src in sources:
+            plan.setdefault(src, {}).setdefault(group, []).append(name)
+    return plan
+
+def _kpi_row_mask(view: pd.DataFrame, name: str, sd: Optional[date] = None, ed: Optional[date] = None) -> np.ndarray:
+    """Row mask of one metric; without a period the period filters are left to the caller (trend buckets)."""
+    filters = [f for f in KPI_DEFS[name][1] if sd is not None or f not in _PERIOD_FILTERS]
+    mask = np.ones(len(view), dtype=bool)
+    for f in filters:
+        mask &= np.asarray(KPI_FILTERS[f](view, sd, ed), dtype=bool)
+    return mask
+
+def _practice_area_mask(view: pd.DataFrame, practice_area: str) -> np.ndarray:
+    """Row filter on a KPI view's 'Practice Area' ('Other' = none of the named areas)."""
+    if practice_area == "ALL":
+        return np.ones(len(view), dtype=bool)
+    pa = view["Practice Area"]
+    if pa.isna().all():
+        return np.zeros(len(view), dtype=bool)
+    named = [p.lower() for p in PRACTICE_AREAS]
+    if practice_area == "Other":
+        return (~pa.isin(named)).to_numpy(dtype=bool)
+    return pa.eq(practice_area.lower()).fillna(False).to_numpy(dtype=bool)
+
+_MATTER_LINK_RE = r"(\d+)\D*$"
+
+def _person_keys(df: pd.DataFrame) -> pd.Series:
+    """
+    Person key per row: 'm:<Matter ID>' when present (a 'Matter Number/Link' URL keeps its trailing
+    number), else 'e:<lower-cased email>', else '' (row cannot be joined).
+    """
+    key = pd.Series("", index=df.index, dtype=object)
+    email_col = _find_col(df, ["Email"])
+    if email_col:
+        email = _text(df[email_col]).astype(str).str.lower()
+        key = ("e:" + email).where(email.ne(""), key)
+    matter_col = _find_col(df, ["Matter ID", "Matter Number/Link"])
+    if matter_col:
+        matter = _text(df[matter_col]).astype(str)
+        is_link = matter.str.contains("/", regex=False)
+        if is_link.any():
+            matter = matter.where(~is_link, matter.str.extract(_MATTER_LINK_RE, expand=False).fillna(""))
+        key = ("m:" + matter).where(matter.ne(""), key)
+    return key
+
+@_memoized_report
+def _distinct_key_index(df_leads: pd.DataFrame, name: str, practice_area: str = "ALL") -> Dict[str, object]:
+    """
+    Per batch window, the sorted distinct person-key hashes of the rows one KPI_DISTINCT metric keeps
+    (non-period filters only), per group code when the metric is grouped. Built once per data version by
+    merging the Leads cube's per-group key sets; any period is then a merge of the overlapping windows' arrays.
+    """
+    view = _kpi_cube("LEADS", df_leads)
+    if view.empty:
+        return {"bs": np.array([], dtype="datetime64[ns]"), "be": np.array([], dtype="datetime64[ns]"), "keys": []}
+    group = KPI_DEFS[name][2]
+    rows = pd.DataFrame({
+        "bs": view["Batch Start"], "be": view["Batch End"],
+        "code": KPI_GROUPS[group][1]["LEADS"](view) if group is not None else 0,
+    })
+    keep = (_kpi_row_mask(view, name) & _practice_area_mask(view, practice_area) & (rows["code"].to_numpy() >= 0)
+            & rows["bs"].notna().to_numpy() & rows["be"].notna().to_numpy())
+    rows, persons = rows.loc[keep], view["Persons"].to_numpy()[keep]
+    rows["set"] = np.arange(len(rows))
+    windows = rows.groupby(["bs", "be"], sort=True)
+    return {
+        "bs": np.array([bs for bs, _ in windows.groups], dtype="datetime64[ns]"),
+        "be": np.array([be for _, be in windows.groups], dtype="datetime64[ns]"),
+        "keys": [{code: np.unique(np.concatenate(persons[g["set"].to_numpy()])) for code, g in w.groupby("code", sort=False)}
+                 for _, w in windows],
+    }
+
+def _distinct_count(index: Dict[str, object], sd: date, ed: date) -> Dict[int, int]:
+    """Distinct person keys per group code over the batch windows overlapping [sd, ed]."""
+    hit = np.flatnonzero((index["bs"] <= np.datetime64(pd.Timestamp(ed))) & (index["be"] >= np.datetime64(pd.Timestamp(sd))))
+    merged: Dict[int, List[np.ndarray]] = {}
+    for i in hit:
+        for code, hashes in index["keys"][i].items():
+            merged.setdefault(code, []).append(hashes)
+    return {code: len(np.unique(np.concatenate(parts))) for code, parts in merged.items()}
+
+@_memoized_report
+def _kpi_windows(df_leads: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame, df_ncl: pd.DataFrame,
+                 windows: Tuple[Tuple[date, date], ...], names: Tuple[str, ...]) -> Tuple[Dict[str, object], ...]:
+    """
+    Evaluate the named KPI_DEFS over several [sd, ed] windows in one pass: each cube is read once,
+    groupings and period-independent filters are evaluated once, only the period filters per window.
+    One dict per window: ints, or Series over the group labels when grouped.
+    """
+    frames = {"LEADS": df_leads, "IC": df_init, "DM": df_disc, "NCL": df_ncl}
+    outs = []
+    for _ in windows:
+        out: Dict[str, object] = {}
+        for name in names:
+            group = KPI_DEFS[name][2]
+            out[name] = 0 if group is None else pd.Series(0, index=KPI_GROUPS[group][0](), dtype=int)
+        outs.append(out)
+    for src, by_group in _kpi_plan(names).items():
+        view = _kpi_cube(src, frames[src])
+        if view.empty:
+            continue
+        weight = view["Rows"].to_numpy()
+        fixed: Dict[str, np.ndarray] = {}
+        period: Dict[Tuple[str, int], np.ndarray] = {}
+        for group, metric_names in by_group.items():
+            codes = KPI_GROUPS[group][1][src](view) if group is not None else None
+            for name in metric_names:
+                if name in KPI_DISTINCT:
+                    index = _distinct_key_index(df_leads, name)
+                    for out, (sd, ed) in zip(outs, windows):
+                        for code, n in _distinct_count(index, sd, ed).items():
+                            if codes is None:
+                                out[name] += n
+                            else:
+                                out[name].iloc[code] += n
+                    continue
+                base = np.ones(len(view), dtype=bool)
+                for f in KPI_DEFS[name][1]:
+                    if f not in _PERIOD_FILTERS:
+                        if f not in fixed:
+                            fixed[f] = np.asarray(KPI_FILTERS[f](view, None, None), dtype=bool)
+                        base &= fixed[f]
+                for i, (out, (sd, ed)) in enumerate(zip(outs, windows)):
+                    m = base.copy()
+                    for f in KPI_DEFS[name][1]:
+                        if f in _PERIOD_FILTERS:
+                            if (f, i) not in period:
+                                period[(f, i)] = np.asarray(KPI_FILTERS[f](view, sd, ed), dtype=bool)
+                            m &= period[(f, i)]
+                    if codes is None:
+                        out[name] += int(weight[m].sum())
+                    else:
+                        keep = m & (codes >= 0)
+                        out[name] = out[name] + np.bincount(codes[keep], weights=weight[keep],
+                                                            minlength=len(out[name])).astype(int)
+    return tuple(outs)
+
+def _kpi_values(df_leads: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame, df_ncl: pd.DataFrame,
+                sd: date, ed: date, names: Tuple[str, ...]) -> Dict[str, object]:
+    """Evaluate the named KPI_DEFS over [sd, ed]: ints, or Series over the group labels when grouped."""
+    return _kpi_windows(df_leads, df_init, df_disc, df_ncl, ((sd, ed),), names)[0]
+
+# --- Closed months are served from Reports_Snapshot ---
+def _closed_month(sd: date, ed: date) -> Optional[str]:
+    """'YYYY-MM' when [sd, ed] is exactly one calendar month that has already ended, else None."""
+    if sd.day != 1 or (sd.year, sd.month) != (ed.year, ed.month) or ed.day != monthrange(ed.year, ed.month)[1]:
+        return None
+    return f"{sd:%Y-%m}" if ed < date.today().replace(day=1) else None
+
+def _snapshotted(report: str, encode, decode):
+    """
+    Serve a report over a closed month from Reports_Snapshot, computing and storing it on a miss (a
+    snapshot of other master data versions is a miss). Any other window goes straight to the (memoized) report.
+    """
+    def deco(fn):
+        sig = inspect.signature(fn)
+        @functools.wraps(fn)
+        def wrapper(*args):
+            bound = sig.bind(*args).arguments
+            month = _closed_month(bound["sd"], bound["ed"])
+            if month is None:
+                return fn(*args)
+            versions = ",".join(_data_version(a) for a in args if isinstance(a, pd.DataFrame))
+            payload = _snapshots().get(month, report, versions)
+            if payload is not None:
+                st.session_state.setdefault("report_cache_events", []).append((fn.__name__, "snapshot"))
+                count("snapshot.hit")
+                return decode(json.loads(payload))
+            count("snapshot.miss")
+            value = fn(*args)
+            _snapshots().put(month, report, json.dumps(
+                encode(value), default=lambda o: o.item() if isinstance(o, np.generic) else str(o)), versions)
+            return value
+        return wrapper
+    return deco
+
+def _counts_dict(s: Optional[pd.Series]) -> Optional[Dict[str, int]]:
+    return None if s is None else {str(k): int(v) for k, v in s.items()}
+
+def _encode_conversion(v: Dict[str, object]) -> Dict[str, object]:
+    return {**v, "leads_stage_counts": _counts_dict(v["leads_stage_counts"]),
+            "ncl_flag_counts": _counts_dict(v["ncl_flag_counts"])}
+
+def _decode_conversion(p: Dict[str, object]) -> Dict[str, object]:
+    return {**p,
+            "leads_stage_counts": None if p["leads_stage_counts"] is None else pd.Series(p["leads_stage_counts"], name="count"),
+            "ncl_flag_counts": None if p["ncl_flag_counts"] is None else pd.Series(p["ncl_flag_counts"], name="count"),
+            "init_in_shape": tuple(p["init_in_shape"]), "disc_in_shape": tuple(p["disc_in_shape"])}
+
+@_snapshotted("firm_conversion", _encode_conversion, _decode_conversion)
+@_memoized_report
+def _conversion_summary(df_leads: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame,
+                        df_ncl: pd.DataFrame, sd: date, ed: date) -> Dict[str, object]:
+    """Firm Conversion rows 1–11 for [sd, ed] plus the small reconciliation details the debug panels show."""
+    counts = dict(_kpi_values(df_leads, df_init, df_disc, df_ncl, sd, ed,
+                              ("leads", "pncs", "retained_without_consult", "scheduled", "showed",
+                               "retained_after_consult", "retained")))
+    counts.update(_funnel_ratios(counts))
+
+    leads_v, ic_v, dm_v, ncl_v = (_kpi_view(src, df) for src, df in
+                                  (("LEADS", df_leads), ("IC", df_init), ("DM", df_disc), ("NCL", df_ncl)))
+    def in_range(view):
+        return view.loc[KPI_FILTERS["in_range"](view, sd, ed)] if not view.empty else view
+    stage_counts = ncl_flag_col = flag_counts = None
+    if not leads_v.empty and "Stage" in df_leads.columns:
+        stage_counts = (df_leads.loc[KPI_FILTERS["in_batch_period"](leads_v, sd, ed), "Stage"]
+                        .astype(str).value_counts(dropna=False))
+    if not ncl_v.empty and ncl_v.attrs["columns"]["flag"]:
+        ncl_flag_col = ncl_v.attrs["columns"]["flag"]
+        flag_counts = df_ncl.loc[in_range(ncl_v).index, ncl_flag_col].value_counts(dropna=False)
+
+    return {
+        "rows": {f"row{i}": counts[k] for i, k in enumerate(SUMMARY_ROWS, start=1)},
+        "date_cols": {key: (v.attrs["columns"]["date"] if not v.empty else None)
+                      for key, v in (("IC", ic_v), ("DM", dm_v), ("NCL", ncl_v))},
+        "ncl_flag_col": ncl_flag_col,
+        "leads_stage_counts": stage_counts,
+        "init_in_shape": (len(in_range(ic_v)), df_init.shape[1]),
+        "disc_in_shape": (len(in_range(dm_v)), df_disc.shape[1]),
+        "ncl_flag_counts": flag_counts,
+    }
+
+# --- Period-over-period comparisons (evaluated in one batched pass with _kpi_windows) ---
+COMPARISONS = ("Previous period", "Same period last year", "Trailing 3-mo avg")
+
+def _shift_month(d: date, k: int) -> date:
+    """Same day k months away, clamped to that month's length."""
+    y, m = divmod(d.year * 12 + d.month - 1 + k, 12)
+    return date(y, m + 1, min(d.day, monthrange(y, m + 1)[1]))
+
+def _shift_window(sd: date, ed: date, k: int) -> Tuple[date, date]:
+    """[sd, ed] moved k months; an end on a month's last day stays on the last day."""
+    ned = _shift_month(ed, k)
+    if ed.day == monthrange(ed.year, ed.month)[1]:
+        ned = ned.replace(day=monthrange(ned.year, ned.month)[1])
+    return _shift_month(sd, k), ned
+
+def _firm_week(year: int, month: int, idx: int) -> Tuple[date, date]:
+    """Firm week `idx` of a month (its last week when the month has fewer), from custom_weeks_for_month."""
+    weeks = custom_weeks_for_month(year, month)
+    wk = weeks[idx] if idx < len(weeks) else weeks[-1]
+    return wk["start"], wk["end"]
+
+def _comparison_windows(period_mode: str, sd: date, ed: date,
+                        week_idx: int = 0) -> Dict[str, Tuple[Tuple[date, date], ...]]:
+    """
+    The windows behind each COMPARISONS column (empty when it does not apply):
+      • Month to date / Full month → the same span one month back and one year back;
+        trailing = the same span in each of the three months before
+      • Week of month → the previous firm week, the same firm week a year back, and
+        the same firm week of each of the three months before
+      • Year to date → last year's same span only
+      • Custom range → the preceding window of equal length and the same dates last year
+    """
+    if period_mode == "Week of month":
+        def week_back(k):
+            m = _shift_month(sd.replace(day=1), -k)
+            return _firm_week(m.year, m.month, week_idx)
+        if week_idx > 0:
+            prev = _firm_week(sd.year, sd.month, week_idx - 1)
+        else:
+            m = _shift_month(sd.replace(day=1), -1)
+            prev = _firm_week(m.year, m.month, len(custom_weeks_for_month(m.year, m.month)) - 1)
+        return dict(zip(COMPARISONS, ((prev,), (week_back(12),), tuple(week_back(k) for k in (1, 2, 3)))))
+    if period_mode == "Year to date":
+        return dict(zip(COMPARISONS, ((), (_shift_window(sd, ed, -12),), ())))
+    if period_mode == "Custom range":
+        span = timedelta(days=(ed - sd).days + 1)
+        return dict(zip(COMPARISONS, (((sd - span, sd - timedelta(days=1)),), (_shift_window(sd, ed, -12),), ())))
+    return dict(zip(COMPARISONS, ((_shift_window(sd, ed, -1),), (_shift_window(sd, ed, -12),),
+                                  tuple(_shift_window(sd, ed, -k) for k in (1, 2, 3)))))
+
+@_memoized_report
+def _kpi_compare(df_leads: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame, df_ncl: pd.DataFrame,
+                 compare: Tuple[Tuple[str, Tuple[Tuple[date, date], ...]], ...],
+                 names: Tuple[str, ...]) -> Dict[str, Optional[Dict[str, object]]]:
+    """
+    KPI values per comparison column — averaged over the column's windows (the trailing average) —
+    from a single _kpi_windows pass over every window involved; None for a column without windows.
+    """
+    windows = tuple(dict.fromkeys(w for _, ws in compare for w in ws))
+    values = dict(zip(windows, _kpi_windows(df_leads, df_init, df_disc, df_ncl, windows, names))) if windows else {}
+    out: Dict[str, Optional[Dict[str, object]]] = {}
+    for label, ws in compare:
+        if not ws:
+            out[label] = None
+            continue
+        out[label] = {name: (sum(values[w][name] for w in ws) / len(ws) if len(ws) > 1 else values[ws[0]][name])
+                      for name in names}
+    return out
+
+def _fmt_count(v) -> str:
+    """A count, or a trailing average with one decimal."""
+    v = float(v)
+    return str(int(v)) if v.is_integer() else f"{v:.1f}"
+
+def _conversion_comparison(df_leads: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame,
+                           df_ncl: pd.DataFrame, compare) -> Dict[str, Optional[Tuple[str, ...]]]:
+    """Summary rows 1–11, formatted, for each comparison column (None when it does not apply)."""
+    counts = _kpi_compare(df_leads, df_init, df_disc, df_ncl, compare,
+                          ("leads", "pncs", "retained_without_consult", "scheduled", "showed",
+                           "retained_after_consult", "retained"))
+    out = {}
+    for label, c in counts.items():
+        if c is None:
+            out[label] = None
+            continue
+        c = {**c, **_funnel_ratios(c)}
+        out[label] = tuple(f"{c[k]}%" if k in FUNNEL_RATIOS else _fmt_count(c[k]) for k in SUMMARY_ROWS)
+    return out
+
+# ───────────────────────────────────────────────────────────────────────────────
+# 📊 Practice Area Report
+# ───────────────────────────────────────────────────────────────────────────────
+# --- Roster & display overrides ---
+PRACTICE_AREAS = {
+    "Estate Planning": ["Connor Watkins", "Jennifer Fox", "Rebecca Megel"],
+    "Estate Administration": [
+        "Adam Hill", "Elias Kerby", "Elizabeth Ross", "Garrett Kizer",
+        "Kyle Grabulis", "Sarah Kravetz",
+        # NEW hires:
+        "Jamie Kliem", "Carter McClain",
+    ],
+    "Civil Litigation": [
+        "Andrew Suddarth", "William Bang", "Bret Giaimo",
+        "Hannah Supernor", "Laura Kouremetis", "Lukios Stefan", "William Gogoel"
+    ],
+    "Business transactional": ["Kevin Jaros"],
+}
+OTHER_ATTORNEYS = ["Robert Brown", "Justine Sennott", "Paul Abraham"]
+
+DISPLAY_NAME_OVERRIDES = {
+    "Elias Kerby": "Eli Kerby",
+    "William Bang": "Billy Bang",
+    "William Gogoel": "Will Gogoel",
+    "Andrew Suddarth": "Andy Suddarth",
+}
+
+def _practice_for(name: str) -> str:
+    for pa, names in PRACTICE_AREAS.items():
+        if name in names:
+            return pa
+    return "Other"
+
+def _disp(n: str) -> str:
+    return DISPLAY_NAME_OVERRIDES.get(n, n)
+
+# Initials mapping for NCL (E column)
+INITIALS_TO_ATTORNEY = {
+    "CW":"Connor Watkins","JF":"Jennifer Fox","RM":"Rebecca Megel",
+    "AH":"Adam Hill","EK":"Elias Kerby","ER":"Elizabeth Ross",
+    "GK":"Garrett Kizer","KG":"Kyle Grabulis","SK":"Sarah Kravetz",
+    "AS":"Andrew Suddarth","WB":"William Bang","BG":"Bret Giaimo",
+    "HS":"Hannah Supernor","LK":"Laura Kouremetis","LS":"Lukios Stefan",
+    "WG":"William Gogoel","KJ":"Kevin Jaros",
+    # NEW EA
+    "JK":"Jamie Kliem","CM":"Carter McClain",
+    # Other bucket we track explicitly
+    "RB":"Robert Brown","JS":"Justine Sennott","PA":"Paul Abraham",
+}
+
+# Canonical list (stable order) - include all attorneys from practice areas
+CANON = list(dict.fromkeys(sum(PRACTICE_AREAS.values(), [])))
+# Add "Other" as a special category for attorneys not in predefined lists
+CANON.append("Other")
+
+# --- Attorney codes: the 'attorney' KPI grouping (see KPI_GROUPS) ---
+_ATTORNEY_INDEX = pd.Index(CANON)
+_CANON_PRACTICE = np.array([_practice_for(a) if a != "Other" else "Other" for a in CANON])
+_OTHER_CODE = CANON.index("Other")
+
+def _attorney_codes(names: pd.Series) -> np.ndarray:
+    """Full names → CANON codes; unknown non-blank names → 'Other', blanks → -1."""
+    codes = _ATTORNEY_INDEX.get_indexer(names)
+    codes[(codes < 0) & names.ne("").to_numpy()] = _OTHER_CODE
+    return codes
+
+def _initials_codes(initials: pd.Series) -> np.ndarray:
+    """
+    Responsible-attorney initials → CANON codes via a categorical lookup:
+    each distinct raw value is resolved once through INITIALS_TO_ATTORNEY,
+    unknown/blank initials (and tracked non-roster names) → 'Other'.
+    """
+    cat = initials if isinstance(initials.dtype, pd.CategoricalDtype) else initials.astype(str).astype("category")
+    lookup = np.array([
+        CANON.index(name) if name in CANON else _OTHER_CODE
+        for name in (INITIALS_TO_ATTORNEY.get(re.sub(r"[^A-Z]", "", str(v).upper()), "Other")
+                     for v in cat.cat.categories)
+    ] or [_OTHER_CODE], dtype=np.int64)
+    codes = cat.cat.codes.to_numpy()
+    return np.where(codes >= 0, lookup[codes], _OTHER_CODE)
+
+def _pct_series(numer: pd.Series, denom: pd.Series, ndigits: int) -> pd.Series:
+    """Column-wise numer/denom*100, 0.0 where denom is 0."""
+    numer = numer.astype(float); denom = denom.astype(float)
+    return (numer / denom.where(denom != 0) * 100.0).round(ndigits).fillna(0.0)
+
+def _encode_practice_area(v) -> Dict[str, Dict[str, int]]:
+    _, report, _ = v
+    return {"met": dict(zip(report["Attorney"], report["PNCs who met"])),
+            "retained": dict(zip(report["Attorney"], report["PNCs who met and retained"]))}
+
+def _decode_practice_area(p: Dict[str, Dict[str, int]]):
+    # Re-aligned on today's roster: an attorney added since the snapshot shows 0
+    return _practice_area_tables(pd.Series(p["met"], dtype=int).reindex(CANON, fill_value=0),
+                                 pd.Series(p["retained"], dtype=int).reindex(CANON, fill_value=0))
+
+@_snapshotted("practice_area", _encode_practice_area, _decode_practice_area)
+@_memoized_report
+def _practice_area_report(df_init: pd.DataFrame, df_disc: pd.DataFrame, df_ncl: pd.DataFrame,
+                          sd: date, ed: date) -> Tuple[pd.Series, pd.DataFrame, pd.DataFrame]:
+    """Per-attorney met/retained report over CANON plus its practice-area roll-up."""
+    kpis = _kpi_values(pd.DataFrame(), df_init, df_disc, df_ncl, sd, ed,
+                       ("met_with_attorney", "retained_with_attorney"))
+    return _practice_area_tables(kpis["met_with_attorney"], kpis["retained_with_attorney"])
+
+def _practice_area_tables(met_by_attorney: pd.Series,
+                          retained_by_attorney: pd.Series) -> Tuple[pd.Series, pd.DataFrame, pd.DataFrame]:
+    """Per-attorney report and practice-area roll-up from the met / met-and-retained counts over CANON."""
+    report = pd.DataFrame({
+        "Attorney": CANON,
+        "Practice Area": _CANON_PRACTICE,
+        "PNCs who met": met_by_attorney.to_numpy(),
+        "PNCs who met and retained": retained_by_attorney.to_numpy(),
+        "Attorney_Display": [ "Other" if a == "Other" else _disp(a) for a in CANON ],
+    })
+    # Individual attorney's "met with" count is the denominator
+    report["% of PNCs who met and retained"] = _pct_series(
+        report["PNCs who met and retained"], report["PNCs who met"], 2)
+
+    # Practice-area roll-up: one groupby, percentages column-wise
+    pa_rollup = report.groupby("Practice Area", sort=False)[["PNCs who met", "PNCs who met and retained"]].sum()
+    pa_rollup["% of PNCs who met and retained"] = _pct_series(
+        pa_rollup["PNCs who met and retained"], pa_rollup["PNCs who met"], 0)
+    return met_by_attorney, report, pa_rollup
+
+def _practice_area_comparison(df_init: pd.DataFrame, df_disc: pd.DataFrame, df_ncl: pd.DataFrame,
+                              compare) -> Dict[str, Optional[Tuple[pd.Series, pd.DataFrame, pd.DataFrame]]]:
+    """Practice-area tables for each comparison column (None when it does not apply)."""
+    counts = _kpi_compare(pd.DataFrame(), df_init, df_disc, df_ncl, compare,
+                          ("met_with_attorney", "retained_with_attorney"))
+    return {label: None if c is None else _practice_area_tables(c["met_with_attorney"], c["retained_with_attorney"])
+            for label, c in counts.items()}
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Intake Specialist Report
+# ───────────────────────────────────────────────────────────────────────────────
+
+# --- Intake Specialist mappings ---
+INTAKE_SPECIALISTS = [
+    "Anastasia Economopoulos", "Aneesah Shaik", "Azariah Pillay", "Chloe Lansdell",
+    "Earl Michaels", "Faeryal Sahadeo", "Kaithlyn Maharaj", "Micayla Sam",
+    "Nathanial Beneke", "Nobuhle Mnikathi", "Rialet van Heerden", "Sihle Gadu",
+    "Thabang Tshubyane", "Tiffany Pillay"
+]
+
+INTAKE_INITIALS_TO_NAME = {
+    "AE": "Anastasia Economopoulos",
+    "AS": "Aneesah Shaik", 
+    "AP": "Azariah Pillay",
+    "CL": "Chloe Lansdell",
+    "EM": "Earl Michaels",
+    "FS": "Faeryal Sahadeo",
+    "KM": "Kaithlyn Maharaj",
+    "MS": "Micayla Sam",
+    "NB": "Nathanial Beneke",
+    "NM": "Nobuhle Mnikathi",
+    "RH": "Rialet van Heerden",
+    "SG": "Sihle Gadu",
+    "TT": "Thabang Tshubyane",
+    "TP": "Tiffany Pillay"
+}
+
+# --- Intake conversion calculations (the 'intake' KPI grouping, see KPI_DEFS) ---
+intake_specialists = INTAKE_SPECIALISTS + ["Everyone Else"]
+
+def _intake_codes(names: pd.Series) -> np.ndarray:
+    """Assigned Intake Specialist names → intake_specialists positions; anyone else → 'Everyone Else'."""
+    codes = pd.Index(INTAKE_SPECIALISTS).get_indexer(names.astype(str))
+    codes[codes < 0] = len(INTAKE_SPECIALISTS)
+    codes[names.isna().to_numpy()] = -1   # sheet has no intake column
+    return codes
+
+def _intake_codes_from_initials(initials: pd.Series) -> np.ndarray:
+    """NCL 'Primary Intake?' initials → intake_specialists positions; unknown initials → 'Everyone Else'."""
+    lookup = {init: (INTAKE_SPECIALISTS.index(name) if name in INTAKE_SPECIALISTS else -1)
+              for init, name in INTAKE_INITIALS_TO_NAME.items()}
+    codes = initials.astype(str).map(lookup).fillna(len(INTAKE_SPECIALISTS)).astype(int)
+    return np.where(initials.isna(), -1, codes)   # -1: sheet has no intake column
+
+_INTAKE_FUNNEL = {  # funnel stage → intake KPI
+    "pncs": "intake_pncs", "retained_without_consult": "intake_retained_without_consult",
+    "scheduled": "intake_scheduled", "showed": "intake_showed",
+    "retained_after_consult": "intake_retained_after_consult", "retained": "intake_retained",
+}
+_INTAKE_ALL_FUNNEL = {  # funnel stage → ungrouped KPI of the "ALL" row (the firm's, same filters as the intake KPIs)
+    "pncs": "pncs", "retained_without_consult": "retained_without_consult", "scheduled": "scheduled",
+    "showed": "intake_all_showed", "retained_after_consult": "retained_after_consult", "retained": "retained",
+}
+_INTAKE_KPIS = tuple(_INTAKE_FUNNEL.values()) + tuple(_INTAKE_ALL_FUNNEL.values())
+
+def _intake_rows(counts: Dict[str, int], total_pncs: int) -> Dict[str, int]:
+    """One intake summary record from funnel-stage counts (a specialist, or the ungrouped "ALL" counts)."""
+    pct = _funnel_ratios(counts)
+    return {
+        "PNCs did intake": counts["pncs"],
+        "% of total PNCs": _pct(counts["pncs"], total_pncs) if total_pncs > 0 else 0,
+        "Retained without consult": counts["retained_without_consult"],
+        "Scheduled consult": counts["scheduled"],
+        "% remaining scheduled": pct["scheduled_pct"],
+        "Showed up": counts["showed"],
+        "% showed up": pct["showed_pct"],
+        "Retained after consult": counts["retained_after_consult"],
+        "% retained after consult": pct["retained_after_pct"],
+        "Total retained": counts["retained"],
+        "% total retained": pct["retained_pct"],
+    }
+
+@_snapshotted("intake", lambda v: v, lambda p: p)
+@_memoized_report
+def _intake_report(df_leads: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame, df_ncl: pd.DataFrame,
+                   sd: date, ed: date, total_pncs: int) -> Dict[str, Dict[str, int]]:
+    """Intake rows for "ALL" and every specialist; total_pncs is the firm PNC count used for '% of total PNCs'.
+    "ALL" is counted ungrouped rather than summed, so a PNC handled by two specialists is counted once."""
+    kpis = _kpi_values(df_leads, df_init, df_disc, df_ncl, sd, ed, _INTAKE_KPIS)
+    return {
+        "ALL": _intake_rows({stage: int(kpis[k]) for stage, k in _INTAKE_ALL_FUNNEL.items()}, total_pncs),
+        **{specialist: _intake_rows({stage: int(kpis[k][specialist]) for stage, k in _INTAKE_FUNNEL.items()}, total_pncs)
+           for specialist in intake_specialists},
+    }
+
+_INTAKE_ROW_KEYS = ("PNCs did intake", "% of total PNCs", "Retained without consult", "Scheduled consult",
+                    "% remaining scheduled", "Showed up", "% showed up", "Retained after consult",
+                    "% retained after consult", "Total retained", "% total retained")
+
+def _intake_comparison(df_leads: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame, df_ncl: pd.DataFrame,
+                       compare) -> Dict[str, Optional[Dict[str, Dict[str, int]]]]:
+    """Intake results ("ALL" and every specialist) for each comparison column (None when it does not apply)."""
+    counts = _kpi_compare(df_leads, df_init, df_disc, df_ncl, compare, _INTAKE_KPIS)
+    out = {}
+    for label, c in counts.items():
+        if c is None:
+            out[label] = None
+            continue
+        out[label] = {
+            "ALL": _intake_rows({stage: c[k] for stage, k in _INTAKE_ALL_FUNNEL.items()}, c["pncs"]),
+            **{specialist: _intake_rows({stage: c[k][specialist] for stage, k in _INTAKE_FUNNEL.items()}, c["pncs"])
+               for specialist in intake_specialists},
+        }
+    return out
+
+# --- Snapshot closed months: those queued by uploads / removals, and the month that just closed ---
+def _commit_snapshots(frames: Dict[str, pd.DataFrame]) -> None:
+    """Store the firm, practice-area and intake reports of every pending closed month (a stored one is a lookup)."""
+    pending = set(st.session_state.pop("snapshot_pending", set()))
+    pending.add(f"{date.today().replace(day=1) - timedelta(days=1):%Y-%m}")
+    for month in sorted(pending):
+        sd, ed = _month_bounds(*map(int, month.split("-")))
+        if _closed_month(sd, ed) is None:
+            continue
+        conv_frames = [frames[k] for k in CONVERSION_KEYS]
+        total_pncs = _conversion_summary(*conv_frames, sd, ed)["rows"]["row2"]
+        _practice_area_report(*conv_frames[1:], sd, ed)
+        _intake_report(*conv_frames, sd, ed, total_pncs)
+
+# ───────────────────────────────────────────────────────────────────────────────
+# 📊 Conversion Trend Visualizations
+# ───────────────────────────────────────────────────────────────────────────────
+# --- Trend engine: every bucket of the window in one batched pass per source ---
+TREND_GRAIN = {"Year to date": "Month", "Quarterly": "Month", "Month to date": "Week"}
+
+def _trend_buckets(mode: str, year: int, month: Optional[int] = None,
+                   quarter: Optional[str] = None) -> Tuple[Tuple[str, date, date], ...]:
+    """
+    (label, start, end) buckets for the visualization window, grouped off the calendar dimension:
+      • Year to date → months of the year, Quarterly → months of the quarter
+      • Month to date → firm weeks of the month
+    Future buckets are dropped and the running one is clamped to today.
+    """
+    cal = _calendar(year, year)
+    if mode == "Month to date":
+        cal = cal.loc[cal["Month"].eq(month)]
+    elif mode == "Quarterly":
+        cal = cal.loc[cal["Quarter"].eq(int(quarter[1]))]
+    key = f"{TREND_GRAIN[mode]} key"
+    full = _calendar_spans(cal, key)                       # labels use the whole firm week
+    buckets = []
+    for k, (sd, ed) in _calendar_spans(cal.loc[~cal["Future"]], key).iterrows():
+        if mode == "Month to date":
+            label = f'{cal.at[sd, "Week label"]} ({sd.day}–{full.at[k, "max"].day} {full.at[k, "max"]:%b})'
+        else:
+            label = months_map_names[sd.month]
+        buckets.append((label, sd.date(), ed.date()))
+    return tuple(buckets)
+
+def _bucket_index(ts: pd.Series, buckets, grain: str) -> np.ndarray:
+    """
+    Row → bucket position (-1 outside every bucket). The buckets are keyed onto the calendar
+    dimension once; each row then joins on its day — no per-bucket masks.
+    """
+    cal = _calendar(buckets[0][1].year, buckets[-1][2].year)
+    keys = cal[f"{grain} key"].to_numpy()
+    starts = keys[cal.index.get_indexer(pd.DatetimeIndex([sd for _, sd, _ in buckets]))]
+    window = (cal.index >= pd.Timestamp(buckets[0][1])) & (cal.index <= pd.Timestamp(buckets[-1][2]))
+    day_bucket = np.where(window, np.searchsorted(starts, keys), -1)
+    day = cal.index.get_indexer(pd.DatetimeIndex(pd.to_datetime(ts, errors="coerce")).normalize())
+    return np.where(day >= 0, day_bucket[day], -1)
+
+def _bucket_counts(pos: np.ndarray, mask, n: int, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    keep = np.asarray(mask, dtype=bool) & (pos >= 0)
+    return np.bincount(pos[keep], weights=None if weights is None else weights[keep], minlength=n).astype(np.int64)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _conversion_trend(_frames: Tuple[pd.DataFrame, ...], data_versions: Tuple[str, ...],
+                      buckets: Tuple[Tuple[str, date, date], ...], grain: str, practice_area: str) -> pd.DataFrame:
+    """
+    Conversion KPIs for every bucket at once. `_frames` = (leads, init, disc, ncl) is not hashed;
+    `data_versions` (per-tab content fingerprints) keys the cache instead; `grain` (TREND_GRAIN)
+    is the calendar key the buckets are joined on.
+
+      • Retained after meeting (%): ALL → Summary row 9 (retained after consult / scheduled);
+        a practice area → Practice Area section (met with its attorneys and retained / met)
+      • Scheduled (%): Summary row 5 — scheduled / (PNCs − retained without consult)
+      • Showed up (%): Summary row 7 — showed / scheduled
+    """
+    leads, ic, dm, ncl = (_kpi_cube(src, df) for src, df in zip(("LEADS", "IC", "DM", "NCL"), _frames))
+    n = len(buckets)
+    pncs, sched, showed, ret_wo, ret_after, met_att, kept_att = (np.zeros(n, dtype=np.int64) for _ in range(7))
+
+    # PNCs — distinct people across the batches overlapping each bucket
+    if not leads.empty:
+        index = _distinct_key_index(_frames[0], "pncs", practice_area)
+        pncs += np.array([sum(_distinct_count(index, sd, ed).values()) for _, sd, ed in buckets], dtype=np.int64)
+
+    # IC + DM — scheduled / showed (Summary rules), met with attorney (Practice Area rules)
+    for view in (ic, dm):
+        if view.empty:
+            continue
+        pos, rows = _bucket_index(view["Date"], buckets, grain), view["Rows"].to_numpy()
+        in_pa = _practice_area_mask(view, practice_area)
+        sched  += _bucket_counts(pos, _kpi_row_mask(view, "scheduled") & in_pa, n, rows)
+        showed += _bucket_counts(pos, _kpi_row_mask(view, "showed") & in_pa, n, rows)
+        if practice_area != "ALL":
+            codes = _attorney_codes(view["Attorney"])
+            of_pa = (codes >= 0) & (_CANON_PRACTICE[codes] == practice_area)
+            met_att += _bucket_counts(pos, _kpi_row_mask(view, "met_with_attorney") & of_pa, n, rows)
+
+    # New Client List — retained with/without consult (Summary rules), per attorney (Practice Area rules)
+    if not ncl.empty:
+        pos, rows = _bucket_index(ncl["Date"], buckets, grain), ncl["Rows"].to_numpy()
+        in_pa = _practice_area_mask(ncl, practice_area)
+        ret_wo    += _bucket_counts(pos, _kpi_row_mask(ncl, "retained_without_consult") & in_pa, n, rows)
+        ret_after += _bucket_counts(pos, _kpi_row_mask(ncl, "retained_after_consult") & in_pa, n, rows)
+        if practice_area != "ALL":
+            codes = _initials_codes(ncl["Initials"])
+            of_pa = (codes >= 0) & (_CANON_PRACTICE[codes] == practice_area)
+            kept_att += _bucket_counts(pos, _kpi_row_mask(ncl, "retained_with_attorney") & of_pa, n, rows)
+
+    out = pd.DataFrame({
+        "Bucket": [lbl for lbl, _, _ in buckets],
+        "Start": [sd for _, sd, _ in buckets],
+        "End": [ed for _, _, ed in buckets],
+        "PNCs": pncs, "Retained without consult": ret_wo, "Scheduled": sched, "Showed": showed,
+        "Retained after consult": ret_after, "Met attorney": met_att, "Met attorney and retained": kept_att,
+    })
+    if practice_area == "ALL":
+        out["Retention Rate (%)"] = _pct_series(out["Retained after consult"], out["Scheduled"], 1)
+    else:
+        out["Retention Rate (%)"] = _pct_series(out["Met attorney and retained"], out["Met attorney"], 1)
+    out["Scheduled Rate (%)"] = _pct_series(out["Scheduled"], out["PNCs"] - out["Retained without consult"], 1)
+    out["Show Up Rate (%)"]   = _pct_series(out["Showed"], out["Scheduled"], 1)
+    return out
+
+# ───────────────────────────────────────────────────────────────────────────────
+# 🔗 Funnel & Cohorts (Leads → IC → DM → NCL joined per person)
+# ───────────────────────────────────────────────────────────────────────────────
+def _first_dates(keys: pd.Series, dates: pd.Series, **flags: pd.Series) -> pd.DataFrame:
+    """Per person key: earliest date overall and earliest date among rows where each flag holds."""
+    frame = pd.DataFrame({"key": keys, "all": dates})
+    for name, flag in flags.items():
+        frame[name] = dates.where(flag.to_numpy())
+    frame = frame.loc[keys.ne("").to_numpy()]
+    return frame.groupby("key", sort=False).min()
+
+@_memoized_report
+def _funnel_table(df_leads: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame,
+                  df_ncl: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per person key (hash index), joining all four masters once per data version:
+      Lead Date (earliest lead batch start), PNC, Practice Area, Intake Specialist,
+      first scheduled / met IC and DM dates (Summary rules), Retained Date and whether it was with consult,
+      plus Consult Date, Met Date, Days to Consult and Days to Retain (from Lead Date; left empty when the
+      event predates the lead's batch).
+    """
+    parts = []
+    if not df_leads.empty:
+        keys = _person_keys(df_leads)
+        lead_date = (pd.to_datetime(df_leads["__batch_start"], errors="coerce")
+                     if "__batch_start" in df_leads.columns else pd.Series(pd.NaT, index=df_leads.index))
+        is_pnc = (~_text(df_leads["Stage"]).isin(EXCLUDED_PNC_STAGES) if "Stage" in df_leads.columns
+                  else pd.Series(False, index=df_leads.index))
+        leads = pd.DataFrame({"key": keys, "Lead Date": lead_date, "PNC": is_pnc.to_numpy()})
+        for label, names in (("Practice Area", ["Practice Area"]), ("Intake Specialist", ["Assigned Intake Specialist"])):
+            col = _find_col(df_leads, names)
+            leads[label] = _text(df_leads[col]).astype(str).to_numpy() if col else ""
+        leads = leads.loc[keys.ne("").to_numpy()].sort_values("Lead Date", kind="stable")
+        parts.append(leads.groupby("key", sort=False).agg(**{
+            "Lead Date": ("Lead Date", "min"), "PNC": ("PNC", "any"),
+            "Practice Area": ("Practice Area", "first"), "Intake Specialist": ("Intake Specialist", "first"),
+        }))
+
+    for df, tag in ((df_init, "IC"), (df_disc, "DM")):
+        view = _kpi_view(tag, df)
+        if view.empty or not view.attrs["columns"]["date"]:
+            continue
+        first = _first_dates(_person_keys(df), view["Date"],
+                             scheduled=pd.Series(_kpi_row_mask(view, "scheduled"), index=view.index),
+                             met=pd.Series(_kpi_row_mask(view, "showed"), index=view.index))
+        parts.append(first[["scheduled", "met"]].rename(columns={"scheduled": f"{tag} Scheduled", "met": f"{tag} Met"}))
+
+    ncl = _kpi_view("NCL", df_ncl)
+    if not ncl.empty and ncl.attrs["columns"]["date"]:
+        first = _first_dates(_person_keys(df_ncl), ncl["Date"], with_consult=~ncl["WithoutConsult"])
+        parts.append(pd.DataFrame({"Retained Date": first["all"],
+                                   "Retained With Consult": first["with_consult"].notna()}, index=first.index))
+
+    cols = ["Lead Date", "PNC", "Practice Area", "Intake Specialist", "IC Scheduled", "IC Met",
+            "DM Scheduled", "DM Met", "Retained Date", "Retained With Consult"]
+    funnel = pd.concat(parts, axis=1, join="outer") if parts else pd.DataFrame()
+    funnel = funnel.reindex(columns=cols)
+    for c in ("Lead Date", "IC Scheduled", "IC Met", "DM Scheduled", "DM Met", "Retained Date"):
+        funnel[c] = pd.to_datetime(funnel[c], errors="coerce")
+    funnel["PNC"] = funnel["PNC"].eq(True)
+    funnel["Retained With Consult"] = funnel["Retained With Consult"].eq(True)
+    funnel["Consult Date"] = funnel[["IC Scheduled", "DM Scheduled"]].min(axis=1)
+    funnel["Met Date"] = funnel[["IC Met", "DM Met"]].min(axis=1)
+    for c, since in (("Days to Consult", "Consult Date"), ("Days to Retain", "Retained Date")):
+        days = (funnel[since] - funnel["Lead Date"]).dt.days
+        funnel[c] = days.where(days >= 0)
+    funnel.index.name = "Person"
+    return funnel
+
+@_memoized_report
+def _funnel_cohorts(df_leads: pd.DataFrame, df_init: pd.DataFrame, df_disc: pd.DataFrame,
+                    df_ncl: pd.DataFrame, year: int) -> pd.DataFrame:
+    """Leads of each month of `year` (by Lead Date) and where they ended up."""
+    funnel = _funnel_table(df_leads, df_init, df_disc, df_ncl)
+    cohort = funnel.loc[funnel["Lead Date"].dt.year.eq(year).to_numpy()]
+    if cohort.empty:
+        return pd.DataFrame()
+    out = cohort.groupby(cohort["Lead Date"].dt.month, sort=True).agg(**{
+        "Leads": ("PNC", "size"),
+        "PNCs": ("PNC", "sum"),
+        "Scheduled consult": ("Consult Date", "count"),
+        "Showed up": ("Met Date", "count"),
+        "Retained": ("Retained Date", "count"),
+        "Median days to consult": ("Days to Consult", "median"),
+        "Median days to retain": ("Days to Retain", "median"),
+    })
+    out["% scheduled"] = _pct_series(out["Scheduled consult"], out["Leads"], 1)
+    out["% showed up"] = _pct_series(out["Showed up"], out["Scheduled consult"], 1)
+    out["% retained"]  = _pct_series(out["Retained"], out["Leads"], 1)
+    out.index = [months_map_names[m] for m in out.index]
+    out.index.name = "Lead month"
+    return out
+
+# --- Estate Planning inclusion audit (row-level) ---
+EP_NAMES = ["Connor Watkins", "Jennifer Fox", "Rebecca Megel"]
+_EP_AUDIT_COLS = ["Attorney","Date","Source","Sub Status","Reason","InRange","IsFollowUp","HasCanceledMeeting","HasNoShow","Included"]
+
+def _audit_sheet(df: pd.DataFrame, src: str, sd: date, ed: date) -> pd.DataFrame:
+    """EP rows of one meeting sheet, with the flags of its KPI view and whether 'met_with_attorney' counts them."""
+    view = _kpi_view(src, df)
+    if view.empty:
+        return pd.DataFrame(columns=_EP_AUDIT_COLS)
+    t = view.assign(Attorney=view["Attorney"].astype(str), Source=src,
+                    InRange=KPI_FILTERS["in_range"](view, sd, ed),
+                    Included=_kpi_row_mask(view, "met_with_attorney", sd, ed))
+    return t.loc[t["Attorney"].isin(EP_NAMES), _EP_AUDIT_COLS].copy()
+
+@_memoized_report
+def _ep_inclusion_audit(df_init: pd.DataFrame, df_disc: pd.DataFrame, sd: date, ed: date) -> pd.DataFrame:
+    """Row-level EP audit over IC (L/M/G/I) and DM (L/P/G/I)."""
+    ic_audit = _audit_sheet(df_init, "IC", sd, ed)
+    dm_audit = _audit_sheet(df_disc, "DM", sd, ed)
+    if ic_audit.empty and dm_audit.empty:
+        return pd.DataFrame()
+    return pd.concat([ic_audit, dm_audit], ignore_index=True)
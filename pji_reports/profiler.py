@@ -0,0 +1,146 @@
+# pji_reports/profiler.py
+# Per-rerun instrumentation: timed spans and counters kept in session state, with a rolling history
+
+import time
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import streamlit as st
+
+PROFILE_HISTORY = 50     # completed reruns kept per session
+PROFILE_MAX_SPANS = 500  # spans kept per rerun; more are only counted (spans.dropped)
+
+_thread = threading.local()   # .run: trace of a background thread (see thread_run), not of the page rerun
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Run lifecycle
+# ───────────────────────────────────────────────────────────────────────────────
+def _new_run(kind: str) -> dict:
+    history = st.session_state.get("profile_history")
+    last = history[-1]["run"] if history else 0
+    return {"run": last + 1, "kind": kind, "started": datetime.now().isoformat(timespec="seconds"),
+            "complete": False, "total_ms": 0.0, "spans": [], "counters": {},
+            "_t0": time.perf_counter(), "_depth": 0}
+
+def _archive(run: dict, complete: bool) -> dict:
+    """Close `run` and append it to this session's history (JSON-ready: no private keys)."""
+    done = {k: v for k, v in run.items() if not k.startswith("_")}
+    done["complete"] = complete
+    done["total_ms"] = round((time.perf_counter() - run["_t0"]) * 1000, 1)
+    done["spans"] = sorted(run["spans"], key=lambda s: (s["start_ms"], s["depth"]))
+    history = st.session_state.setdefault("profile_history", deque(maxlen=PROFILE_HISTORY))
+    history.append(done)
+    return done
+
+def begin_run(kind: str = "full") -> None:
+    """Start this rerun's trace. A trace left open by an interrupted run (st.stop, st.rerun) is archived
+    first, marked incomplete."""
+    if st.session_state.get("profile_run") is not None:
+        _archive(st.session_state["profile_run"], complete=False)
+    st.session_state["profile_run"] = _new_run(kind)
+
+def end_run() -> Optional[dict]:
+    """Close this rerun's trace and return it as archived."""
+    run = st.session_state.pop("profile_run", None)
+    return _archive(run, complete=True) if run is not None else None
+
+def _current() -> dict:
+    """The open trace; work outside any run (bare mode, e.g. the CLI) opens an 'unscoped' one."""
+    run = getattr(_thread, "run", None)
+    if run is not None:
+        return run
+    run = st.session_state.get("profile_run")
+    if run is None:
+        run = st.session_state["profile_run"] = _new_run("unscoped")
+    return run
+
+@contextmanager
+def thread_run(kind: str):
+    """Trace a background thread's work as a run of its own, archived to the session's history when done,
+    so its spans never land in whatever page rerun happens to be open."""
+    _thread.run = _new_run(kind)
+    complete = False
+    try:
+        yield
+        complete = True
+    finally:
+        run, _thread.run = _thread.run, None
+        _archive(run, complete)
+
+def run_history() -> List[dict]:
+    return list(st.session_state.get("profile_history", ()))
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Spans and counters
+# ───────────────────────────────────────────────────────────────────────────────
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as one span of this rerun (nested spans are indented in the panel)."""
+    run = _current()
+    depth = run["_depth"]
+    run["_depth"] = depth + 1
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        run["_depth"] = depth
+        if len(run["spans"]) < PROFILE_MAX_SPANS:
+            run["spans"].append({"name": name, "depth": depth,
+                                 "start_ms": round((t - run["_t0"]) * 1000, 1),
+                                 "ms": round((time.perf_counter() - t) * 1000, 1)})
+        else:
+            count("spans.dropped")
+
+def profiled(name: str):
+    """Time a page section as span `name`; rerun on its own (an st.fragment) it is traced as a 'fragment' run."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if st.session_state.get("profile_run") is not None:
+                with span(name):
+                    return fn(*args, **kwargs)
+            begin_run("fragment")
+            with span(name):
+                value = fn(*args, **kwargs)
+            end_run()
+            return value
+        return wrapper
+    return deco
+
+def count(name: str, n: float = 1) -> None:
+    counters = _current()["counters"]
+    counters[name] = counters.get(name, 0) + n
+
+def counter(name: str) -> float:
+    return _current()["counters"].get(name, 0)
+
+def api_call(kind: str, seconds: float = 0.0, bytes_in: int = 0, bytes_out: int = 0, error: bool = False) -> None:
+    """Account one Sheets API request: calls per endpoint family, errors, time and bytes on the wire."""
+    count("sheets.calls")
+    count(f"sheets.{kind}")
+    count("sheets.ms", round(seconds * 1000, 1))
+    if bytes_in:
+        count("sheets.bytes_in", bytes_in)
+    if bytes_out:
+        count("sheets.bytes_out", bytes_out)
+    if error:
+        count("sheets.errors")
+
+def run_summary(run: dict) -> Dict[str, object]:
+    """One history row: totals, Sheets traffic, cache outcomes and the slowest top-level span."""
+    c = run["counters"]
+    top = [s for s in run["spans"] if s["depth"] == 0]
+    slowest = max(top, key=lambda s: s["ms"]) if top else None
+    return {
+        "Run": run["run"], "Started": run["started"], "Kind": run["kind"], "Complete": run["complete"],
+        "Total (ms)": run["total_ms"],
+        "Sheets calls": int(c.get("sheets.calls", 0)), "Sheets (ms)": round(c.get("sheets.ms", 0), 1),
+        "KB in": round(c.get("sheets.bytes_in", 0) / 1024, 1), "KB out": round(c.get("sheets.bytes_out", 0) / 1024, 1),
+        "Read cache hit/miss": f"{int(c.get('read_cache.hit', 0))}/{int(c.get('read_cache.miss', 0))}",
+        "Report cache hit/miss": f"{int(c.get('report_cache.hit', 0))}/{int(c.get('report_cache.miss', 0))}",
+        "Slowest section": f"{slowest['name']} ({slowest['ms']:.0f} ms)" if slowest else "",
+    }
@@ -0,0 +1,1171 @@
+# pji_reports/render.py
+# Streamlit widgets and sections (sidebar, upload panel, report sections, debug panels)
+
+import io
+import json
+import datetime as dt
+from datetime import date, datetime
+from typing import List, Dict, Tuple, Optional
+import functools
+
+import pandas as pd
+import streamlit as st
+
+from .ingest import (
+    _between_inclusive, CALLS_INGEST_MODES, _col_by_idx, _dedupe_rows, file_md5, _fmt_hms, _is_no,
+    detect_upload_kind, month_key_from_range, _ncl_columns, _read_headers, validate_single_month_range
+)
+from .store import (
+    assign_batch_to_orphaned_records, create_empty_sheet_with_headers,
+    _data_version, generate_batch_id, get_available_batches, log, master_reset, _masters, _mv_store,
+    _process_log, _read_ws_by_name, remove_batch_from_sheet, _report_cache, _session_log, _sheet, _snapshot_changed,
+    sync_from_master_sheet, TAB_NAMES, _write_ws_by_name
+)
+from .jobs import _ingest_queue, IngestJob, JOB_HISTORY, JOB_POLL_SECONDS
+from .profiler import profiled, run_history, run_summary
+from .metrics import (
+    _calendar_window, _call_hours_grid, _calls_rollup, _comparison_windows, _conversion_comparison,
+    _conversion_summary, _conversion_trend, custom_weeks_for_month, _EP_AUDIT_COLS,
+    _ep_inclusion_audit, _fmt_count, _funnel_cohorts, FUNNEL_RATIOS, _funnel_table,
+    _intake_comparison, _intake_report, _INTAKE_ROW_KEYS, intake_specialists,
+    _kpi_row_mask, _kpi_view, month_num_to_name, month_nums, months_map, months_map_names,
+    _practice_area_comparison, _practice_area_report, SUMMARY_LABELS, SUMMARY_ROWS, _trend_buckets,
+    TREND_GRAIN
+)
+
+@functools.lru_cache(maxsize=None)
+def _plotly():
+    """plotly.express, imported on the first chart rather than at startup; None when plotly is not installed."""
+    try:
+        import plotly.express as px
+    except Exception:
+        return None
+    return px
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Render Admin Sidebar early so it always shows
+# ───────────────────────────────────────────────────────────────────────────────
+def render_admin_sidebar():
+    with st.sidebar.expander("📦 Master Data (Google Sheets) — Admin", expanded=False):
+        if _sheet() is None:
+            st.warning("Not connected to the master store.")
+            st.caption("Add `[gcp_service_account]` and `[master_store]` to Secrets.")
+            if st.button("🧹 Master Reset (session & caches)", use_container_width=True):
+                for k in ["hashes_calls","hashes_conv","exp_upload_open","log_ring"]:
+                    st.session_state.pop(k, None)
+                try: st.cache_data.clear()
+                except: pass
+                try: st.cache_resource.clear()
+                except: pass
+                st.success("Reset complete. Reloading…"); st.rerun()
+            return
+
+        st.success("Connected to Master Store (Google Sheets).")
+        st.caption("Tabs used: " + ", ".join(TAB_NAMES.values()))
+
+        if st.button("🔄 Refresh data now", use_container_width=True):
+            st.session_state["gs_ver"] += 1
+            st.rerun()
+
+        sheets = {
+            "Calls": "CALLS",
+            "Calls hourly cube": "CALL_HOURS",
+            "Leads/PNCs": "LEADS",
+            "Initial Consultation": "INIT",
+            "Discovery Meeting": "DISC",
+            "New Client List": "NCL",
+        }
+        sel_label = st.selectbox("Select sheet", list(sheets.keys()))
+        key = sheets[sel_label]
+
+        colY, colM = st.columns(2)
+        yr = colY.number_input("Year", min_value=2000, max_value=2100,
+                               value=date.today().year, step=1)
+        mo = colM.number_input("Month", min_value=1, max_value=12,
+                               value=date.today().month, step=1)
+
+        def _date_col_for(logical_key: str) -> Optional[str]:
+            if logical_key == "NCL":  return "Date we had BOTH the signed CLA and full payment"
+            if logical_key == "INIT": return "Initial Consultation With Pji Law"
+            if logical_key == "DISC": return "Discovery Meeting With Pji Law"
+            return None  # LEADS has no single canonical date; CALLS / CALL_HOURS use Month-Year
+
+        def _purge_month(logical_key: str, year: int, month: int) -> tuple[bool, int]:
+            df = _read_ws_by_name(logical_key)
+            if df.empty: return True, 0
+            if logical_key in ("CALLS", "CALL_HOURS"):
+                mkey = f"{year}-{month:02d}"
+                before = len(df)
+                df2 = df.loc[df["Month-Year"].astype(str).str.strip() != mkey].copy()
+                ok = _write_ws_by_name(logical_key, df2)
+                return ok, before - len(df2)
+            date_col = _date_col_for(logical_key)
+            if not date_col or date_col not in df.columns: return False, 0
+            s = pd.to_datetime(df[date_col], errors="coerce")
+            mask_drop = (s.dt.year == int(year)) & (s.dt.month == int(month))
+            removed = int(mask_drop.sum())
+            df2 = df.loc[~mask_drop].copy()
+            ok = _write_ws_by_name(logical_key, df2)
+            _snapshot_changed(logical_key, df.loc[mask_drop])
+            return ok, removed
+
+        def _wipe_all(logical_key: str) -> bool:
+            empty_df = create_empty_sheet_with_headers(logical_key)
+            _snapshot_changed(logical_key)
+            return _write_ws_by_name(logical_key, empty_df)
+
+        def _dedupe_sheet(logical_key: str) -> tuple[bool, int]:
+            df = _read_ws_by_name(logical_key)
+            if df.empty: return True, 0
+            
+            if logical_key == "NCL" and "Retained With Consult (Y/N)" not in df.columns \
+               and "Retained with Consult (Y/N)" in df.columns:
+                df = df.rename(columns={"Retained with Consult (Y/N)": "Retained With Consult (Y/N)"})
+            # Include batch ID in deduplication if available; every row hash is recomputed
+            df2, dup = _dedupe_rows(df, logical_key)
+            ok = _write_ws_by_name(logical_key, df2)
+            if not dup.empty:
+                _snapshot_changed(logical_key, dup)
+            return ok, len(dup)
+
+        st.divider()
+        st.subheader("Maintenance")
+        st.caption("Safely manage master data. Actions are immediate.")
+
+        with st.container(border=True):
+            st.markdown("**Purge a month**")
+            st.caption("Remove all rows for the selected sheet and month (above).")
+            if st.button("Purge Month", use_container_width=True):
+                ok, removed = _purge_month(key, int(yr), int(mo))
+                if ok:
+                    st.success(f"Purged {removed} row(s) for {int(yr)}-{int(mo):02d} in '{sel_label}'.")
+                    if key in ("CALLS", "CALL_HOURS"): st.session_state.get("hashes_calls", set()).clear()
+                    else:              st.session_state.get("hashes_conv", set()).clear()
+                    st.session_state["gs_ver"] += 1; st.rerun()
+                else:
+                    st.warning("Nothing purged (missing date column or unsupported for this sheet).")
+
+        with st.container(border=True):
+            st.markdown("**Re-dedupe sheet**")
+            st.caption("Rebuilds unique rows using the same keys as the uploader, and recomputes every row hash "
+                       "(run it after editing key cells in the sheet by hand).")
+            if st.button("Re-dedupe sheet", use_container_width=True):
+                ok, removed = _dedupe_sheet(key)
+                st.success(f"Removed {removed} duplicate row(s).") if ok else st.error("Re-dedupe failed.")
+                if ok: st.session_state["gs_ver"] += 1; st.rerun()
+
+        with st.container(border=True):
+            st.markdown("**Wipe ALL rows**")
+            st.caption("Deletes every row in the selected sheet. Use with care.")
+            confirm_wipe = st.checkbox("I understand this cannot be undone.", key="confirm_wipe")
+            if st.button("Wipe ALL rows", disabled=not confirm_wipe, use_container_width=True):
+                ok = _wipe_all(key)
+                st.success(f"All rows wiped in '{sel_label}'.") if ok else st.error("Wipe failed.")
+                if ok:
+                    if key in ("CALLS", "CALL_HOURS"): st.session_state.get("hashes_calls", set()).clear()
+                    else:              st.session_state.get("hashes_conv", set()).clear()
+                    st.session_state["gs_ver"] += 1; st.rerun()
+
+        # Consolidated Data Management Section
+        st.divider()
+        st.subheader("🗑️ Data Management")
+        st.caption("Manage data across all sheets and batches.")
+        
+        # Master Reset (All Sheets)
+        with st.container(border=True):
+            st.markdown("**🗑️ Master Reset (All Sheets)**")
+            st.caption("Complete reset - removes all data from ALL sheets but preserves headers")
+            confirm_master_reset = st.checkbox("I understand this will delete ALL data from ALL sheets", key="confirm_master_reset")
+            if st.button("🗑️ Master Reset", disabled=not confirm_master_reset, use_container_width=True):
+                if master_reset():
+                    st.session_state.get("hashes_calls", set()).clear()
+                    st.session_state.get("hashes_conv", set()).clear()
+                    st.session_state["gs_ver"] += 1
+                    st.rerun()
+        
+        # Batch Management
+        with st.container(border=True):
+            st.markdown("**📦 Batch Management**")
+            st.caption("Manage data by batch ID for precise control.")
+            
+            # Get available batches for this sheet
+            available_batches = get_available_batches(key)
+            
+            if available_batches:
+                st.markdown(f"**Available batches in '{sel_label}':**")
+                for batch in available_batches:
+                    st.code(batch, language=None)
+                
+                # Batch removal
+                selected_batch = st.selectbox(
+                    "Select batch to remove",
+                    available_batches,
+                    key=f"batch_remove_{key}"
+                )
+                
+                if st.button(f"🗑️ Remove Batch '{selected_batch}'", use_container_width=True):
+                    if remove_batch_from_sheet(key, selected_batch):
+                        st.session_state["gs_ver"] += 1
+                        st.rerun()
+            else:
+                st.info(f"No batches found in '{sel_label}' (or no batch metadata)")
+            
+            # Batch statistics
+            if st.button("📊 Show Batch Statistics", use_container_width=True):
+                df = _read_ws_by_name(key)
+                if df is not None and not df.empty and "__batch_id" in df.columns:
+                    batch_stats = df["__batch_id"].value_counts()
+                    st.markdown("**Batch Statistics:**")
+                    for batch_id, count in batch_stats.items():
+                        st.write(f"• **{batch_id}**: {count} records")
+                else:
+                    st.warning("No batch metadata found in this sheet")
+            
+            # Clean up orphaned records
+            st.divider()
+            st.markdown("**🧹 Clean Up Orphaned Records**")
+            st.caption("Assign batch ID to records that don't have one")
+            
+            orphaned_batch_id = st.text_input(
+                "Batch ID for orphaned records",
+                value="legacy_data",
+                key=f"orphaned_batch_{key}",
+                help="Enter a batch ID to assign to records without one"
+            )
+            
+            if st.button("🏷️ Assign Batch to Orphaned Records", use_container_width=True):
+                if assign_batch_to_orphaned_records(key, orphaned_batch_id):
+                    st.session_state["gs_ver"] += 1
+                    st.rerun()
+        
+        # File Uploader Management
+        with st.container(border=True):
+            st.markdown("**🗂️ File Uploader Management**")
+            st.caption("Clear file uploader displays and session state.")
+            
+            if st.button("🗂️ Clear File Displays", use_container_width=True):
+                # Clear all file uploader session state keys
+                file_uploader_keys = [
+                    "zoom_calls_uploader", "up_leads_pncs", "up_initial", 
+                    "up_discovery", "up_ncl", "up_multi"
+                ]
+                
+                # Also clear any related session state keys that might persist file uploader state
+                additional_keys = [
+                    "hashes_calls", "hashes_conv", "upload_history"
+                ]
+                
+                cleared_keys = []
+                for key in file_uploader_keys + additional_keys:
+                    if key in st.session_state:
+                        del st.session_state[key]
+                        cleared_keys.append(key)
+                
+                # Force a rerun to refresh the UI
+                st.success(f"File uploader displays cleared. Cleared keys: {', '.join(cleared_keys)}")
+                st.rerun()
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Sticky-open expander helpers
+# ───────────────────────────────────────────────────────────────────────────────
+def _keep_open_flag(flag_key: str):
+    st.session_state[flag_key] = True
+
+# Upload section with enhanced batch management
+def upload_section(section_id: str, title: str, expander_flag: str) -> Tuple[str, object]:
+    st.subheader(title)
+    today = date.today()
+    first_of_month = today.replace(day=1)
+    next_month = (first_of_month.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+    last_of_month = next_month - dt.timedelta(days=1)
+
+    c1, c2 = st.columns(2)
+    start = c1.date_input("Start date", value=first_of_month,
+                          key=f"{section_id}_start",
+                          on_change=_keep_open_flag, args=(expander_flag,))
+    end = c2.date_input("End date", value=last_of_month,
+                        key=f"{section_id}_end",
+                        on_change=_keep_open_flag, args=(expander_flag,))
+    ok, msg = validate_single_month_range(start, end)
+    if not ok: st.error(msg); st.stop()
+    period_key = month_key_from_range(start, end)
+
+    uploaded = st.file_uploader(f"Upload {title} CSV", type=["csv"],
+                                key=f"{section_id}_uploader",
+                                on_change=_keep_open_flag, args=(expander_flag,))
+    st.divider()
+    return period_key, uploaded
+
+def _data_upload_section():
+    """Batch controls, the Calls / conversion uploaders and the upserts into the master store."""
+    with st.expander("🧾 Data Upload & Management", expanded=st.session_state.get("exp_upload_open", False)):
+        # Batch management controls
+        st.markdown("### 📦 Batch Management")
+        col1, col2, col3 = st.columns(3)
+    
+        with col1:
+            if st.button("🔄 Generate New Batch ID", use_container_width=True):
+                st.session_state["current_batch_id"] = generate_batch_id()
+                st.success(f"New batch ID: {st.session_state['current_batch_id']}")
+    
+        with col2:
+            if st.button("🔄 Allow Re-upload", use_container_width=True):
+                st.session_state.get("hashes_calls", set()).clear()
+                st.session_state.get("hashes_conv", set()).clear()
+                st.success("Re-upload enabled - you can now upload the same files")
+    
+        with col3:
+            if st.button("🔄 Sync All Sheets", use_container_width=True):
+                for sheet_name in ["CALLS", "CALL_HOURS", "LEADS", "INIT", "DISC", "NCL"]:
+                    sync_from_master_sheet(sheet_name)
+    
+
+    
+        # Display current batch ID
+        st.info(f"**Current Batch ID:** {st.session_state['current_batch_id']}")
+    
+
+    
+        st.divider()
+
+        # One drop for a whole month-end: each file is routed to its master by its header row
+        dropped = st.file_uploader("Drop several exports at once (Zoom Calls, Leads_PNCs, Initial_Consultation, "
+                                   "Discovery_Meeting, New Client List)", type=["csv","xls","xlsx"],
+                                   accept_multiple_files=True, key="up_multi",
+                                   on_change=_keep_open_flag, args=("exp_upload_open",))
+        st.caption("Each file's type is detected from its headers. The dates and replace options below apply "
+                   "to dropped files as they do to the single uploaders.")
+        st.divider()
+    
+        # File uploads
+        calls_period_key, calls_uploader = upload_section("zoom_calls", "Zoom Calls", "exp_upload_open")
+        calls_ingest_mode = st.radio("Zoom Calls file type", CALLS_INGEST_MODES, horizontal=True,
+                                     key="calls_ingest_mode", on_change=_keep_open_flag, args=("exp_upload_open",),
+                                     help="Per-call detail logs are streamed and stored only as monthly totals "
+                                          "plus an hour × weekday cube.")
+        force_replace_calls = st.checkbox("Replace this month in Calls if it already exists",
+                                          key="force_calls_replace")
+
+        c1, c2 = st.columns(2)
+        upload_start = c1.date_input("Conversion upload start date",
+                                     value=date.today().replace(day=1),
+                                     key="conv_upload_start",
+                                     on_change=_keep_open_flag, args=("exp_upload_open",))
+        upload_end   = c2.date_input("Conversion upload end date",
+                                     value=date.today(),
+                                     key="conv_upload_end",
+                                     on_change=_keep_open_flag, args=("exp_upload_open",))
+        if upload_start > upload_end: st.error("Upload start must be on or before end.")
+
+        up_leads = st.file_uploader("Upload **Leads_PNCs**", type=["csv","xls","xlsx"],
+                                    key="up_leads_pncs", on_change=_keep_open_flag, args=("exp_upload_open",))
+        replace_leads = st.checkbox("Replace matching records in Leads (Email+Matter ID+Stage+IC Date+DM Date)",
+                                    key="rep_leads")
+
+        up_init  = st.file_uploader("Upload **Initial_Consultation**", type=["csv","xls","xlsx"],
+                                    key="up_initial", on_change=_keep_open_flag, args=("exp_upload_open",))
+        replace_init = st.checkbox("Replace this date range in Initial_Consultation", key="rep_init")
+
+        up_disc  = st.file_uploader("Upload **Discovery_Meeting**", type=["csv","xls","xlsx"],
+                                    key="up_discovery", on_change=_keep_open_flag, args=("exp_upload_open",))
+        replace_disc = st.checkbox("Replace this date range in Discovery_Meeting", key="rep_disc")
+
+        up_ncl   = st.file_uploader("Upload **New Client List**", type=["csv","xls","xlsx"],
+                                    key="up_ncl", on_change=_keep_open_flag, args=("exp_upload_open",))
+        replace_ncl = st.checkbox("Replace this date range in New Client List", key="rep_ncl")
+
+
+        # Queue each new file as an ingest job; the session's worker parses, merges and writes it in the background
+        batch_id = st.session_state["current_batch_id"]
+        if calls_uploader:
+            _queue_upload("CALLS", calls_uploader, "hashes_calls", batch_id, upload_start, upload_end,
+                          force_replace_calls, period_key=calls_period_key, calls_mode=calls_ingest_mode)
+        uploads = {"LEADS": (up_leads, replace_leads),
+                   "INIT":  (up_init,  replace_init),
+                   "DISC":  (up_disc,  replace_disc),
+                   "NCL":   (up_ncl,   replace_ncl)}
+        for key_name, (upl, want_replace) in uploads.items():
+            if upl:
+                _queue_upload(key_name, upl, "hashes_conv", batch_id, upload_start, upload_end, want_replace)
+        for upl in dropped or []:
+            try:
+                key_name, calls_mode = detect_upload_kind(_read_headers(upl))
+            except Exception as e:
+                st.caption(f"{upl.name}: could not read its headers ({e})."); continue
+            if key_name is None:
+                st.caption(f"{upl.name}: headers match none of the exports — use the matching uploader above.")
+            elif key_name == "CALLS":
+                if not upl.name.lower().endswith(".csv"):
+                    st.caption(f"{upl.name}: Zoom Calls files must be CSV."); continue
+                _queue_upload("CALLS", upl, "hashes_calls", batch_id, upload_start, upload_end,
+                              force_replace_calls, period_key=calls_period_key, calls_mode=calls_mode)
+            else:
+                _queue_upload(key_name, upl, "hashes_conv", batch_id, upload_start, upload_end,
+                              uploads[key_name][1])
+
+    _ingest_jobs_section()
+
+def _queue_upload(key: str, upload, hashes: str, batch_id: str, start: date, end: date, replace: bool, **options):
+    """Submit `upload` as an ingest job once: reruns while the file stays in its uploader do not queue it again."""
+    fhash = file_md5(upload)
+    seen = st.session_state.setdefault(hashes, set())
+    if fhash in seen:
+        st.caption(f"{upload.name}: already queued this session — use 🔄 Allow Re-upload to run it again.")
+        return
+    seen.add(fhash)
+    _ingest_queue().submit(IngestJob(key, upload.name, upload.getvalue(), batch_id, start, end, replace, **options))
+
+def _ingest_jobs_section():
+    """This session's ingest jobs; the panel refreshes itself while any of them is queued or running."""
+    queue = _ingest_queue()
+    if not queue.jobs:
+        return
+    active = [job.id for job in queue.active()]
+    st.fragment(_ingest_jobs_panel, run_every=JOB_POLL_SECONDS if active else None)(active)
+
+def _ingest_jobs_panel(waiting_on: List[str]):
+    queue = _ingest_queue()
+    # A job the page was waiting on has finished: rerun the whole page so the masters are reloaded
+    if any(job_id not in queue.jobs or not queue.jobs[job_id].active for job_id in waiting_on):
+        st.rerun()
+    with st.expander("📥 Ingest jobs", expanded=bool(waiting_on)):
+        for job in queue.active():
+            st.progress(job.progress, text=f"{job.name} → {TAB_NAMES[job.key]}: {job.stage or job.status}")
+        st.dataframe(pd.DataFrame([job.summary() for job in reversed(queue.jobs.values())]),
+                     use_container_width=True, hide_index=True)
+        st.caption(f"Jobs run in the background: in upload order for each master, in parallel across masters. "
+                   f"The last {JOB_HISTORY} finished jobs are kept for this session.")
+
+def _data_status_section(frames: Dict[str, pd.DataFrame]):
+    """Row counts and batch-ID coverage of the loaded masters, plus the sheet's tabs."""
+    df_calls, df_leads, df_init, df_disc, df_ncl = (frames[k] for k in ("CALLS", "LEADS", "INIT", "DISC", "NCL"))
+    with st.expander("🔍 DEBUG: Data Loading Status", expanded=False):
+        st.write("**Data Loading Status:**")
+        st.write(f"Calls data: {len(df_calls) if df_calls is not None and not df_calls.empty else 'No data'}")
+        st.write(f"Leads data: {len(df_leads) if df_leads is not None and not df_leads.empty else 'No data'}")
+        st.write(f"Initial Consultation data: {len(df_init) if df_init is not None and not df_init.empty else 'No data'}")
+        st.write(f"Discovery Meeting data: {len(df_disc) if df_disc is not None and not df_disc.empty else 'No data'}")
+        st.write(f"New Client List data: {len(df_ncl) if df_ncl is not None and not df_ncl.empty else 'No data'}")
+    
+        # Check for missing batch IDs
+        st.write("**Batch ID Status:**")
+        for name, df in [("Calls", df_calls), ("Leads", df_leads), ("Initial Consultation", df_init), 
+                        ("Discovery Meeting", df_disc), ("New Client List", df_ncl)]:
+            if df is not None and not df.empty:
+                if "__batch_id" in df.columns:
+                    missing_batch = df["__batch_id"].isna() | (df["__batch_id"] == "")
+                    missing_count = missing_batch.sum()
+                    st.write(f"{name}: {missing_count} records missing batch ID out of {len(df)} total")
+                
+                    # Show unique batch IDs
+                    unique_batches = df["__batch_id"].dropna().unique()
+                    st.write(f"{name} unique batch IDs: {list(unique_batches)}")
+                else:
+                    st.write(f"{name}: No __batch_id column found")
+    
+        sheet = _sheet()
+        if sheet:
+            st.write("**Available tabs in Google Sheet:**")
+            try:
+                tab_names = [ws.title for ws in sheet.worksheets()]
+                st.write(tab_names)
+            except Exception as e:
+                log(f"Could not list worksheets: {e}", "warning", "list", error=e)
+                st.write("Unable to list worksheets - check Google Sheets connection")
+        
+            st.write("**Current TAB_NAMES configuration:**")
+            st.write(TAB_NAMES)
+
+
+@st.fragment
+@profiled("calls")
+def _calls_section():
+    """Calls filters, table and charts — filter changes rerun only this section."""
+    px = _plotly()
+    rollup, options = _calls_rollup(_masters()["CALLS"])
+    with st.expander("📞 Calls Report", expanded=False):
+        st.subheader("Filters — Calls")
+    all_months = options["months"]
+    if all_months:
+        latest_my = max(all_months)
+        latest_year, latest_mnum = latest_my.split("-")
+        latest_mname = month_num_to_name(latest_mnum)
+    else:
+        latest_year, latest_mname = "All", "All"
+
+    c1, c2, c3, c4 = st.columns(4)
+    years = sorted({m.split("-")[0] for m in all_months})
+    year_options = ["All"] + years if years else ["All"]
+    sel_year = c1.selectbox("Year", year_options, index=(year_options.index(latest_year) if latest_year in year_options else 0))
+
+    def months_for_year(year_sel: str):
+        if year_sel == "All": return sorted({m.split("-")[1] for m in all_months})
+        return sorted({m.split("-")[1] for m in all_months if m.startswith(year_sel)})
+
+    mnums = months_for_year(sel_year)
+    mnames = [month_num_to_name(m) for m in mnums]
+    month_options = ["All"] + mnames if mnames else ["All"]
+    sel_month_name = c2.selectbox("Month", month_options,
+                                  index=(month_options.index(latest_mname) if latest_mname in month_options else 0))
+
+    cat_choices = ["All"] + options["categories"]
+    sel_cat = c3.selectbox("Category", cat_choices, index=0)
+    name_choices = ["All"] + options["names"].get(sel_cat, [])
+    sel_name = c4.selectbox("Name", name_choices, index=0)
+
+    sel_mnum = next((k for k, v in months_map.items() if v == sel_month_name), None)
+    period_keys = [m for m in all_months
+                   if (sel_year == "All" or m[:4] == sel_year) and (sel_month_name == "All" or m[5:7] == sel_mnum)]
+    mask = rollup["Month-Year"].isin(period_keys)
+    if sel_cat != "All":  mask &= rollup["Category"] == sel_cat
+    if sel_name != "All": mask &= rollup["Name"] == sel_name
+    view_calls = rollup.loc[mask]
+
+    st.subheader("Calls — Results")
+    calls_display_cols = [
+        "Category","Name","Total Calls","Completed Calls","Outgoing","Received",
+        "Forwarded to Voicemail","Answered by Other","Missed",
+        "Avg Call Time","Total Call Time","Total Hold Time","Month-Year"
+    ]
+    if not view_calls.empty:
+        avg_sec = (view_calls["weighted_sum"] / view_calls["Total Calls"].where(view_calls["Total Calls"] > 0)).fillna(0)
+        calls_table = view_calls.assign(**{"Avg Call Time": _fmt_hms(avg_sec),
+                                           "Total Call Time": _fmt_hms(view_calls["__total_sec"]),
+                                           "Total Hold Time": _fmt_hms(view_calls["__hold_sec"])})
+        st.dataframe(calls_table[calls_display_cols], hide_index=True, use_container_width=True)
+        csv_buf = io.StringIO()
+        calls_table[calls_display_cols].to_csv(csv_buf, index=False)
+        st.download_button("Download filtered Calls CSV", csv_buf.getvalue(),
+                           file_name="call_report_filtered.csv", type="primary")
+    else:
+        st.info("No rows match the current Calls filters.")
+
+    st.subheader("Calls — Visualizations")
+    if px is None:
+        st.info("Charts unavailable (install `plotly>=5.22` in requirements.txt).")
+
+    if not view_calls.empty and px is not None:
+        vol = (view_calls.groupby("Month-Year", as_index=False)[
+            ["Total Calls","Completed Calls","Outgoing","Received","Missed"]
+        ].sum())
+        vol["_ym"] = pd.to_datetime(vol["Month-Year"].astype(str)+"-01", format="%Y-%m-%d", errors="coerce")
+        vol = vol.sort_values("_ym")
+        vol_long = vol.melt(id_vars=["Month-Year","_ym"],
+                            value_vars=["Total Calls","Completed Calls","Outgoing","Received","Missed"],
+                            var_name="Metric", value_name="Count")
+        with st.expander("📈 Call volume trend over time", expanded=False):
+            fig1 = px.line(vol_long, x="_ym", y="Count", color="Metric", markers=True,
+                           labels={"_ym":"Month","Count":"Calls"})
+            fig1.update_layout(xaxis=dict(tickformat="%b %Y"))
+            st.plotly_chart(fig1, use_container_width=True)
+
+        by_name = view_calls.groupby("Name", as_index=False)[["Completed Calls", "Total Calls", "weighted_sum"]].sum()
+        comp = by_name[["Name", "Completed Calls", "Total Calls"]].copy()
+        if comp.empty:
+            with st.expander("✅ Completion rate by staff", expanded=False):
+                st.info("No data available to compute completion rates for the current filters.")
+        else:
+            c_tot = comp["Total Calls"].where(comp["Total Calls"] != 0)
+            comp["Completion Rate (%)"] = (comp["Completed Calls"] / c_tot * 100).fillna(0.0)
+            comp = comp.sort_values("Completion Rate (%)", ascending=False)
+            with st.expander("✅ Completion rate by staff", expanded=False):
+                fig2 = px.bar(comp, x="Name", y="Completion Rate (%)",
+                              labels={"Name":"Staff","Completion Rate (%)":"Completion Rate (%)"})
+                fig2.update_layout(xaxis={'categoryorder':'array','categoryarray':comp["Name"].tolist()})
+                st.plotly_chart(fig2, use_container_width=True)
+
+        by = by_name[["Name", "weighted_sum", "Total Calls"]].copy()
+        by["Avg Minutes"] = (by["weighted_sum"] / by["Total Calls"].where(by["Total Calls"] > 0) / 60.0).fillna(0.0)
+        by = by.sort_values("Avg Minutes", ascending=False)
+        with st.expander("⏱️ Average call duration by staff (minutes)", expanded=False):
+            fig3 = px.bar(by, x="Avg Minutes", y="Name", orientation="h",
+                          labels={"Avg Minutes":"Minutes","Name":"Staff"})
+            st.plotly_chart(fig3, use_container_width=True)
+
+    df_hours = _masters()["CALL_HOURS"]
+    if px is not None and not df_hours.empty and "Weekday" in df_hours.columns:
+        hours = df_hours.loc[df_hours["Month-Year"].astype(str).isin(period_keys)]
+        if sel_cat != "All":  hours = hours[hours["Category"] == sel_cat]
+        if sel_name != "All": hours = hours[hours["Name"] == sel_name]
+        with st.expander("🗓️ Staffing heatmap — calls by weekday × hour", expanded=False):
+            if hours.empty:
+                st.info("No per-call log data for the current Calls filters.")
+            else:
+                measure = st.radio("Measure", ["Calls", "Missed", "Completed"], horizontal=True,
+                                   key="calls_heatmap_measure")
+                fig4 = px.imshow(_call_hours_grid(hours, measure), aspect="auto",
+                                 color_continuous_scale="Blues",
+                                 labels={"x": "Hour of day", "y": "Weekday", "color": measure})
+                st.plotly_chart(fig4, use_container_width=True)
+                st.caption("Built from per-call detail logs only; months uploaded as summary exports have no hourly detail.")
+
+# Static HTML KPI table
+def _html_escape(s: str) -> str:
+    return (str(s).replace("&","&amp;").replace("<","&lt;").replace(">","&gt;"))
+
+def _kpi_table_html(kpi_rows, headers=("Metric", "Value")) -> str:
+    table_rows = "\n".join(
+        f"<tr><td>{_html_escape(row[0])}</td>"
+        + "".join(f"<td style='text-align:right'>{_html_escape(v)}</td>" for v in row[1:]) + "</tr>"
+        for row in kpi_rows
+    )
+    head = "".join(f"<th>{_html_escape(h)}</th>" for h in headers)
+    return """
+<style>
+.kpi-table { width: 100%; border-collapse: collapse; font-size: 0.95rem; }
+.kpi-table th, .kpi-table td { border: 1px solid #eee; padding: 10px 12px; }
+.kpi-table th { background: #fafafa; text-align: left; font-weight: 600; }
+</style>
+<table class="kpi-table">
+  <thead><tr>""" + head + """</tr></thead>
+  <tbody>
+    """ + table_rows + """
+  </tbody>
+</table>
+"""
+
+@st.fragment
+@profiled("firm conversion")
+def _firm_conversion_section(years: List[int]):
+    """Period filter and Firm Conversion KPIs; publishes the period as session_state["conv_period"]."""
+    frames = _masters()
+    with st.expander("📅 Filter", expanded=False):
+        row = st.columns([2, 1, 1])  # Period (wide), Year, Month
+
+    with row[0]:
+        period_mode = st.radio(
+            "Period",
+            ["Month to date", "Full month", "Year to date", "Week of month", "Custom range"],
+            horizontal=True,
+        )
+    with row[1]:
+        sel_year_conv = st.selectbox("Year", years, index=len(years)-1)
+    with row[2]:
+        sel_month_num = st.selectbox(
+            "Month",
+            month_nums,
+            index=date.today().month-1,
+            format_func=lambda m: months_map_names[m]
+        )
+
+    week_defs = None
+    sel_week_idx = 1
+    if period_mode == "Week of month":
+        week_defs = custom_weeks_for_month(sel_year_conv, sel_month_num)
+        def _wk_label(i):
+            wk = week_defs[i]; sd, ed = wk["start"], wk["end"]
+            return f'{wk["label"]} ({sd.day}–{ed.day} {ed.strftime("%b")})'
+        sel_week_idx = st.selectbox("Week of month",
+                                    options=list(range(len(week_defs))),
+                                    index=1, format_func=_wk_label)
+
+    cust_cols = st.columns(2)
+    custom_start = custom_end = None
+    if period_mode == "Custom range":
+        custom_start = cust_cols[0].date_input("Start date", value=date.today().replace(day=1))
+        custom_end   = cust_cols[1].date_input("End date",   value=date.today())
+        if custom_start > custom_end:
+            st.error("Start date must be on or before End date."); st.stop()
+    compare_on = st.toggle("Compare with previous period, same period last year and trailing 3-month average",
+                           value=True, key="conv_compare_on")
+
+    # Resolve period → (start_date, end_date)
+    if period_mode in ("Month to date", "Full month"):
+        start_date, end_date = _calendar_window(sel_year_conv, sel_month_num, clamp=period_mode == "Month to date")
+    elif period_mode == "Year to date":
+        start_date, end_date = _calendar_window(sel_year_conv, clamp=True)
+    elif period_mode == "Week of month":
+        wk = week_defs[sel_week_idx]
+        start_date, end_date = wk["start"], wk["end"]
+    else:
+        start_date, end_date = custom_start, custom_end
+
+    st.caption(f"Showing Conversion metrics for **{start_date:%-d %b %Y} → {end_date:%-d %b %Y}**")
+
+    conversion = _conversion_summary(frames["LEADS"], frames["INIT"], frames["DISC"], frames["NCL"], start_date, end_date)
+
+    for label, src_df, key in (("Initial Consultation", frames["INIT"], "IC"), ("Discovery Meeting", frames["DISC"], "DM"),
+                               ("NCL", frames["NCL"], "NCL")):
+        found = conversion["date_cols"][key]
+        if found is None:
+            st.error(f"Could not find {label} date column. Available columns: {list(src_df.columns) if not src_df.empty else 'No data'}")
+        else:
+            st.success(f"Found {key} date column: {found}")
+
+    kpi_rows = [(label, f"{conversion['rows'][f'row{i}']}%" if key in FUNNEL_RATIOS else conversion["rows"][f"row{i}"])
+                for i, (key, label) in enumerate(zip(SUMMARY_ROWS, SUMMARY_LABELS), start=1)]
+    compare = tuple(_comparison_windows(period_mode, start_date, end_date, sel_week_idx).items()) if compare_on else ()
+    headers = ("Metric", "Value")
+    if compare:
+        columns = _conversion_comparison(frames["LEADS"], frames["INIT"], frames["DISC"], frames["NCL"], compare)
+        headers += tuple(columns)
+        kpi_rows = [row + tuple("—" if col is None else col[i] for col in columns.values())
+                    for i, row in enumerate(kpi_rows)]
+    with st.expander("📊 Summary", expanded=False):
+        st.markdown(_kpi_table_html(kpi_rows, headers), unsafe_allow_html=True)
+
+    # Practice Area, Intake and the debug panels follow this period (and its comparison windows);
+    # a change made in a fragment-only rerun needs one full rerun to bring them along.
+    st.session_state["conv_period"] = (start_date, end_date)
+    st.session_state["conv_compare"] = compare
+    if (st.session_state.get("conv_period_page") not in (None, (start_date, end_date))
+            or st.session_state.get("conv_compare_page") not in (None, compare)):
+        st.rerun()
+
+# --- Renderer (same look as before) ---
+def _render_three_row_card(title_name: str, met, kept, pct: float, compare=()):
+    """Met / met-and-retained / % card; `compare` adds one (label, (met, kept, pct) or None) column each."""
+    def cells(vals):
+        if vals is None:
+            return ("—", "—", "—")
+        m, k, p = vals
+        return (_fmt_count(m), _fmt_count(k), f"{int(round(p))}%")
+    labels = (f"PNCs who met with {title_name}",
+              f"PNCs who met with {title_name} and retained",
+              f"% of PNCs who met with {title_name} and retained")
+    columns = [cells((met, kept, pct))] + [cells(vals) for _, vals in compare]
+    rows = [(label,) + tuple(col[i] for col in columns) for i, label in enumerate(labels)]
+    trs = "\n".join(
+        f"<tr><td>{_html_escape(r[0])}</td>"
+        + "".join(f"<td style='text-align:right'>{_html_escape(v)}</td>" for v in r[1:]) + "</tr>"
+        for r in rows
+    )
+    head = "".join(f"<th>{_html_escape(h)}</th>" for h in ("Metric", "Value") + tuple(lbl for lbl, _ in compare))
+    html = """
+<style>
+.mini-kpi { width: 100%; border-collapse: collapse; font-size: 0.95rem; }
+.mini-kpi th, .mini-kpi td { border: 1px solid #eee; padding: 8px 10px; }
+.mini-kpi th { background: #fafafa; text-align: left; font-weight: 600; }
+</style>
+<table class="mini-kpi">
+  <thead><tr>""" + head + """</tr></thead>
+  <tbody>""" + trs + """</tbody>
+</table>"""
+    st.markdown(html, unsafe_allow_html=True)
+
+def _pa_card_values(report: pd.DataFrame, pa_rollup: pd.DataFrame, pa: str, pick: str) -> Tuple[float, float, float]:
+    """(met, met and retained, %) for a practice area's ALL card or one attorney's card."""
+    if pick == "ALL":
+        # For ALL, percentage is based on the practice area's total "met with" count
+        if pa not in pa_rollup.index:
+            return 0, 0, 0.0
+        row = pa_rollup.loc[pa]
+    else:
+        row = report.loc[(report["Practice Area"] == pa) & (report["Attorney_Display"] == pick)].iloc[0]
+    return row["PNCs who met"], row["PNCs who met and retained"], float(row["% of PNCs who met and retained"])
+
+# --- Render per practice area ---
+@st.fragment
+@profiled("practice area")
+def _practice_area_section():
+    """Per-practice-area cards; attorney picks rerun only this section."""
+    frames = _masters()
+    sd, ed = st.session_state["conv_period"]
+    _, report, pa_rollup = _practice_area_report(frames["INIT"], frames["DISC"], frames["NCL"], sd, ed)
+    compare = _practice_area_comparison(frames["INIT"], frames["DISC"], frames["NCL"], st.session_state["conv_compare"])
+    report_by_pa = dict(tuple(report.groupby("Practice Area", sort=False)))
+    for pa in ["Estate Planning","Estate Administration","Civil Litigation","Business transactional","Other"]:
+        sub = report_by_pa.get(pa, report.iloc[0:0])
+
+        with st.expander(pa, expanded=False):
+            attys = ["ALL"] + sub["Attorney_Display"].tolist()
+            pick = st.selectbox(f"{pa} — choose attorney", attys, key=f"pa_pick_{pa.replace(' ','_')}")
+            _render_three_row_card(
+                pick, *_pa_card_values(report, pa_rollup, pa, pick),
+                compare=[(label, None if tables is None else _pa_card_values(tables[1], tables[2], pa, pick))
+                         for label, tables in compare.items()],
+            )
+
+def _fmt_intake(data: Dict[str, int], key: str) -> str:
+    return f"{int(round(data[key]))}%" if key.startswith("%") else _fmt_count(data[key])
+
+# --- Render intake report ---
+@st.fragment
+@profiled("intake")
+def _intake_section():
+    """Intake filter and summary; the specialist pick reruns only this section."""
+    frames = _masters()
+    sd, ed = st.session_state["conv_period"]
+    # Get total PNCs from main conversion report for percentage calculations
+    total_pncs = _conversion_summary(frames["LEADS"], frames["INIT"], frames["DISC"], frames["NCL"], sd, ed)["rows"]["row2"]
+    intake_results = _intake_report(frames["LEADS"], frames["INIT"], frames["DISC"], frames["NCL"], sd, ed, total_pncs)
+
+    with st.expander("📅 Filter", expanded=False):
+        intake_specialists_display = ["ALL"] + intake_specialists
+        selected_intake = st.selectbox("Select Intake Specialist", intake_specialists_display, key="intake_specialist_pick")
+
+    # One column per window: the current one, then each comparison (None when it does not apply)
+    columns = [intake_results[selected_intake]]
+    headers = ["Metric", "Value"]
+    for label, comp in _intake_comparison(frames["LEADS"], frames["INIT"], frames["DISC"], frames["NCL"],
+                                          st.session_state["conv_compare"]).items():
+        columns.append(None if comp is None else comp[selected_intake])
+        headers.append(label)
+
+    with st.expander("📊 Summary", expanded=False):
+        if selected_intake == "ALL":
+            # Show summary for all specialists (each PNC counted once)
+            st.subheader("Intake Summary - All Specialists Combined")
+            labels = [
+                "Total PNCs all intake specialists did intake",
+                "% of total PNCs received all intake specialists did intake",
+                "Total PNCs who retained without consultation",
+                "Total PNCs who scheduled consultation",
+                "% of remaining PNCs who scheduled consult",
+                "Total PNCs who showed up for consultation",
+                "% of PNCs who showed up for consultation",
+                "Total PNCs retained after scheduled consultation",
+                "% of PNCs who retained after scheduled consult",
+                "All intake specialists' total PNCs who retained",
+                "% of total PNCs received who retained",
+            ]
+        else:
+            # Show detailed metrics for selected specialist in row format like practice area
+            st.subheader(f"Intake Metrics - {selected_intake}")
+            labels = [
+                f"PNCs {selected_intake} did intake",
+                f"% of total PNCs received {selected_intake} did intake",
+                "PNCs who retained without consultation",
+                "PNCs who scheduled consultation",
+                "% of remaining PNCs who scheduled consult",
+                "PNCs who showed up for consultation",
+                "% of PNCs who showed up for consultation",
+                "PNCs retained after scheduled consultation",
+                "% of PNCs who retained after scheduled consult",
+                f"{selected_intake}'s total PNCs who retained",
+                "% of total PNCs received who retained",
+            ]
+        intake_df = pd.DataFrame(
+            [[label] + ["—" if data is None else _fmt_intake(data, key) for data in columns]
+             for label, key in zip(labels, _INTAKE_ROW_KEYS)],
+            columns=headers)
+        st.dataframe(intake_df, use_container_width=True, hide_index=True)
+
+@st.fragment
+@profiled("trend")
+def _trend_section(years: List[int]):
+    """Visualization filters and the three trend charts — reruns only this section."""
+    frames = _masters()
+    px = _plotly()
+    # Date filter for visualizations
+    viz_col1, viz_col2, viz_col3, viz_col4 = st.columns([2, 1, 1, 1])
+
+    with viz_col1:
+        viz_period_mode = st.radio(
+            "Visualization Period",
+            ["Year to date", "Month to date", "Quarterly"],
+            horizontal=True,
+        )
+    with viz_col2:
+        viz_year = st.selectbox("Year", years, index=len(years)-1, key="viz_year")
+    with viz_col3:
+        if viz_period_mode == "Month to date":
+            viz_month = st.selectbox("Month", month_nums, index=date.today().month-1, key="viz_month")
+        elif viz_period_mode == "Quarterly":
+            viz_quarter = st.selectbox("Quarter", ["Q1", "Q2", "Q3", "Q4"], key="viz_quarter")
+    with viz_col4:
+        viz_practice_area = st.selectbox(
+            "Practice Area",
+            ["ALL", "Estate Planning", "Estate Administration", "Civil Litigation", "Business transactional", "Other"],
+            key="viz_practice_area"
+        )
+
+    trend_buckets = _trend_buckets(
+        viz_period_mode, viz_year,
+        month=viz_month if viz_period_mode == "Month to date" else None,
+        quarter=viz_quarter if viz_period_mode == "Quarterly" else None,
+    )
+    if viz_period_mode == "Month to date":
+        x_label = f"Week ({months_map_names[viz_month]} {viz_year})"
+    else:
+        x_label = "Month"
+
+    if px is None:
+        st.info("Charts unavailable (install `plotly>=5.22` in requirements.txt).")
+    elif not trend_buckets:
+        st.info("The selected visualization window has not started yet.")
+    else:
+        sources = tuple(frames[k] for k in ("LEADS", "INIT", "DISC", "NCL"))
+        trend = _conversion_trend(
+            sources, tuple(_data_version(d) for d in sources),
+            trend_buckets, TREND_GRAIN[viz_period_mode], viz_practice_area,
+        )
+
+        def _trend_chart(y_col: str, title: str, hover_cols: List[str]):
+            fig = px.line(trend, x="Bucket", y=y_col, title=f"{title} - {viz_practice_area}",
+                          labels={"Bucket": x_label, y_col: y_col}, markers=True, hover_data=hover_cols)
+            fig.update_layout(yaxis=dict(rangemode="tozero"))
+            st.plotly_chart(fig, use_container_width=True)
+
+        # 1. Retained after meeting attorney trends (%)
+        with st.expander("📈 Retained after meeting attorney trends (%)", expanded=False):
+            if viz_practice_area == "ALL":
+                _trend_chart("Retention Rate (%)", "Retention Rate After Meeting (%)",
+                             ["Retained after consult", "Scheduled"])
+                st.caption(f"Data source: Main conversion report - % of PNCs who retained after scheduled consult | Practice Area: {viz_practice_area}")
+            else:
+                _trend_chart("Retention Rate (%)", "Retention Rate After Meeting (%)",
+                             ["Met attorney and retained", "Met attorney"])
+                st.caption(f"Data source: Practice area section - % of PNCs who met with attorneys and retained | Practice Area: {viz_practice_area}")
+    
+        # 2. PNCs scheduled consults (%) trend
+        with st.expander("📈 PNCs scheduled consults (%) trend", expanded=False):
+            _trend_chart("Scheduled Rate (%)", "PNCs Scheduled Consultation (%)",
+                         ["Scheduled", "PNCs", "Retained without consult"])
+            if viz_practice_area == "ALL":
+                st.caption(f"Data source: Intake section (ALL) - % of remaining PNCs who scheduled consult | Practice Area: {viz_practice_area}")
+            else:
+                st.caption(f"Data source: Intake section filtered by practice area - % of remaining PNCs who scheduled consult | Practice Area: {viz_practice_area}")
+    
+        # 3. PNCs showed up trend (%)
+        with st.expander("📈 PNCs showed up trend (%)", expanded=False):
+            _trend_chart("Show Up Rate (%)", "PNCs Showed Up for Consultation (%)", ["Showed", "Scheduled"])
+            if viz_practice_area == "ALL":
+                st.caption(f"Data source: Intake section (ALL) - % of PNCs who showed up for consultation | Practice Area: {viz_practice_area}")
+            else:
+                st.caption(f"Data source: Intake section filtered by practice area - % of PNCs who showed up for consultation | Practice Area: {viz_practice_area}")
+
+@st.fragment
+@profiled("funnel")
+def _funnel_section(years: List[int]):
+    """Cohort table, time-to-consult / time-to-retain distributions and a per-person lookup."""
+    frames = _masters()
+    px = _plotly()
+    sources = tuple(frames[k] for k in ("LEADS", "INIT", "DISC", "NCL"))
+    funnel = _funnel_table(*sources)
+    if funnel.empty:
+        st.info("No Leads / IC / DM / NCL rows with a Matter ID or Email to join.")
+        return
+
+    cohort_year = st.selectbox("Lead year", years, index=len(years)-1, key="funnel_year")
+    with st.expander("📋 Cohorts — leads by month and where they ended up", expanded=False):
+        cohorts = _funnel_cohorts(*sources, cohort_year)
+        if cohorts.empty:
+            st.info(f"No leads with a batch date in {cohort_year}.")
+        else:
+            st.dataframe(cohorts, use_container_width=True)
+            st.caption("Lead month = start of the Leads batch the person first appeared in. "
+                       "People are joined on Matter ID, else Email.")
+
+    in_year = funnel.loc[funnel["Lead Date"].dt.year.eq(cohort_year).to_numpy()]
+    with st.expander("⏳ Time to consult / time to retain (days from lead)", expanded=False):
+        stats = pd.DataFrame({
+            c: in_year[c].describe(percentiles=[0.5, 0.75, 0.9])[["count", "mean", "50%", "75%", "90%", "max"]]
+            for c in ("Days to Consult", "Days to Retain")
+        }).T.round(1)
+        st.dataframe(stats, use_container_width=True)
+        if px is not None:
+            dist = in_year[["Days to Consult", "Days to Retain"]].melt(var_name="Measure", value_name="Days").dropna()
+            if not dist.empty:
+                fig = px.histogram(dist, x="Days", color="Measure", barmode="overlay", nbins=30,
+                                   labels={"Days": "Days from lead"})
+                st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("🔎 Person lookup (Matter ID or Email)", expanded=False):
+        needle = st.text_input("Matter ID or Email", key="funnel_lookup").strip()
+        if needle:
+            key = f"e:{needle.lower()}" if "@" in needle else f"m:{needle}"
+            if key in funnel.index:
+                st.dataframe(funnel.loc[[key]].T, use_container_width=True)
+            else:
+                st.info("No person with that Matter ID / Email in the masters.")
+
+# ───────────────────────────────────────────────────────────────────────────────
+# 🔧 Debugging & Troubleshooting
+# ───────────────────────────────────────────────────────────────────────────────
+def _debug_section(frames: Dict[str, pd.DataFrame], start_date: date, end_date: date,
+                   conversion: Dict[str, object], practice_area: Tuple[pd.Series, pd.DataFrame, pd.DataFrame]):
+    """Reconciliation expanders for the current window, then master memory, report cache and logs."""
+    df_init, df_disc, df_ncl = (frames[k] for k in ("INIT", "DISC", "NCL"))
+    met_by_attorney, report, pa_rollup = practice_area
+    row1, row2, row3, row4, row5, row6, row7, row8, row9, row10, row11 = (
+        conversion["rows"][f"row{i}"] for i in range(1, 12))
+
+    with st.expander("Debugging & Troubleshooting", expanded=False):
+        with st.expander("🔧 IC/DM sanity (per sheet & PA) — current window", expanded=False):
+            ic_L = _col_by_idx(df_init, 11); ic_M = _col_by_idx(df_init, 12)
+            dm_L = _col_by_idx(df_disc, 11); dm_P = _col_by_idx(df_disc, 15)
+            st.write("IC Lead (L):", ic_L, "IC Date (M):", ic_M)
+            st.write("DM Lead (L):", dm_L, "DM Date (P):", dm_P)
+            st.write("Date range filter:", start_date, "to", end_date)
+            st.write("Per-attorney MET (IC+DM index-based):", met_by_attorney.to_dict(), "TOTAL =", int(met_by_attorney.sum()))
+            for pa in ["Estate Planning","Estate Administration","Civil Litigation","Business transactional","Other"]:
+                names = report.loc[report["Practice Area"] == pa, "Attorney"].tolist()
+                pa_total = int(pa_rollup["PNCs who met"].get(pa, 0))
+                st.write(pa, "met =", pa_total, "by", met_by_attorney.reindex(names).to_dict())
+            
+                # Show breakdown by source (IC vs DM) for Estate Planning
+                if pa == "Estate Planning":
+                    st.write("--- Estate Planning breakdown ---")
+                    ep_names = ["Connor Watkins", "Jennifer Fox", "Rebecca Megel"]
+                    for src_label, src_df in (("IC", df_init), ("DM", df_disc)):
+                        view = _kpi_view(src_label, src_df)
+                        if view.empty:
+                            continue
+                        met = _kpi_row_mask(view, "met_with_attorney", start_date, end_date)
+                        ep = view.loc[met & view["Attorney"].isin(ep_names).to_numpy(), "Attorney"]
+                        st.write(f"{src_label} - EP attorneys in range:", ep.astype(str).value_counts().to_dict())
+
+    with st.expander("🔧 NCL retained sanity — headers & sample", expanded=False):
+        if isinstance(df_ncl, pd.DataFrame) and not df_ncl.empty:
+            st.write("NCL columns (index → name):", {i: c for i, c in enumerate(df_ncl.columns)})
+            # Show which headers were picked (same rules as the retained engine) and the first 20 included rows
+            picked_date, picked_init, picked_flag = _ncl_columns(df_ncl)
+            st.write("Picked columns → date:", picked_date, " initials:", picked_init, " flag:", picked_flag)
+            st.write("Date range filter:", start_date, "to", end_date)
+
+            if picked_date and picked_init and picked_flag:
+                t = df_ncl.copy()
+                in_range = _between_inclusive(t[picked_date], start_date, end_date)
+                kept = ~_is_no(t[picked_flag])
+                st.write("Rows in date range:", in_range.sum())
+                st.write("Rows with retained flag != 'N':", kept.sum())
+                st.write("Rows meeting both criteria:", (in_range & kept).sum())
+                
+                sample = t.loc[in_range & kept, [picked_init, picked_flag, picked_date]].head(20)
+                st.write("First 20 rows in range & kept:", sample)
+            
+                # Show some sample data from the picked columns
+                st.write("Sample data from picked columns:")
+                sample_all = t[[picked_init, picked_flag, picked_date]].head(10)
+                st.write(sample_all)
+        else:
+            st.write("No NCL rows loaded for the current window.")
+
+    ep_audit = _ep_inclusion_audit(df_init, df_disc, start_date, end_date)
+
+    with st.expander("🔬 Estate Planning — inclusion audit (IC: L/M/G/I, DM: L/P/G/I)", expanded=False):
+        if ep_audit.empty:
+            st.info("No Estate Planning rows found in the current window.")
+            summary = pd.DataFrame()
+        else:
+            summary = ep_audit.groupby(["Attorney","Source"], dropna=False).agg(
+                total=("Included", "size"),
+                in_range=("InRange","sum"),
+                excluded_followup=("IsFollowUp","sum"),
+                excluded_canceled=("HasCanceledMeeting","sum"),
+                excluded_noshow=("HasNoShow","sum"),
+                included=("Included","sum"),
+            ).reset_index()
+        
+            if not summary.empty:
+                st.write("Estate Planning — summary by attorney & source:", summary)
+        
+            if not ep_audit.empty and "Included" in ep_audit.columns:
+                st.write("**EP totals — Included = met (IC+DM):**", int(ep_audit["Included"].sum()))
+                st.dataframe(ep_audit[_EP_AUDIT_COLS].sort_values(["Date","Attorney"]).reset_index(drop=True),
+                             use_container_width=True)
+            else:
+                st.info("No Estate Planning data available for the selected date range.")
+
+
+    with st.expander("Debug details (for reconciliation)", expanded=False):
+        if conversion["leads_stage_counts"] is not None:
+            st.write("Leads_PNCs — Stage (in selected period)", conversion["leads_stage_counts"])
+        if conversion["init_in_shape"][0]:
+            st.write("Initial_Consultation — in range", conversion["init_in_shape"])
+        if conversion["disc_in_shape"][0]:
+            st.write("Discovery_Meeting — in range", conversion["disc_in_shape"])
+        if conversion["ncl_flag_col"]:
+            st.write("New Client List — Retained split (in range)", conversion["ncl_flag_counts"])
+        st.write(
+            f"Computed: Leads={row1}, PNCs={row2}, "
+            f"Retained w/out consult={row3}, Scheduled={row4} ({row5}%), "
+            f"Showed={row6} ({row7}%), Retained after consult={row8} ({row9}%), "
+            f"Total retained={row10} ({row11}%)"
+        )
+    with st.expander("🔬 Estate Planning — inclusion audit (why met != your expectation?)", expanded=False):
+        if ep_audit.empty:
+            st.info("No Estate Planning rows found in the current window.")
+        else:
+            # Summary by attorney/source
+            summary = ep_audit.groupby(["Attorney","Source"], dropna=False).agg(
+                total=("Included", "size"),
+                in_range=("InRange","sum"),
+                excluded_followup=("IsFollowUp","sum"),
+                excluded_canceled=("HasCanceledMeeting","sum"),
+                excluded_noshow=("HasNoShow","sum"),
+                included=("Included","sum"),
+            ).reset_index()
+            st.write("Estate Planning — summary by attorney & source:", summary)
+
+            # Grand totals for EP
+            st.write("**EP totals — Included = met (IC+DM):**", int(ep_audit["Included"].sum()))
+            st.caption("If your expected 23 ≠ Included total, the row-level table below shows each excluded row and why.")
+
+            # Row-level view (you can filter in the UI)
+            st.dataframe(ep_audit[_EP_AUDIT_COLS].sort_values(["Date","Attorney"]).reset_index(drop=True), use_container_width=True)
+
+    with st.expander("🧠 Master memory (typed profile)", expanded=False):
+        memory = st.session_state.get("masters_memory", {})
+        if memory:
+            mem = pd.DataFrame.from_dict(memory, orient="index")
+            mem.index.name = "Tab"
+            raw_b, typed_b = mem.pop("raw_bytes"), mem.pop("typed_bytes")
+            mem["Raw (KB)"] = (raw_b / 1024).round(1)
+            mem["Typed (KB)"] = (typed_b / 1024).round(1)
+            mem["Reduction (×)"] = (raw_b / typed_b.where(typed_b > 0)).round(1).fillna(0.0)
+            st.dataframe(mem.rename(columns={"rows": "Rows", "columns": "Columns", "category_columns": "Category columns"}),
+                         use_container_width=True)
+            st.caption("Raw = masters as read (string columns); Typed = report-side frames under the typed load profile.")
+        else:
+            st.caption("No masters loaded.")
+
+    with st.expander("🧮 Report cache", expanded=False):
+        cache = _report_cache()
+        events = st.session_state["report_cache_events"]
+        run_hits = sum(1 for _, outcome in events if outcome == "hit")
+        st.write(f"This rerun: {run_hits} hit(s), {len(events) - run_hits} miss(es)")
+        if events:
+            st.dataframe(pd.DataFrame(events, columns=["Computation", "Result"]), use_container_width=True, hide_index=True)
+        st.caption(f"Process-wide: {cache.hits} hits, {cache.misses} misses, {len(cache)}/{cache.maxsize} entries")
+        views = _mv_store()
+        st.caption(f"Materialized views: {views.built} batch part(s) built, {views.reused} reused")
+
+    with st.expander("ℹ️ Logs (tech details)", expanded=False):
+        ring = _session_log()
+        if ring.total:
+            st.write(f"This session: {ring.total} event(s), the last {len(ring)} kept")
+            st.dataframe(pd.DataFrame(ring.counts()), use_container_width=True, hide_index=True)
+            recent = pd.DataFrame(ring.events()[::-1]).drop(columns="session")
+            st.dataframe(recent.rename(columns={"ts": "Time", "level": "Level", "op": "Operation", "tab": "Tab",
+                                                "ms": "Duration (ms)", "error": "Error", "message": "Message"}),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.caption("No technical logs this session.")
+        process = _process_log()
+        st.caption(f"Process-wide: {process.total} event(s) across sessions, the last {len(process)}/{process.maxlen} kept")
+        if process.total:
+            st.dataframe(pd.DataFrame(process.counts()), use_container_width=True, hide_index=True)
+
+def _profiler_section(run: Optional[dict]):
+    """This rerun's spans and counters, the session's rolling history and its JSON export."""
+    with st.expander("⏱️ Profiler (per rerun)", expanded=False):
+        if run is None:
+            st.caption("No rerun profiled yet."); return
+        c = run["counters"]
+        hit_miss = lambda name: f"{int(c.get(name + '.hit', 0))}/{int(c.get(name + '.miss', 0))}"
+        st.write(f"This rerun: {run['total_ms']:,.0f} ms · {int(c.get('sheets.calls', 0))} Sheets call(s) "
+                 f"({c.get('sheets.ms', 0):,.0f} ms, {c.get('sheets.bytes_in', 0) / 1024:,.1f} KB in / "
+                 f"{c.get('sheets.bytes_out', 0) / 1024:,.1f} KB out) · cache hit/miss: read {hit_miss('read_cache')}, "
+                 f"report {hit_miss('report_cache')}, snapshot {hit_miss('snapshot')}")
+        spans = pd.DataFrame(run["spans"])
+        if not spans.empty:
+            spans["Span"] = spans["depth"].map(lambda d: "· " * d) + spans["name"]
+            spans["Share (%)"] = (spans["ms"] / max(run["total_ms"], 0.1) * 100).round(1)
+            st.dataframe(spans.rename(columns={"start_ms": "Start (ms)", "ms": "Duration (ms)"})
+                         [["Span", "Start (ms)", "Duration (ms)", "Share (%)"]],
+                         hide_index=True, use_container_width=True)
+        if c:
+            st.dataframe(pd.DataFrame(sorted(c.items()), columns=["Counter", "Value"]),
+                         hide_index=True, use_container_width=True)
+
+        runs = run_history()
+        st.markdown(f"**Last {len(runs)} rerun(s) this session**")
+        st.dataframe(pd.DataFrame([run_summary(r) for r in reversed(runs)]), hide_index=True, use_container_width=True)
+        st.download_button("Download profile history (JSON)",
+                           json.dumps({"exported": datetime.now().isoformat(timespec="seconds"), "runs": runs}, indent=1),
+                           file_name=f"pji_profile_{datetime.now():%Y%m%d_%H%M%S}.json", mime="application/json")
+        st.caption("Spans and counters cover the whole page script except this panel (sign-in is the time "
+                   "before the first span). Incomplete = the rerun was stopped or interrupted; fragment = a "
+                   "section rerun on its own; ingest = an upload job run in the background.")
@@ -0,0 +1,903 @@
+# pji_reports/store.py
+# Google Sheets master store, batch management, report cache, materialized views and snapshots
+
+import os
+import json
+import hashlib
+from datetime import date, datetime
+from typing import List, Dict, Tuple, Optional
+import time
+import random
+import functools
+import threading
+import uuid
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .ingest import (
+    CALL_SECONDS_COLS, _clean_datestr, _is_no, ROW_HASH_COL, _to_ts
+)
+from .profiler import api_call, count, counter, span
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Quiet log collector (bounded rings of structured events, per session and process-wide)
+# ───────────────────────────────────────────────────────────────────────────────
+LOG_SIZE = 200             # events kept per session
+PROCESS_LOG_SIZE = 1000    # events kept across every session of the process
+LOG_MESSAGE_MAX = 500      # characters kept of a message (API errors carry whole JSON bodies)
+
+class _LogRing:
+    """Bounded, thread-safe ring of structured events plus a count per (level, op, tab, error class),
+    so repeated failures are counted rather than kept line by line."""
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self.total = 0
+        self._events: deque = deque(maxlen=maxlen)
+        self._counts: Dict[Tuple[str, str, str, str], List] = {}
+        self._lock = threading.Lock()
+
+    def add(self, event: Dict[str, object]) -> None:
+        key = (event["level"], event["op"], event["tab"], event["error"])
+        with self._lock:
+            self._events.append(event)
+            self.total += 1
+            entry = self._counts.setdefault(key, [0, ""])
+            entry[0] += 1
+            entry[1] = event["ts"]
+
+    def events(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return list(self._events)
+
+    def counts(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return [{"Level": lv, "Operation": op, "Tab": tab, "Error": err, "Count": n, "Last seen": last}
+                    for (lv, op, tab, err), (n, last) in sorted(self._counts.items(), key=lambda kv: -kv[1][0])]
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+@st.cache_resource(show_spinner=False)
+def _process_log() -> _LogRing:
+    return _LogRing(PROCESS_LOG_SIZE)
+
+def _session_log() -> _LogRing:
+    ring = st.session_state.get("log_ring")
+    if ring is None:
+        ring = st.session_state["log_ring"] = _LogRing(LOG_SIZE)
+    return ring
+
+def log(msg: str, level: str = "info", op: str = "", tab: str = "",
+        error: Optional[BaseException] = None, ms: Optional[float] = None):
+    """Record one event in this session's ring and the process-wide one; nothing is shown to the user."""
+    event = {"ts": datetime.now().isoformat(timespec="seconds"), "level": level, "op": op, "tab": tab,
+             "ms": None if ms is None else round(ms, 1), "error": type(error).__name__ if error is not None else "",
+             "message": msg[:LOG_MESSAGE_MAX], "session": st.session_state.setdefault("log_session", uuid.uuid4().hex[:8])}
+    _session_log().add(event)
+    _process_log().add(event)
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Batch Management Functions
+# ───────────────────────────────────────────────────────────────────────────────
+
+def generate_batch_id() -> str:
+    """Generate a unique batch ID with timestamp and random component"""
+    timestamp = int(time.time())
+    random_suffix = random.randint(1000, 9999)
+    return f"batch_{timestamp}_{random_suffix}"
+
+def add_batch_metadata(df: pd.DataFrame, batch_id: str, upload_date: date, start_date: date, end_date: date) -> pd.DataFrame:
+    """Add batch metadata to dataframe"""
+    df = df.copy()
+    df["__batch_id"] = batch_id
+    df["__upload_date"] = upload_date
+    df["__batch_start"] = start_date
+    df["__batch_end"] = end_date
+    df["__upload_timestamp"] = datetime.now().isoformat()
+    return df
+
+def remove_batch_from_sheet(sheet_name: str, batch_id: str) -> bool:
+    """Remove all records with specific batch ID from a sheet"""
+    try:
+        current_data = _read_ws_by_name(sheet_name)
+        if current_data is None or current_data.empty:
+            return True
+        
+        # Remove records with matching batch ID
+        filtered_data = current_data[current_data["__batch_id"] != batch_id].copy()
+        
+        # Write back the filtered data; only once it is stored, subtract the batch from the materialized views and snapshots
+        if not _write_ws_by_name(sheet_name, filtered_data):
+            st.error(f"Failed to remove batch '{batch_id}' from {sheet_name}: the write did not go through (see Logs).")
+            return False
+        _mv_store().drop(sheet_name, batch_id)
+        _snapshot_changed(sheet_name, current_data[current_data["__batch_id"] == batch_id])
+        
+        removed_count = len(current_data) - len(filtered_data)
+        st.success(f"Removed {removed_count} records with batch ID '{batch_id}' from {sheet_name}")
+        return True
+    except Exception as e:
+        st.error(f"Failed to remove batch from {sheet_name}: {str(e)}")
+        return False
+
+def get_available_batches(sheet_name: str) -> List[str]:
+    """Get list of available batch IDs for a sheet"""
+    try:
+        current_data = _read_ws_by_name(sheet_name)
+        if current_data is None or current_data.empty or "__batch_id" not in current_data.columns:
+            return []
+        
+        return sorted(current_data["__batch_id"].unique().tolist())
+    except Exception:
+        return []
+
+def sync_from_master_sheet(sheet_name: str) -> bool:
+    """Sync data from master sheet (refresh after manual edits)"""
+    try:
+        current_data = _read_ws_by_name(sheet_name)
+        if current_data is not None and not current_data.empty:
+            st.success(f"Successfully synced {len(current_data)} records from {sheet_name}")
+            return True
+        else:
+            st.warning(f"No data found in {sheet_name}")
+            return False
+    except Exception as e:
+        st.error(f"Failed to sync from {sheet_name}: {str(e)}")
+        return False
+
+def create_empty_sheet_with_headers(sheet_name: str) -> pd.DataFrame:
+    """Create an empty DataFrame with proper headers for each sheet type"""
+    if sheet_name == "CALLS":
+        # Zoom Calls headers
+        headers = [
+            "Name", "Total Calls", "Completed Calls", "Outgoing", "Received", 
+            "Forwarded to Voicemail", "Answered by Other", "Missed", 
+            "Avg Call Time", "Total Call Time", "Total Hold Time", "Month-Year",
+            "__avg_sec", "__total_sec", "__hold_sec",
+            "__batch_id", "__upload_date", "__batch_start", "__batch_end", "__upload_timestamp", ROW_HASH_COL
+        ]
+    elif sheet_name == "CALL_HOURS":
+        # Hour × weekday × staff cube aggregated from per-call logs
+        headers = [
+            "Month-Year", "Category", "Name", "Weekday", "Hour",
+            "Calls", "Completed", "Missed", "Talk Seconds",
+            "__batch_id", "__upload_date", "__batch_start", "__batch_end", "__upload_timestamp", ROW_HASH_COL
+        ]
+    elif sheet_name == "LEADS":
+        # Leads_PNCs headers
+        headers = [
+            "First Name", "Last Name", "Email", "Stage", "Assigned Intake Specialist", 
+            "Status", "Sub Status", "Matter ID", "Reason for Rescheduling", 
+            "No Follow Up (Reason)", "Refer Out?", "Lead Attorney", 
+            "Initial Consultation With Pji Law", "Initial Consultation Rescheduled With Pji Law", 
+            "Discovery Meeting Rescheduled With Pji Law", "Discovery Meeting With Pji Law", 
+            "Practice Area",
+            "__batch_id", "__upload_date", "__batch_start", "__batch_end", "__upload_timestamp", ROW_HASH_COL
+        ]
+    elif sheet_name == "INIT":
+        # Initial Consultation headers
+        headers = [
+            "First Name", "Last Name", "Email", "Matter ID", "Assigned Intake Specialist", 
+            "Sub Status", "Reason for Rescheduling", "Initial Consultation With Pji Law", 
+            "Initial Consultation Rescheduled With Pji Law", "Practice Area", "Lead Attorney", 
+            "Status", "Reason", "Initial Consultation With Pji Law",
+            "__batch_id", "__upload_date", "__batch_start", "__batch_end", "__upload_timestamp", ROW_HASH_COL
+        ]
+    elif sheet_name == "DISC":
+        # Discovery Meeting headers
+        headers = [
+            "First Name", "Last Name", "Email", "Matter ID", "Assigned Intake Specialist", 
+            "Sub Status", "Reason for Rescheduling", "Discovery Meeting With Pji Law", 
+            "Discovery Meeting Rescheduled With Pji Law", "Practice Area", "Lead Attorney", 
+            "Status", "Reason", "Discovery Meeting With Pji Law",
+            "__batch_id", "__upload_date", "__batch_start", "__batch_end", "__upload_timestamp", ROW_HASH_COL
+        ]
+    elif sheet_name == "NCL":
+        # New Client List headers
+        headers = [
+            "First Name", "Last Name", "Email", "Matter ID", "Practice Area", 
+            "Initial Consultation With Pji Law", "Date we had BOTH the signed CLA and full payment", 
+            "Lead Attorney", "Primary Intake?",
+            "__batch_id", "__upload_date", "__batch_start", "__batch_end", "__upload_timestamp", ROW_HASH_COL
+        ]
+    else:
+        # Fallback - empty DataFrame
+        return pd.DataFrame()
+    
+    return pd.DataFrame(columns=headers)
+
+def master_reset() -> bool:
+    """Complete master reset - removes all data from all sheets but preserves headers"""
+    try:
+        for sheet_name in ["CALLS", "CALL_HOURS", "LEADS", "INIT", "DISC", "NCL"]:
+            empty_df = create_empty_sheet_with_headers(sheet_name)
+            _write_ws_by_name(sheet_name, empty_df)
+        _snapshots().invalidate()
+        
+        # Clear file uploader session state to reset the displayed file names
+        file_uploader_keys = [
+            "zoom_calls_uploader", "up_leads_pncs", "up_initial", 
+            "up_discovery", "up_ncl"
+        ]
+        for key in file_uploader_keys:
+            if key in st.session_state:
+                del st.session_state[key]
+        
+        st.success("Master reset completed - all data cleared from all sheets (headers preserved)")
+        return True
+    except Exception as e:
+        st.error(f"Master reset failed: {str(e)}")
+        return False
+
+def assign_batch_to_orphaned_records(sheet_name: str, batch_id: str) -> bool:
+    """Assign batch ID to records that don't have one"""
+    try:
+        current_data = _read_ws_by_name(sheet_name)
+        if current_data is None or current_data.empty:
+            st.warning(f"No data found in {sheet_name}")
+            return True
+        
+        # Check if __batch_id column exists
+        if "__batch_id" not in current_data.columns:
+            current_data["__batch_id"] = ""
+        
+        # Find records without batch ID (handle both string and datetime formats)
+        batch_col = current_data["__batch_id"]
+        # Convert datetime objects back to strings for comparison
+        batch_col_str = batch_col.astype(str)
+        orphaned_mask = (batch_col.isna() | (batch_col_str == "") | 
+                        (batch_col_str == "NaT") | (batch_col_str.str.contains("0:00:00"))) # Specific check for datetime format
+        orphaned_count = orphaned_mask.sum()
+        
+        if orphaned_count == 0:
+            st.info(f"No orphaned records found in {sheet_name}")
+            return True
+        
+        # Assign batch ID to orphaned records
+        current_data.loc[orphaned_mask, "__batch_id"] = batch_id
+        
+        # Write back the updated data
+        _write_ws_by_name(sheet_name, current_data)
+        
+        st.success(f"Assigned batch ID '{batch_id}' to {orphaned_count} orphaned records in {sheet_name}")
+        return True
+    except Exception as e:
+        st.error(f"Failed to assign batch to orphaned records in {sheet_name}: {str(e)}")
+        return False
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Google Sheets master + caching
+# ───────────────────────────────────────────────────────────────────────────────
+TAB_NAMES = {
+    "CALLS": "Call_Report_Master",
+    "LEADS": "Leads_PNCs_Master",
+    "INIT":  "Initial_Consultation_Master",
+    "DISC":  "Discovery_Meeting_Master",
+    "NCL":   "New_Client_List_Master",
+    "CALL_HOURS": "Call_Hourly_Cube_Master",
+}
+TAB_FALLBACKS = {
+    "CALLS": ["Zoom_Calls"],
+    "LEADS": ["Leads_PNCs"],
+    "INIT":  ["Initial_Consultation"],
+    "DISC":  ["Discovery_Meeting"],
+    "NCL":   ["New_Clients", "New Client List"],
+}
+
+# Offline backend: a gspread-compatible spreadsheet (e.g. fakesheets.FakeSpreadsheet) used instead of secrets
+_backend_override = None
+
+def use_backend(sheet) -> None:
+    """Serve every master read / write from `sheet` (None: back to the store in secrets). Process-wide
+    caches — client, reads, report cache, materialized views, snapshots — start over."""
+    global _backend_override
+    _backend_override = sheet
+    for cached in (_gsheet_client_cached, _read_ws_cached, _report_cache, _mv_store, _snapshot_tab):
+        cached.clear()
+
+def _sheets_kind(method: str, url: str) -> str:
+    """Endpoint family of a Sheets API request: metadata, values_get, values_update, values_clear or batch_update."""
+    path = url.split("?")[0]
+    if "/values" not in path:
+        return "batch_update" if path.endswith(":batchUpdate") else "metadata"
+    if path.endswith((":clear", ":batchClear")):
+        return "values_clear"
+    return "values_get" if method.upper() == "GET" else "values_update"
+
+def _count_requests(http_client) -> None:
+    """Report every request of a gspread HTTP client (gspread 6; the Client itself in 5.x) to the profiler:
+    endpoint, time, bytes and errors."""
+    request = getattr(http_client, "request", None)
+    if request is None:
+        return
+    @functools.wraps(request)
+    def counted(method, endpoint, *args, **kwargs):
+        t, resp = time.perf_counter(), None
+        try:
+            resp = request(method, endpoint, *args, **kwargs)
+            return resp
+        except Exception as e:
+            resp = getattr(e, "response", None)
+            raise
+        finally:
+            body = getattr(getattr(resp, "request", None), "body", None) or b""
+            api_call(_sheets_kind(method, endpoint), time.perf_counter() - t,
+                     bytes_in=len(resp.content) if resp is not None else 0, bytes_out=len(body),
+                     error=resp is None or not resp.ok)
+    http_client.request = counted
+
+@st.cache_resource(show_spinner=False)
+def _gsheet_client_cached():
+    if _backend_override is not None:
+        return None, _backend_override
+    import gspread
+    from google.oauth2.service_account import Credentials
+    sa = st.secrets.get("gcp_service_account", None)
+    if not sa:
+        raw = st.secrets.get("gcp_service_account_json", None)
+        if raw: sa = json.loads(raw)
+    ms = st.secrets.get("master_store", None)
+    if not sa or not ms or "sheet_url" not in ms:
+        return None, None
+    if "client_email" not in sa:
+        raise ValueError("Service account object missing 'client_email'")
+    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+    creds = Credentials.from_service_account_info(sa, scopes=scopes)
+    gc = gspread.authorize(creds)
+    _count_requests(getattr(gc, "http_client", gc))
+    sh = gc.open_by_url(ms["sheet_url"])
+    return gc, sh
+
+def _gsheet_client():
+    try:
+        return _gsheet_client_cached()
+    except Exception as e:
+        st.warning(f"Master store unavailable: {e}")
+        return None, None
+
+def _sheet():
+    """The master spreadsheet, or None when the store is not configured / unreachable (client built on first use)."""
+    try:
+        return _gsheet_client_cached()[1]
+    except Exception:
+        return None
+
+def _ws(title: str):
+    """Idempotent, race-safe worksheet getter/creator.
+
+    Guarantees:
+      • If a worksheet with `title` already exists, returns it without error.
+      • If it does not exist, creates it once and returns it.
+      • Uses fallbacks in TAB_FALLBACKS when present.
+    """
+    sheet = _sheet()
+    if sheet is None:
+        return None
+
+    import time
+    from gspread.exceptions import APIError, WorksheetNotFound
+
+    # 1) Fast path: try fetching a few times (transient errors happen)
+    for delay in (0.0, 0.6, 1.2):
+        try:
+            if delay:
+                time.sleep(delay)
+            return sheet.worksheet(title)
+        except WorksheetNotFound:
+            # Double-check via full listing to avoid stale lookup cache
+            try:
+                existing_titles = {ws.title for ws in sheet.worksheets()}
+                if title in existing_titles:
+                    return sheet.worksheet(title)
+            except Exception:
+                pass
+            break  # not found after double-check; move on to fallbacks/create
+        except APIError:
+            # e.g., rate limit/5xx; retry
+            continue
+        except Exception:
+            continue
+
+    # 2) Fallback titles (legacy tab names)
+    for fb in TAB_FALLBACKS.get(title, []):
+        try:
+            return sheet.worksheet(fb)
+        except Exception:
+            continue
+
+    # 3) Create only if truly absent; treat ALREADY_EXISTS as success
+    try:
+        sheet.add_worksheet(title=title, rows=2000, cols=40)
+        return sheet.worksheet(title)
+    except APIError as e:
+        # If another writer created it milliseconds before us, Google returns ALREADY_EXISTS.
+        if "already exists" in str(e).lower():
+            try:
+                return sheet.worksheet(title)
+            except Exception:
+                pass
+        # Some APIErrors are retryable; try one last fetch before failing silently
+        try:
+            return sheet.worksheet(title)
+        except Exception:
+            pass
+    except Exception:
+        try:
+            return sheet.worksheet(title)
+        except Exception:
+            pass
+
+    # Only show error if we truly couldn't access or create the worksheet
+    # This should be rare since we have multiple fallback mechanisms
+    return None
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _read_ws_cached(sheet_url: str, tab_title: str, ver: int) -> pd.DataFrame:
+    import gspread_dataframe as gd
+    gc, sh = _gsheet_client_cached()
+    
+    # Use the _ws function for better error handling
+    ws = _ws(tab_title)
+    if ws is None:
+        return pd.DataFrame()
+    
+    count("read_cache.miss")
+    last_exc, t0 = None, time.perf_counter()
+    with span(f"fetch {tab_title}"):
+        for delay in (0.0, 1.0, 2.0):
+            try:
+                if delay: time.sleep(delay)
+                df = gd.get_as_dataframe(ws, evaluate_formulas=True, dtype=str)
+                last_exc = None; break
+            except Exception as e:
+                last_exc = e
+    if last_exc is not None: 
+        # Log the error but don't show it to the user since it might be transient
+        log(f"Read failed for '{tab_title}': {last_exc}", "error", "read", tab_title, last_exc,
+            (time.perf_counter() - t0) * 1000)
+        return pd.DataFrame()
+    
+    with span(f"parse {tab_title}"):
+        return _normalize_master(df)
+
+def _normalize_master(df: pd.DataFrame) -> pd.DataFrame:
+    """A master as read (string cells): drop unnamed columns, parse date headers, blank the gaps, stamp the version."""
+    df = df.loc[:, ~df.columns.astype(str).str.contains("^Unnamed")]
+    for c in df.columns:
+        cl = c.lower()
+        # Only convert actual date columns, not batch metadata columns
+        if ("date" in cl or "with pji law" in cl) and not cl.startswith("__batch"):
+            df[c] = pd.to_datetime(df[c].map(_clean_datestr), errors="coerce", format="mixed")
+    df = df.dropna(how="all").fillna("")
+    df.attrs["data_ver"] = _frame_fingerprint(df)
+    return df
+
+def _frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a frame (headers + cell values); stable across sessions and reruns."""
+    if df is None or df.empty:
+        return "empty:" + "|".join(map(str, getattr(df, "columns", [])))
+    h = hashlib.md5("|".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _data_version(df: pd.DataFrame) -> str:
+    """Per-tab data version: the fingerprint stamped at read time, else computed now."""
+    if isinstance(df, pd.DataFrame) and "data_ver" in df.attrs:
+        return df.attrs["data_ver"]
+    return _frame_fingerprint(df if isinstance(df, pd.DataFrame) else pd.DataFrame())
+
+def _read_ws_by_name(logical_key: str) -> pd.DataFrame:
+    if _sheet() is None: return pd.DataFrame()
+    ws = _ws(TAB_NAMES[logical_key])
+    if ws is None: return pd.DataFrame()
+    try:
+        sheet_url = _sheet().url
+        misses = counter("read_cache.miss")
+        with span(f"read {logical_key}"):
+            df = _read_ws_cached(sheet_url, ws.title, st.session_state.get("gs_ver", 0))
+        if counter("read_cache.miss") == misses:
+            count("read_cache.hit")
+        return df
+    except Exception as e:
+        log(f"Read failed for '{ws.title}': {e}", "error", "read", ws.title, e)
+        return pd.DataFrame()
+
+_GS_VER_LOCK = threading.Lock()   # ingest jobs on different masters write from parallel threads
+
+def _write_ws_by_name(logical_key: str, df: pd.DataFrame):
+    ws = _ws(TAB_NAMES[logical_key])
+    if ws is None or df is None: return False
+    t0 = time.perf_counter()
+    try:
+        import gspread_dataframe as gd
+        with span(f"write {logical_key}"):
+            ws.clear()
+            gd.set_with_dataframe(ws, df.reset_index(drop=True), include_index=False, include_column_header=True)
+        with _GS_VER_LOCK:
+            st.session_state["gs_ver"] = st.session_state.get("gs_ver", 0) + 1
+        return True
+    except Exception as e:
+        # Log the error but don't show it to the user since it might be transient
+        log(f"Write failed for '{TAB_NAMES[logical_key]}': {e}", "error", "write", TAB_NAMES[logical_key], e,
+            (time.perf_counter() - t0) * 1000)
+        return False
+
+
+# --- Local exports: CSV / Parquet / Excel copies of the master tabs (headless runs) ---
+EXPORT_SUFFIXES = (".parquet", ".csv", ".xlsx")
+
+def _export_path(directory: str, logical_key: str) -> Optional[str]:
+    """Export file of one master, named like its tab, a fallback tab or the logical key."""
+    for stem in (TAB_NAMES[logical_key], logical_key, *TAB_FALLBACKS.get(logical_key, ())):
+        for suffix in EXPORT_SUFFIXES:
+            path = os.path.join(directory, stem + suffix)
+            if os.path.isfile(path):
+                return path
+    return None
+
+def _read_exports(directory: str) -> Dict[str, pd.DataFrame]:
+    """Every master read from a directory of exports, normalized like a sheet read; a missing file reads as empty."""
+    raws = {}
+    for key in TAB_NAMES:
+        path = _export_path(directory, key)
+        if path is None:
+            raws[key] = pd.DataFrame()
+        elif path.endswith(".parquet"):
+            raws[key] = _normalize_master(pd.read_parquet(path))
+        elif path.endswith(".csv"):
+            raws[key] = _normalize_master(pd.read_csv(path, dtype=str))
+        else:
+            raws[key] = _normalize_master(pd.read_excel(path, dtype=str))
+    return raws
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Memoized report computation (bounded LRU keyed on data versions + period/filters)
+# ───────────────────────────────────────────────────────────────────────────────
+REPORT_CACHE_SIZE = 64
+
+class _ReportLRU:
+    """Bounded, thread-safe LRU shared by every session.
+
+    Keys carry the per-tab data versions, so an entry can never describe stale data;
+    old versions simply age out.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Tuple[bool, object]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: tuple, value: object) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+@st.cache_resource(show_spinner=False)
+def _report_cache() -> _ReportLRU:
+    return _ReportLRU(REPORT_CACHE_SIZE)
+
+def _memoized_report(fn):
+    """
+    Cache a pure report function on (name, args) with every DataFrame argument replaced by its
+    data version. Results are shared by reference — callers must treat them as read-only.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args):
+        key = (fn.__name__,) + tuple(_data_version(a) if isinstance(a, pd.DataFrame) else a for a in args)
+        cache = _report_cache()
+        found, value = cache.get(key)
+        st.session_state.setdefault("report_cache_events", []).append((fn.__name__, "hit" if found else "miss"))
+        count("report_cache.hit" if found else "report_cache.miss")
+        if not found:
+            value = fn(*args)
+            cache.put(key, value)
+        return value
+    return wrapper
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Materialized views (per-batch partial aggregates, maintained incrementally)
+# ───────────────────────────────────────────────────────────────────────────────
+class _MaterializedViews:
+    """Per-batch parts of the report aggregates, shared by every session: (tab, view) → batch id → (digest, part).
+
+    A master's aggregate is the merge of its batches' parts. A batch's part is keyed on a digest of its
+    rows' contents: a new batch is aggregated once from its own rows, a removed batch's part is dropped,
+    and a batch whose rows changed in any way (a same-size replace, a hand edit in the sheet) is rebuilt —
+    so load time follows the rows that changed, not the size of the history. A session still holding an
+    older read rebuilds the part for its own rows; the digest tells the next fresh read to rebuild it.
+    """
+    def __init__(self):
+        self.built = 0
+        self.reused = 0
+        self._parts: Dict[Tuple[str, str], Dict[str, Tuple[str, object]]] = {}
+        self._lock = threading.Lock()
+
+    def drop(self, tab: str, batch_id: Optional[str] = None) -> None:
+        """Forget one batch of a tab (every batch when batch_id is None)."""
+        with self._lock:
+            for (t, _), parts in self._parts.items():
+                if t != tab:
+                    continue
+                if batch_id is None:
+                    parts.clear()
+                else:
+                    parts.pop(str(batch_id), None)
+
+    @staticmethod
+    def _digests(df: pd.DataFrame, codes: np.ndarray, n: int) -> List[str]:
+        """Content digest per batch code: row count + the (order-independent) sum of the row hashes."""
+        sums = np.zeros(n, dtype=np.uint64)
+        np.add.at(sums, codes, pd.util.hash_pandas_object(df, index=False).to_numpy())
+        return [f"{rows}:{h:016x}" for rows, h in zip(np.bincount(codes, minlength=n).tolist(), sums.tolist())]
+
+    def parts(self, tab: str, view: str, df: pd.DataFrame, build) -> List[object]:
+        """The view's part for every batch of `df`; build(rows, batch_id) runs only for new or changed batches."""
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            return []
+        batch = (df["__batch_id"].astype(str) if "__batch_id" in df.columns
+                 else pd.Series("", index=df.index))
+        codes, batches = pd.factorize(batch)
+        digests = dict(zip(batches, self._digests(df, codes, len(batches))))
+        with self._lock:
+            store = self._parts.setdefault((tab, view), {})
+            for b in [b for b in store if b not in digests]:
+                del store[b]
+            stale = [b for b, d in digests.items() if b not in store or store[b][0] != d]
+            reused = {b: store[b][1] for b in digests if b not in stale}
+        fresh = {}
+        for b in stale:
+            rows = df.loc[batch.eq(b).to_numpy()].copy()
+            rows.attrs = {}   # a slice must not carry the master's data version
+            fresh[b] = (digests[b], build(rows, b))
+        with self._lock:
+            store.update(fresh)
+            self.built += len(fresh)
+            self.reused += len(reused)
+            count("mv.built", len(fresh))
+            count("mv.reused", len(reused))
+        return [fresh[b][1] if b in fresh else reused[b] for b in digests]
+
+@st.cache_resource(show_spinner=False)
+def _mv_store() -> _MaterializedViews:
+    return _MaterializedViews()
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Reports_Snapshot — persisted report results per closed month
+# ───────────────────────────────────────────────────────────────────────────────
+SNAPSHOT_TAB = "Reports_Snapshot"
+SNAPSHOT_COLS = ["Month-Year", "Report", "Payload", "Computed", "Versions"]
+CONVERSION_KEYS = ("LEADS", "INIT", "DISC", "NCL")   # the masters the snapshotted reports read
+
+class _SnapshotStore:
+    """Process-wide mirror of the Reports_Snapshot tab: (Month-Year, report) → JSON payload.
+
+    Each payload carries the data versions of the masters it was computed from and is only served for
+    those versions — a session whose read cache still holds older masters misses and recomputes
+    instead of trusting (or keeping) a stale month. Read from the sheet once per process; every change
+    is written straight back to its own row (an invalidated row is blanked and reused), never the whole
+    tab. Writes don't bump gs_ver — the snapshot tab is not a master, so the masters' read cache stays
+    warm. A read-only mirror (parallel CLI workers) keeps its changes in memory; so does a detached
+    store (tab=None), which never reads or writes a tab (reports over local exports).
+    """
+    def __init__(self, tab: Optional[str] = SNAPSHOT_TAB):
+        self._rows: Optional[Dict[Tuple[str, str], Tuple[str, str, str]]] = None
+        self._at: Dict[Tuple[str, str], int] = {}   # sheet row of each stored snapshot
+        self._free: List[int] = []                  # blanked rows, reused before appending
+        self._end = 2                               # first row past the tab's contents
+        self._header = False                        # row 1 holds SNAPSHOT_COLS
+        self._lock = threading.Lock()
+        self.tab = tab
+        self.read_only = tab is None
+
+    def _load(self) -> Dict[Tuple[str, str], Tuple[str, str, str]]:
+        if self._rows is None:
+            self._rows = {}
+            ws = _ws(self.tab) if self.tab else None
+            if ws is not None:
+                try:
+                    values = ws.get_all_values()
+                except Exception as e:
+                    log(f"Read failed for '{self.tab}': {e}", "error", "read", self.tab, e)
+                    values = []
+                header = values[0] if values else []
+                self._header = header[:len(SNAPSHOT_COLS)] == SNAPSHOT_COLS
+                pos = {c: i for i, c in enumerate(header)}   # older tabs lack the Versions column
+                for n, line in enumerate(values[1:], start=2):
+                    cell = {c: line[pos[c]] if pos.get(c, len(line)) < len(line) else "" for c in SNAPSHOT_COLS}
+                    key = (cell["Month-Year"], cell["Report"])
+                    if not (key[0] and key[1] and cell["Payload"]) or key in self._at:
+                        self._free.append(n)
+                        continue
+                    self._rows[key] = (cell["Payload"], cell["Computed"], cell["Versions"])
+                    self._at[key] = n
+                self._end = max(len(values) + 1, 2)
+        return self._rows
+
+    def _row_for(self, key: Tuple[str, str]) -> int:
+        if key not in self._at:
+            if self._free:
+                self._at[key] = self._free.pop(0)
+            else:
+                self._at[key], self._end = self._end, self._end + 1
+        return self._at[key]
+
+    def _save(self, lines: Dict[int, List[str]]) -> None:
+        """Write whole rows of the tab ({sheet row: cells}; empty cells blank a row)."""
+        if self.read_only or not lines:
+            return
+        ws = _ws(self.tab)
+        if ws is None:
+            return
+        if not self._header:
+            lines = {1: SNAPSHOT_COLS, **lines}
+        last_col = chr(ord("A") + len(SNAPSHOT_COLS) - 1)
+        try:
+            if max(lines) > ws.row_count:
+                ws.resize(rows=max(lines) + 100)
+            ws.batch_update([{"range": f"A{n}:{last_col}{n}", "values": [list(cells)]}
+                             for n, cells in sorted(lines.items())])
+            self._header = True
+        except Exception as e:
+            log(f"Write failed for '{self.tab}': {e}", "error", "write", self.tab, e)
+
+    def get(self, month: str, report: str, versions: str) -> Optional[str]:
+        """The stored payload, if it was computed from masters at `versions`."""
+        with self._lock:
+            hit = self._load().get((month, report))
+            return hit[0] if hit and hit[2] == versions else None
+
+    def months(self) -> set:
+        with self._lock:
+            return {m for m, _ in self._load()}
+
+    def put(self, month: str, report: str, payload: str, versions: str) -> None:
+        with self._lock:
+            row = (payload, datetime.now().isoformat(timespec="seconds"), versions)
+            self._load()[(month, report)] = row
+            self._save({self._row_for((month, report)): [month, report, *row]})
+
+    def invalidate(self, months=None) -> None:
+        """Drop the snapshots of `months` (every month when None)."""
+        with self._lock:
+            rows = self._load()
+            gone = [k for k in rows if months is None or k[0] in months]
+            for k in gone:
+                del rows[k]
+            blank = [self._at.pop(k) for k in gone if k in self._at]
+            self._free.extend(blank)
+            self._free.sort()
+            self._save({n: [""] * len(SNAPSHOT_COLS) for n in blank})
+
+# Snapshot store override: e.g. a detached _SnapshotStore(tab=None) for reports over local exports
+_snapshots_override: Optional[_SnapshotStore] = None
+
+def use_snapshots(snapshots: Optional[_SnapshotStore]) -> None:
+    """Serve snapshots from `snapshots` instead of the Reports_Snapshot tab (None: back to the tab)."""
+    global _snapshots_override
+    _snapshots_override = snapshots
+
+@st.cache_resource(show_spinner=False)
+def _snapshot_tab() -> _SnapshotStore:
+    return _SnapshotStore()
+
+def _snapshots() -> _SnapshotStore:
+    return _snapshots_override if _snapshots_override is not None else _snapshot_tab()
+
+def _months_touched(df: pd.DataFrame) -> set:
+    """Month-Year keys a set of master rows can affect: their batch windows and every date they carry."""
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return set()
+    stamps = []
+    if {"__batch_start", "__batch_end"} <= set(df.columns):
+        for bs, be in (df[["__batch_start", "__batch_end"]].astype(str).drop_duplicates().itertuples(index=False)):
+            bs, be = pd.to_datetime(bs, errors="coerce"), pd.to_datetime(be, errors="coerce")
+            if pd.notna(bs) and pd.notna(be):
+                stamps.extend(pd.period_range(bs, be, freq="M").to_timestamp())
+    for c in df.columns:
+        cl = str(c).lower()
+        if ("date" in cl or "with pji law" in cl) and not cl.startswith("__"):
+            stamps.extend(pd.to_datetime(df[c], errors="coerce", format="mixed").dropna())
+    return {f"{t.year}-{t.month:02d}" for t in stamps}
+
+def _snapshot_changed(logical_key: str, rows: Optional[pd.DataFrame] = None) -> None:
+    """A conversion master changed: drop the snapshots of the months `rows` touch (all when None) and queue them."""
+    if logical_key not in CONVERSION_KEYS:
+        return
+    months = _months_touched(rows) if rows is not None else None
+    _snapshots().invalidate(months)
+    st.session_state.setdefault("snapshot_pending", set()).update(months or ())
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Loaded-data layer (read on full runs, shared by the section fragments)
+# ───────────────────────────────────────────────────────────────────────────────
+# Typed load profile for the report side (write paths keep reading the raw string masters):
+#   • date headers and batch windows → datetime64
+#   • "(Y/N)" flags → bool, True unless the cell is "N" (blank reads as "with consult", as before)
+#   • call counts (and the hourly cube's weekday/hour keys) → int64
+#   • low-cardinality text → stripped category; other text is left as read
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+_COUNT_COLUMNS = {
+    "CALLS": ["Total Calls", "Completed Calls", "Outgoing", "Received",
+              "Forwarded to Voicemail", "Answered by Other", "Missed"],
+    "CALL_HOURS": ["Weekday", "Hour", "Calls", "Completed", "Missed", "Talk Seconds"],
+}
+
+def _typed_column(key: str, name: str, s: pd.Series) -> pd.Series:
+    cl = name.lower()
+    if cl in ("__batch_start", "__batch_end"):
+        return pd.to_datetime(s, errors="coerce")
+    if ("date" in cl or "with pji law" in cl) and not cl.startswith("__batch"):
+        return _to_ts(s)   # export styles mix within a column ("10/3/2026 at 2:15pm EDT", ISO, m/d/Y)
+    if "(y/n)" in cl:
+        return ~_is_no(s)
+    if name in _COUNT_COLUMNS.get(key, ()):
+        return pd.to_numeric(s, errors="coerce").fillna(0).astype("int64")
+    if s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+        txt = s.astype(str).str.strip()
+        if txt.nunique() <= max(1, CATEGORY_MAX_UNIQUE_RATIO * len(txt)):
+            return txt.astype("category")
+    return s
+
+@_memoized_report
+def _typed_master(key: str, raw: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Report-side copy of one master under the typed profile, plus its memory footprint."""
+    skip = {ROW_HASH_COL} | (set(CALL_SECONDS_COLS) | set(CALL_SECONDS_COLS.values()) if key == "CALLS" else set())
+    typed = pd.DataFrame({c: _typed_column(key, c, raw[c]) for c in raw.columns if c not in skip}, index=raw.index)
+    if key == "CALLS" and not typed.empty:
+        # Integer seconds as stored; rows written before they were persisted fall back to the display strings.
+        # The H:MM:SS strings themselves are re-formatted at render time for the visible rows only.
+        for sec_col, hms_col in CALL_SECONDS_COLS.items():
+            secs = (pd.to_numeric(raw[sec_col], errors="coerce") if sec_col in raw.columns
+                    else pd.Series(np.nan, index=raw.index))
+            legacy = secs.isna()
+            if legacy.any() and hms_col in raw.columns:
+                secs.loc[legacy] = pd.to_timedelta(raw.loc[legacy, hms_col].astype(str).str.strip(),
+                                                   errors="coerce").dt.total_seconds()
+            typed[sec_col] = secs.fillna(0).round().astype("int64")
+    typed.attrs["data_ver"] = _data_version(raw)
+    memory = {
+        "rows": len(raw),
+        "columns": raw.shape[1],
+        "category_columns": sum(isinstance(t, pd.CategoricalDtype) for t in typed.dtypes),
+        "raw_bytes": int(raw.memory_usage(deep=True).sum()),
+        "typed_bytes": int(typed.memory_usage(deep=True).sum()),
+    }
+    return typed, memory
+
+def _load_masters(raws: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, pd.DataFrame]:
+    """Read every master tab (cached on gs_ver) — or take `raws`, e.g. local exports — apply the typed profile
+    and publish them for this session's fragments."""
+    frames, memory = {}, {}
+    for key in TAB_NAMES:
+        if raws is not None:
+            raw = raws.get(key, pd.DataFrame())
+        else:
+            raw = _read_ws_by_name(key) if _sheet() is not None else pd.DataFrame()
+        with span(f"type {key}"):
+            frames[key], memory[key] = _typed_master(key, raw)
+    st.session_state["masters"] = frames
+    st.session_state["masters_memory"] = memory
+    return frames
+
+def _masters() -> Dict[str, pd.DataFrame]:
+    """Masters loaded by the last full run; a fragment rerun never re-reads the store."""
+    frames = st.session_state.get("masters")
+    return frames if frames is not None else _load_masters()
@@ -0,0 +1,290 @@
+# pji_reports/synth.py
+# Synthetic masters for benchmarks and load tests: CALLS, LEADS, INIT, DISC and NCL at any scale
+# (1k – 1M rows), under the stored headers of create_empty_sheet_with_headers and with the mess the
+# real exports carry — "10/3/2026 at 2:15pm EDT" next to ISO and m/d/Y dates, attorney initials in
+# several spellings, names off the rosters, blank cells, repeat clients across batches.
+#
+#   python -m pji_reports.synth --rows 100000 --out synth_exports/ [--seed 0] [--format csv|parquet]
+#
+# writes one export per master, named like its tab, for `python -m pji_reports.cli --source synth_exports/`.
+# Generation is seeded and vectorized: the same (rows, seed, through, months) always gives the same
+# frames, and a 1M-row Leads master builds in seconds.
+
+import argparse
+import os
+import sys
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .ingest import ALLOWED_CALLS, process_calls_csv
+from .store import create_empty_sheet_with_headers, TAB_NAMES
+from .metrics import (
+    EXCLUDED_PNC_STAGES, INITIALS_TO_ATTORNEY, INTAKE_INITIALS_TO_NAME, INTAKE_SPECIALISTS,
+    OTHER_ATTORNEYS, PRACTICE_AREAS,
+)
+
+THROUGH = date(2026, 9, 30)   # default last day of the generated history (fixed, so runs are comparable)
+CONVERSION_SHARE = {"LEADS": 1.0, "INIT": 0.1, "DISC": 0.05, "NCL": 0.06}   # rows per Leads row (a typical funnel)
+
+# NCL exports carry these beyond the stored headers; the reports and the upload dedupe key read them by name
+NCL_EXPORT_COLUMNS = ["Client Name", "Matter Number/Link", "Responsible Attorney", "Retained With Consult (Y/N)"]
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David",
+               "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Karen"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Taylor", "Moore", "Jackson", "Martin"]
+ATTORNEYS = list(dict.fromkeys(sum(PRACTICE_AREAS.values(), []))) + OTHER_ATTORNEYS
+STAGES = sorted(EXCLUDED_PNC_STAGES) + ["Consult Scheduled", "Consult Completed", "Retained", "Qualified",
+                                       "Pending Engagement", "Closed - Not Retained"]
+SUB_STATUSES = ["Scheduled", "Completed", "Follow Up", "follow up ", "Rescheduled", ""]
+RESCHEDULE_REASONS = ["Canceled Meeting", "No Show", "Client rescheduled", "Attorney conflict"]
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Cell generators (vectorized; strings are formatted once per distinct value)
+# ───────────────────────────────────────────────────────────────────────────────
+def _choice(rng: np.random.Generator, values, n: int, p=None) -> np.ndarray:
+    values = np.asarray(values, dtype=object)
+    if p is not None:
+        p = np.asarray(p, dtype=float); p = p / p.sum()
+    return values[rng.choice(len(values), size=n, p=p)]
+
+def _blank(rng: np.random.Generator, values: np.ndarray, share: float) -> np.ndarray:
+    """Blank out `share` of the cells."""
+    return np.where(rng.random(len(values)) < share, "", values).astype(object)
+
+# Date cell styles seen in the exports, as (date part, time part) of e.g. "10/3/2026 at 2:15pm EDT"
+_DATE_STYLES = (
+    (lambda d: f"{d.month}/{d.day}/{d.year} at ", lambda h, m: f"{(h - 1) % 12 + 1}:{m:02d}{'am' if h < 12 else 'pm'} "
+                                                              f"{('EDT', 'EST', 'CDT')[m % 3]}"),
+    (lambda d: f"{d:%Y-%m-%d} ",                  lambda h, m: f"{h:02d}:{m:02d}:00"),
+    (lambda d: f"{d.month}/{d.day}/{d.year}",     lambda h, m: ""),
+    (lambda d: f"{d:%m/%d/%Y} ",                  lambda h, m: f"{(h - 1) % 12 + 1}:{m:02d} {'AM' if h < 12 else 'PM'}"),
+    (lambda d: f"{d:%b} {d.day}, {d.year} ",      lambda h, m: f"{(h - 1) % 12 + 1}:{m:02d}{'am' if h < 12 else 'pm'}"),
+)
+
+def _history(through: date, months: int) -> Tuple[pd.Timestamp, int]:
+    """First day and length in days of the `months` calendar months ending with `through`'s month."""
+    first = pd.Timestamp(through).to_period("M").to_timestamp() - pd.DateOffset(months=months - 1)
+    return first, (pd.Timestamp(through) - first).days + 1
+
+def _stamps(rng: np.random.Generator, n: int, through: date, months: int) -> pd.DatetimeIndex:
+    """Office-hours times (8am–6pm, 5-minute grid) spread over the history."""
+    first, days = _history(through, months)
+    minutes = rng.integers(0, days, n) * 1440 + rng.integers(8 * 12, 18 * 12, n) * 5
+    return first + pd.to_timedelta(minutes, unit="m")
+
+_EPOCH = pd.Timestamp(0)
+
+def _messy_dates(rng: np.random.Generator, stamps: pd.DatetimeIndex, blank: float = 0.02) -> np.ndarray:
+    """Date cells as the exports write them: the _DATE_STYLES mixed row by row, a few blanks."""
+    styles = rng.choice(len(_DATE_STYLES), size=len(stamps), p=[0.4, 0.2, 0.2, 0.1, 0.1])
+    minutes = np.asarray((stamps - _EPOCH) // pd.Timedelta(minutes=1), dtype=np.int64)
+    days, days_at = np.unique(minutes // 1440 * 8 + styles, return_inverse=True)
+    times, times_at = np.unique(minutes % 1440 * 8 + styles, return_inverse=True)
+    day_text = np.array([_DATE_STYLES[k % 8][0](_EPOCH + pd.Timedelta(days=int(k // 8))) for k in days], dtype=object)
+    time_text = np.array([_DATE_STYLES[k % 8][1](int(k // 8) // 60, int(k // 8) % 60) for k in times], dtype=object)
+    return _blank(rng, day_text[days_at] + time_text[times_at], blank)
+
+def _attorney_names(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Full attorney names: roster names, a stray trailing space or lower case, off-roster names, blanks."""
+    return _choice(rng, ATTORNEYS + ["Someone Else", "Connor Watkins ", "jennifer fox", ""], n)
+
+_INITIALS_STYLES = (lambda b: b, lambda b: f"{b[0]}.{b[1]}.".lower(), lambda b: f"{b[0]} {b[1]}", lambda b: b.lower() + " ")
+
+def _attorney_initials(rng: np.random.Generator, n: int) -> np.ndarray:
+    """Responsible-attorney initials as typed: 'CW', 'c.w.', 'C W', 'cw ', unknown pairs, blanks."""
+    keyed = pd.Series(_choice(rng, list(INITIALS_TO_ATTORNEY) + ["ZZ", "XY"], n)) + "|" + \
+        pd.Series(rng.integers(0, len(_INITIALS_STYLES), n)).astype(str)
+    codes, uniq = pd.factorize(keyed)
+    text = np.array([_INITIALS_STYLES[int(s)](b) for b, s in (u.split("|") for u in uniq)], dtype=object)
+    return _blank(rng, text[codes], 0.03)
+
+def _intake_names(rng: np.random.Generator, n: int) -> np.ndarray:
+    return _blank(rng, _choice(rng, INTAKE_SPECIALISTS + ["Jordan Temp", "Front Desk"], n,
+                               p=[6] * len(INTAKE_SPECIALISTS) + [1, 1]), 0.05)
+
+def _people(rng: np.random.Generator, n: int, pool: int) -> Tuple[np.ndarray, pd.Series, pd.Series]:
+    """Client ids drawn from a pool (repeat clients), with their email and Matter ID."""
+    ids = rng.integers(0, max(pool, 1), n)
+    s = pd.Series(ids).astype(str)
+    return ids, ("client" + s + "@example.com"), (100000 + pd.Series(ids)).astype(str)
+
+def _with_headers(key: str, cols: Dict[str, object], n: int, extra: Optional[List[str]] = None) -> pd.DataFrame:
+    """`cols` laid out under the stored headers of `key` (duplicate headers numbered like a sheet read)."""
+    headers, seen = [], {}
+    stored = list(create_empty_sheet_with_headers(key).columns)
+    if extra:
+        stored = stored[:stored.index("__batch_id")] + extra + stored[stored.index("__batch_id"):]
+    for h in stored:
+        headers.append(h if h not in seen else f"{h}.{seen[h]}")
+        seen[h] = seen.get(h, 0) + 1
+    return pd.DataFrame({h: cols.get(h, np.full(n, "", dtype=object)) for h in headers})
+
+def _batch_columns(rng: np.random.Generator, stamps: pd.DatetimeIndex, seed: int) -> Dict[str, np.ndarray]:
+    """One upload batch per calendar month of `stamps`: id, upload date / time and the month window."""
+    month = stamps.to_period("M")
+    uniq, inverse = np.unique(month.asi8, return_inverse=True)
+    periods = pd.PeriodIndex.from_ordinals(uniq, freq="M")
+    uploaded = periods.end_time.normalize() + pd.Timedelta(days=1, hours=9)
+    suffix = np.random.default_rng(seed + 1).integers(1000, 10000, len(uniq))
+    ids = np.array([f"batch_{int(u.timestamp())}_{s}" for u, s in zip(uploaded, suffix)], dtype=object)
+    as_text = lambda idx, fmt: np.array([f"{t:{fmt}}" for t in idx], dtype=object)
+    return {"__batch_id": ids[inverse],
+            "__upload_date": as_text(uploaded, "%Y-%m-%d")[inverse],
+            "__batch_start": as_text(periods.start_time, "%Y-%m-%d")[inverse],
+            "__batch_end": as_text(periods.end_time, "%Y-%m-%d")[inverse],
+            "__upload_timestamp": as_text(uploaded, "%Y-%m-%dT%H:%M:%S")[inverse]}
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Masters
+# ───────────────────────────────────────────────────────────────────────────────
+def leads_frame(rows: int, seed: int = 0, through: date = THROUGH, months: int = 12) -> pd.DataFrame:
+    """Leads_PNCs_Master: one row per lead and monthly batch; clients recur across batches."""
+    rng = np.random.default_rng(seed)
+    stamps = _stamps(rng, rows, through, months)
+    _, email, matter = _people(rng, rows, rows // 2)
+    ic = np.where(rng.random(rows) < 0.5, _messy_dates(rng, stamps + pd.Timedelta(days=3)), "")
+    dm = np.where(rng.random(rows) < 0.25, _messy_dates(rng, stamps + pd.Timedelta(days=10)), "")
+    cols = {
+        "First Name": _choice(rng, FIRST_NAMES, rows), "Last Name": _choice(rng, LAST_NAMES, rows),
+        "Email": _blank(rng, email.to_numpy(dtype=object), 0.05),
+        "Stage": _choice(rng, STAGES, rows),
+        "Assigned Intake Specialist": _intake_names(rng, rows),
+        "Status": _choice(rng, ["Open", "Closed", "Pending"], rows),
+        "Sub Status": _choice(rng, SUB_STATUSES, rows),
+        "Matter ID": _blank(rng, matter.to_numpy(dtype=object), 0.1),
+        "Reason for Rescheduling": _blank(rng, _choice(rng, RESCHEDULE_REASONS, rows), 0.85),
+        "No Follow Up (Reason)": _blank(rng, _choice(rng, ["Not interested", "Wrong number"], rows), 0.9),
+        "Refer Out?": _choice(rng, ["", "Yes", "No"], rows, p=[8, 1, 1]),
+        "Lead Attorney": _attorney_names(rng, rows),
+        "Initial Consultation With Pji Law": ic,
+        "Discovery Meeting With Pji Law": dm,
+        "Practice Area": _choice(rng, list(PRACTICE_AREAS) + ["Other", ""], rows),
+        **_batch_columns(rng, stamps, seed),
+    }
+    return _with_headers("LEADS", cols, rows)
+
+def meetings_frame(key: str, rows: int, seed: int = 0, through: date = THROUGH, months: int = 12) -> pd.DataFrame:
+    """Initial_Consultation_Master (INIT) or Discovery_Meeting_Master (DISC), batched by meeting month."""
+    rng = np.random.default_rng(seed)
+    stamps = _stamps(rng, rows, through, months)
+    _, email, matter = _people(rng, rows, rows)
+    meeting = "Initial Consultation" if key == "INIT" else "Discovery Meeting"
+    when = _messy_dates(rng, stamps)
+    attorney = _attorney_names(rng, rows)
+    cols = {
+        "First Name": _choice(rng, FIRST_NAMES, rows), "Last Name": _choice(rng, LAST_NAMES, rows),
+        "Email": email.to_numpy(dtype=object), "Matter ID": matter.to_numpy(dtype=object),
+        "Assigned Intake Specialist": _intake_names(rng, rows),
+        "Sub Status": _choice(rng, SUB_STATUSES, rows, p=[5, 5, 2, 1, 1, 1]),
+        "Reason for Rescheduling": _blank(rng, _choice(rng, RESCHEDULE_REASONS, rows), 0.8),
+        f"{meeting} With Pji Law": when,
+        f"{meeting} Rescheduled With Pji Law": _blank(rng, _messy_dates(rng, stamps + pd.Timedelta(days=7)), 0.9),
+        "Practice Area": _choice(rng, list(PRACTICE_AREAS) + ["Other"], rows),
+        "Lead Attorney": attorney,
+        "Status": attorney,   # column L: the reports read the meeting's attorney from it, as in the CRM exports
+        "Reason": _blank(rng, _choice(rng, ["Client request", "Scheduling"], rows), 0.9),
+        f"{meeting} With Pji Law.1": when,
+        **_batch_columns(rng, stamps, seed),
+    }
+    return _with_headers(key, cols, rows)
+
+def ncl_frame(rows: int, seed: int = 0, through: date = THROUGH, months: int = 12) -> pd.DataFrame:
+    """New_Client_List_Master: signed clients with responsible-attorney and intake initials."""
+    rng = np.random.default_rng(seed)
+    stamps = _stamps(rng, rows, through, months)
+    ids, email, matter = _people(rng, rows, rows)
+    first, last = _choice(rng, FIRST_NAMES, rows), _choice(rng, LAST_NAMES, rows)
+    intake_initials = list(INTAKE_INITIALS_TO_NAME) + ["XX", "ae", ""]
+    cols = {
+        "First Name": first, "Last Name": last,
+        "Email": email.to_numpy(dtype=object), "Matter ID": matter.to_numpy(dtype=object),
+        "Practice Area": _choice(rng, list(PRACTICE_AREAS) + ["Other"], rows),
+        "Initial Consultation With Pji Law": _blank(rng, _messy_dates(rng, stamps - pd.Timedelta(days=14)), 0.3),
+        "Date we had BOTH the signed CLA and full payment": _messy_dates(rng, stamps),
+        "Lead Attorney": _attorney_names(rng, rows),
+        "Primary Intake?": _choice(rng, intake_initials, rows),
+        "Client Name": (pd.Series(first) + " " + pd.Series(last)).to_numpy(dtype=object),
+        "Matter Number/Link": ("https://app.lawmatics.com/matters/" + matter).to_numpy(dtype=object),
+        "Responsible Attorney": _attorney_initials(rng, rows),
+        "Retained With Consult (Y/N)": _choice(rng, ["Y", "N", "y", "n ", ""], rows, p=[10, 6, 1, 1, 1]),
+        **_batch_columns(rng, stamps, seed),
+    }
+    return _with_headers("NCL", cols, rows, extra=NCL_EXPORT_COLUMNS)
+
+def calls_export(rows: int, seed: int = 0) -> pd.DataFrame:
+    """A raw Zoom call-report export as process_calls_csv receives it: padded and synonym headers, H:MM:SS
+    durations, rostered staff mixed with rooms and people the report filters out."""
+    rng = np.random.default_rng(seed)
+    names = _choice(rng, ALLOWED_CALLS + ["Main Line", "Zoom Room 2", "Conference Phone", "Temp Staff"], rows)
+    total = rng.integers(0, 400, rows)
+    missed = (total * rng.uniform(0, 0.15, rows)).astype(int)
+    outgoing = (total * rng.uniform(0, 0.4, rows)).astype(int)
+    avg_sec = rng.integers(30, 900, rows)
+    hms = lambda s: pd.Series(s).map(lambda v: f"{v // 3600}:{v % 3600 // 60:02d}:{v % 60:02d}").to_numpy(dtype=object)
+    return pd.DataFrame({
+        " Name ": names,
+        "Extension": rng.integers(100, 999, rows),
+        "Total Calls": total, "Completed": total - missed,
+        "Outgoing Calls": outgoing, "Incoming Calls": total - outgoing,
+        "Forwarded to Voicemail": missed // 2, "Answered by Other Member": missed // 4, "Missed": missed,
+        "Avg Call Duration": hms(avg_sec), "Total Call Duration": hms(avg_sec * total),
+        "Total Hold Time": hms(rng.integers(0, 600, rows) * (total > 0)),
+    })
+
+def calls_frame(seed: int = 0, through: date = THROUGH, months: int = 12) -> pd.DataFrame:
+    """Call_Report_Master as the Calls upload writes it (stored headers plus Category): one processed
+    Zoom export per month, each its own batch."""
+    first, _ = _history(through, months)
+    parts = []
+    for i, period in enumerate(pd.period_range(first, periods=months, freq="M")):
+        export = calls_export(len(ALLOWED_CALLS) + 4, seed + i)
+        rows = process_calls_csv(export, period.strftime("%Y-%m"))
+        stamp = pd.DatetimeIndex([period.start_time] * len(rows))
+        parts.append(rows.assign(**_batch_columns(np.random.default_rng(seed + i), stamp, seed + i)))
+    return pd.concat(parts, ignore_index=True)
+
+def masters(rows: int = 1000, seed: int = 0, through: date = THROUGH, months: int = 12) -> Dict[str, pd.DataFrame]:
+    """Raw masters (as read from the store) keyed like TAB_NAMES; `rows` is the Leads row count and the
+    other conversion masters scale with it (CONVERSION_SHARE)."""
+    n = {k: max(1, int(rows * share)) for k, share in CONVERSION_SHARE.items()}
+    return {
+        "CALLS": calls_frame(seed, through, months),
+        "LEADS": leads_frame(n["LEADS"], seed, through, months),
+        "INIT":  meetings_frame("INIT", n["INIT"], seed + 1, through, months),
+        "DISC":  meetings_frame("DISC", n["DISC"], seed + 2, through, months),
+        "NCL":   ncl_frame(n["NCL"], seed + 3, through, months),
+    }
+
+def write_exports(frames: Dict[str, pd.DataFrame], out_dir: str, fmt: str = "csv") -> List[str]:
+    """One export per master, named like its tab (readable with --source in pji_reports.cli)."""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for key, df in frames.items():
+        path = os.path.join(out_dir, f"{TAB_NAMES[key]}.{fmt}")
+        if fmt == "parquet":
+            df.astype(str).to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        written.append(path)
+    return written
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m pji_reports.synth",
+                                 description="Write synthetic CALLS / LEADS / INIT / DISC / NCL masters.")
+    ap.add_argument("--rows", type=int, default=1000, help="Leads rows; INIT, DISC and NCL scale with it")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--through", type=date.fromisoformat, default=THROUGH, help="last day of the history")
+    ap.add_argument("--months", type=int, default=12)
+    ap.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    ap.add_argument("--out", default="synth_exports", help="output directory")
+    args = ap.parse_args(argv)
+    for path in write_exports(masters(args.rows, args.seed, args.through, args.months), args.out, args.format):
+        print(path)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())